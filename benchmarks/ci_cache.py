@@ -0,0 +1,102 @@
+"""Cold vs warm CI job timings against the local act runner.
+
+Renders the ci-workflow artifact, extracts each requested job into a
+standalone workflow (dropping its ``needs``/``if`` so act does not skip it
+for want of the changes job) and runs it with act: once against an empty
+cache server (cold) and then ``--warm-runs`` times against the cache the
+cold run populated (warm). Results are printed and written as JSON.
+
+    python benchmarks/ci_cache.py --job lint --job test-backend -o ci-cache.json
+
+Requires act (https://github.com/nektos/act) and Docker.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from scaffold.cli import load_artifacts  # noqa: E402
+
+BACKEND_PATHS = 'services packages'
+
+
+def standalone_workflow(workflow_yaml, job_name):
+    import yaml
+
+    workflow = yaml.safe_load(workflow_yaml)
+    job = dict(workflow['jobs'][job_name])
+    job.pop('needs', None)
+    job.pop('if', None)
+    text = yaml.safe_dump({'name': f'bench-{job_name}', 'on': 'push',
+                           'env': workflow.get('env', {}), 'jobs': {job_name: job}},
+                          sort_keys=False)
+    return text.replace('${{ needs.changes.outputs.backend_paths }}', BACKEND_PATHS)
+
+
+def run_act(workflow_path, job_name, cache_dir, extra_args):
+    command = ['act', 'push', '-W', workflow_path, '-j', job_name,
+               '--cache-server-path', cache_dir] + extra_args
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=REPO_ROOT, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        print(result.stderr[-2000:], file=sys.stderr)
+    return elapsed, result.returncode
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--job', action='append', required=True, help='job to time; repeatable')
+    parser.add_argument('--warm-runs', type=int, default=2)
+    parser.add_argument('-o', '--output', help='write results as JSON')
+    parser.add_argument('act_args', nargs=argparse.REMAINDER,
+                        help='extra arguments for act, after --')
+    args = parser.parse_args(argv)
+
+    if shutil.which('act') is None:
+        print('act is not installed; see https://github.com/nektos/act', file=sys.stderr)
+        return 1
+    extra = [a for a in args.act_args if a != '--']
+
+    graph = load_artifacts()
+    workflow_yaml = graph.render(['ci-workflow'])['ci-workflow']
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='sarva-ci-bench-') as scratch:
+        for job_name in args.job:
+            workflow_path = os.path.join(scratch, f'{job_name}.yml')
+            with open(workflow_path, 'w') as f:
+                f.write(standalone_workflow(workflow_yaml, job_name))
+            cache_dir = os.path.join(scratch, f'cache-{job_name}')
+
+            cold, cold_rc = run_act(workflow_path, job_name, cache_dir, extra)
+            warm = [run_act(workflow_path, job_name, cache_dir, extra) for _ in range(args.warm_runs)]
+            row = {
+                'job': job_name,
+                'cold_seconds': round(cold, 1),
+                'warm_seconds': [round(t, 1) for t, _ in warm],
+                'ok': cold_rc == 0 and all(rc == 0 for _, rc in warm),
+            }
+            results.append(row)
+            best_warm = min(row['warm_seconds']) if warm else float('nan')
+            print(f"{job_name:<24} cold {cold:7.1f}s   warm {best_warm:7.1f}s"
+                  f"{'' if row['ok'] else '   (failed, see stderr)'}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': results}, f, indent=2)
+            f.write('\n')
+    return 0 if all(r['ok'] for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""Postgres connection count with every Postgres-backed service at N replicas.
+
+Renders the generated compose files into a temporary directory (without
+container names or host ports, so services can be scaled), starts the
+stack with ``--replicas`` copies of each Postgres-backed service and has
+every replica fire ``--concurrency`` concurrent wallet requests at itself
+for ``--seconds``. Meanwhile ``pg_stat_activity`` is sampled; the peak
+number of client connections and the failed requests are reported per mode:
+
+    unbudgeted  every process keeps the old per-process pool of 10
+    budgeted    pool size from the connection budget for N replicas
+    pgbouncer   services behind PgBouncer in transaction mode
+
+    python benchmarks/db_connections.py --replicas 20
+    python benchmarks/db_connections.py --mode pgbouncer -o pgbouncer.json
+
+Requires docker with the compose plugin; the stack is torn down afterwards.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import script_2  # noqa: E402
+from scaffold import GRAPH, dump_yaml  # noqa: E402
+from scaffold.services import uses_postgres  # noqa: E402
+from scaffold.stack import compose_command  # noqa: E402
+
+MODES = ('unbudgeted', 'budgeted', 'pgbouncer')
+PROJECT = 'sarva-dbbench'
+JWT_SECRET = 'your-super-secret-jwt-key-change-this'
+
+# An authenticated route per service that reads from Postgres
+LOAD_PATHS = {
+    'auth-service': '/api/auth/me',
+    'wallet-service': '/api/wallet/transactions?limit=20'
+}
+
+ACTIVE_CONNECTIONS_SQL = (
+    "SELECT count(*) FROM pg_stat_activity "
+    "WHERE backend_type = 'client backend' AND pid <> pg_backend_pid()")
+
+# Runs inside a replica; prints "<ok> <failed>" when done.
+LOAD_SCRIPT = """
+const [url, token, concurrency, seconds] = process.argv.slice(1);
+const deadline = Date.now() + Number(seconds) * 1000;
+let ok = 0, failed = 0;
+async function worker() {
+  while (Date.now() < deadline) {
+    try {
+      const res = await fetch(url, { headers: { Authorization: `Bearer ${token}` } });
+      await res.arrayBuffer();
+      res.status >= 500 ? failed++ : ok++;
+    } catch { failed++; }
+  }
+}
+Promise.all(Array.from({ length: Number(concurrency) }, worker))
+  .then(() => console.log(`${ok} ${failed}`));
+"""
+
+
+def jwt_hs256(payload, secret):
+    def b64(data):
+        return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+    signing_input = b64(b'{"alg":"HS256","typ":"JWT"}') + '.' + b64(json.dumps(payload).encode())
+    signature = hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return signing_input + '.' + b64(signature)
+
+
+def render_stack(directory, mode, replicas):
+    """Write the compose files for ``mode``; return (paths, services, pool size)."""
+    GRAPH.options['db_replicas'] = replicas
+    services = [service for service in script_2.services() if uses_postgres(service)]
+    pool_size = {
+        'unbudgeted': script_2.MAX_SERVICE_POOL_SIZE,
+        'budgeted': script_2.connection_pool_size(services),
+        'pgbouncer': script_2.PGBOUNCER_CLIENT_POOL_SIZE
+    }[mode]
+
+    base = script_2.docker_compose()
+    base['services'] = {name: base['services'][name] for name in ('postgres', 'redis')}
+    entries = {}
+    for service in services:
+        entry = script_2.service_compose_entry(service, pool_size)
+        entry['build']['context'] = REPO_ROOT
+        entry.pop('ports', None)
+        entries[service.name] = entry
+    layers = [base, {'services': entries}]
+    if mode == 'pgbouncer':
+        overlay = script_2.docker_compose_pgbouncer(services)
+        overlay['services']['pgbouncer'].pop('ports', None)
+        layers.append(overlay)
+
+    for layer in layers:
+        for entry in layer['services'].values():
+            entry.pop('container_name', None)
+    for entry in base['services'].values():
+        entry.pop('ports', None)
+    base['networks'] = {'default': {'name': f'{PROJECT}-network'}}
+
+    paths = []
+    for index, layer in enumerate(layers):
+        path = os.path.join(directory, f'compose.{index}.yml')
+        with open(path, 'w') as f:
+            f.write(dump_yaml(layer))
+        paths.append(path)
+    return paths, services, pool_size
+
+
+async def _run(*argv):
+    process = await asyncio.create_subprocess_exec(
+        *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    out, err = await process.communicate()
+    return process.returncode, out.decode(), err.decode()
+
+
+async def sample_connections(compose, stop, samples):
+    while not stop.is_set():
+        returncode, out, _ = await _run(*compose, 'exec', '-T', 'postgres', 'psql', '-U', 'sarva',
+                                        '-d', 'sarva_dev', '-Atc', ACTIVE_CONNECTIONS_SQL)
+        if returncode == 0 and out.strip().isdigit():
+            samples.append(int(out.strip()))
+        await asyncio.sleep(0.25)
+
+
+async def drive(compose, services, replicas, args):
+    token = jwt_hs256({'userId': str(uuid.uuid4()), 'iat': int(time.time())}, JWT_SECRET)
+    stop, samples = asyncio.Event(), []
+    sampler = asyncio.ensure_future(sample_connections(compose, stop, samples))
+    loads = [
+        _run(*compose, 'exec', '-T', '--index', str(index), service.name, 'node', '-e', LOAD_SCRIPT,
+             f'http://localhost:{service.port}{LOAD_PATHS.get(service.name, "/health")}', token, str(args.concurrency), str(args.seconds))
+        for service in services for index in range(1, replicas + 1)
+    ]
+    results = await asyncio.gather(*loads)
+    stop.set()
+    await sampler
+
+    ok = failed = 0
+    for returncode, out, _ in results:
+        parts = out.split()
+        if returncode == 0 and len(parts) == 2:
+            ok += int(parts[0])
+            failed += int(parts[1])
+        else:
+            failed += 1
+    return max(samples, default=0), ok, failed
+
+
+def run_mode(mode, args):
+    with tempfile.TemporaryDirectory(prefix='sarva-dbbench-') as directory:
+        files, services, pool_size = render_stack(directory, mode, args.replicas)
+        compose = compose_command(files) + ['-p', PROJECT]
+        scale = [f'--scale={service.name}={args.replicas}' for service in services]
+        try:
+            subprocess.run(compose + ['up', '-d', '--build', '--wait', *scale], check=True,
+                           stdout=subprocess.DEVNULL)
+            peak, ok, failed = asyncio.run(drive(compose, services, args.replicas, args))
+        finally:
+            subprocess.run(compose + ['down', '-v'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return {'mode': mode, 'pool_size': pool_size, 'processes': len(services) * args.replicas,
+            'peak_connections': peak, 'requests': ok + failed, 'failed': failed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--replicas', type=int, default=20)
+    parser.add_argument('--mode', action='append', choices=MODES, help='modes to run; repeatable (default: all)')
+    parser.add_argument('--concurrency', type=int, default=20, help='in-flight requests per replica')
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('-o', '--output', help='write results as JSON')
+    args = parser.parse_args(argv)
+
+    limit = script_2.POSTGRES_SETTINGS['dev']['max_connections']
+    results = []
+    print(f"{'mode':<11}  {'pool':>4}  {'procs':>5}  {'peak conns':>10}  {'requests':>8}  {'failed':>6}")
+    for mode in args.mode or MODES:
+        row = run_mode(mode, args)
+        results.append(row)
+        print(f"{mode:<11}  {row['pool_size']:>4}  {row['processes']:>5}  "
+              f"{row['peak_connections']:>10}  {row['requests']:>8}  {row['failed']:>6}")
+    print(f'max_connections = {limit}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'replicas': args.replicas, 'max_connections': limit, 'results': results}, f, indent=2)
+            f.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Latency of the same request sent directly to a service and through the gateway.
+
+Like autocannon: ``--connections`` keep-alive connections each send one
+request at a time, back to back, for ``--duration`` seconds, first to the
+service port and then to the gateway. Latency percentiles and throughput
+are printed side by side, so the gateway's overhead is the difference.
+
+    npm run docker:up:services
+    python benchmarks/gateway_latency.py --connections 50 --duration 15
+
+By default a fresh user is registered and its wallet read
+(``GET /api/wallet``, authenticated); ``--path`` picks another route and
+``--no-auth`` skips registration.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scaffold.loadtest import HTTPConnection  # noqa: E402
+from wallet_withdraw import http, percentile  # noqa: E402
+
+
+async def load(url, path, headers, connections, duration):
+    """Run the load; returns (latencies in seconds, statuses, errors, elapsed)."""
+    latencies, statuses, errors = [], {}, []
+    deadline = time.perf_counter() + duration
+    parts = urlsplit(url)
+
+    async def worker():
+        connection = HTTPConnection(parts.hostname, parts.port or 80)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status, _ = await connection.request('GET', path, headers)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError) as exc:
+                errors.append(exc)
+                connection.close()
+                continue
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+        connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(connections)))
+    return sorted(latencies), statuses, errors, time.perf_counter() - started
+
+
+async def token_for(auth_url):
+    status, registered = await http(f'{auth_url}/api/auth/register', 'POST', {
+        'email': f'gateway-bench-{uuid.uuid4().hex[:12]}@sarva.dev', 'password': 'BenchPass123!',
+        'firstName': 'Bench', 'lastName': 'User'})
+    if status != 201:
+        raise SystemExit(f'register failed ({status}): {registered}')
+    return registered['token']
+
+
+def summarize(name, latencies, statuses, errors, elapsed):
+    return {
+        'target': name,
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'errors': len(errors),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'latency_ms': {p: round(percentile(latencies, q) * 1000, 2)
+                       for p, q in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))},
+    }
+
+
+async def run(args):
+    headers = []
+    if not args.no_auth:
+        headers.append(f'Authorization: Bearer {await token_for(args.auth_url)}')
+    results = []
+    for name, url in (('direct', args.direct_url), ('gateway', args.gateway_url)):
+        if args.warmup:
+            await load(url, args.path, headers, args.connections, args.warmup)
+        results.append(summarize(name, *await load(url, args.path, headers, args.connections, args.duration)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--direct-url', default='http://localhost:8002', help='service to compare against')
+    parser.add_argument('--gateway-url', default='http://localhost:8000')
+    parser.add_argument('--auth-url', default='http://localhost:8001')
+    parser.add_argument('--path', default='/api/wallet')
+    parser.add_argument('--no-auth', action='store_true', help='send requests without a token')
+    parser.add_argument('-c', '--connections', type=int, default=50)
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help='seconds per target')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds of unmeasured load first')
+    parser.add_argument('-o', '--output', help='write results as JSON')
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    print(f"{'target':<8}  {'req/s':>8}  {'p50 ms':>7}  {'p90 ms':>7}  {'p99 ms':>7}  {'max ms':>7}  {'errors':>6}")
+    for row in results:
+        latency = row['latency_ms']
+        print(f"{row['target']:<8}  {row['requests_per_second']:>8}  {latency['p50']:>7}  {latency['p90']:>7}  "
+              f"{latency['p99']:>7}  {latency['max']:>7}  {row['errors']:>6}")
+    direct, gateway = results
+    print(f"gateway overhead at p99: {gateway['latency_ms']['p99'] - direct['latency_ms']['p99']:+.2f}ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'path': args.path, 'connections': args.connections, 'duration': args.duration,
+                       'results': results}, f, indent=2)
+            f.write('\n')
+    failed = any(row['errors'] or any(not status.startswith('2') for status in row['statuses']) for row in results)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
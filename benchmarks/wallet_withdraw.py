@@ -0,0 +1,147 @@
+"""Concurrent withdrawals against one wallet: correctness and throughput.
+
+Registers a fresh user through the auth service, deposits ``--balance``
+into its wallet and then fires ``--requests`` withdrawals of ``--amount``
+at the wallet service all at once. With a race-free withdraw path exactly
+``balance / amount`` of them succeed, the rest are rejected with 400, and
+the final balance is what the successful withdrawals left behind. Any
+other outcome (a 5xx, extra successes, a wrong balance) fails the run.
+
+    npm run docker:up:services
+    python benchmarks/wallet_withdraw.py --requests 500 --balance 100 --amount 1
+
+With ``--dsn`` the wallet's ledger is also replayed with scaffold.ledger.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def http(url, method='GET', body=None, token=None):
+    """Minimal HTTP/1.1 client (one connection per request); returns (status, json)."""
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    payload = json.dumps(body).encode() if body is not None else b''
+    headers = [f'{method} {parts.path or "/"} HTTP/1.1', f'Host: {parts.netloc}',
+               'Connection: close', f'Content-Length: {len(payload)}']
+    if body is not None:
+        headers.append('Content-Type: application/json')
+    if token:
+        headers.append(f'Authorization: Bearer {token}')
+    writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode() + payload)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, content = raw.partition(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    try:
+        return status, json.loads(content) if content else None
+    except ValueError:
+        return status, None
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run(args):
+    email = f'withdraw-bench-{uuid.uuid4().hex[:12]}@sarva.dev'
+    status, registered = await http(f'{args.auth_url}/api/auth/register', 'POST', {
+        'email': email, 'password': 'BenchPass123!', 'firstName': 'Bench', 'lastName': 'User'})
+    if status != 201:
+        raise SystemExit(f'register failed ({status}): {registered}')
+    token = registered['token']
+
+    status, deposited = await http(f'{args.wallet_url}/api/wallet/deposit', 'POST',
+                                   {'amount': args.balance}, token)
+    if status != 200:
+        raise SystemExit(f'deposit failed ({status}): {deposited}')
+
+    gate = asyncio.Event()
+
+    async def withdraw():
+        await gate.wait()
+        started = time.perf_counter()
+        status, _ = await http(f'{args.wallet_url}/api/wallet/withdraw', 'POST',
+                               {'amount': args.amount}, token)
+        return status, time.perf_counter() - started
+
+    tasks = [asyncio.ensure_future(withdraw()) for _ in range(args.requests)]
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    gate.set()
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    _, wallet = await http(f'{args.wallet_url}/api/wallet', token=token)
+    return outcomes, elapsed, wallet['wallet']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--auth-url', default='http://localhost:8001')
+    parser.add_argument('--wallet-url', default='http://localhost:8002')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--balance', default='100.00', help='opening deposit')
+    parser.add_argument('--amount', default='1.00', help='amount per withdrawal')
+    parser.add_argument('--dsn', help='also replay the wallet ledger (needs psycopg)')
+    parser.add_argument('-o', '--output', help='write results as JSON')
+    args = parser.parse_args(argv)
+
+    outcomes, elapsed, wallet = asyncio.run(run(args))
+    balance, amount = Decimal(args.balance), Decimal(args.amount)
+
+    errors = [o for o in outcomes if isinstance(o, BaseException)]
+    statuses = [o[0] for o in outcomes if not isinstance(o, BaseException)]
+    latencies = sorted(o[1] for o in outcomes if not isinstance(o, BaseException))
+    succeeded = statuses.count(200)
+    rejected = statuses.count(400)
+    expected_successes = min(args.requests, int(balance // amount))
+    final_balance = Decimal(wallet['balance'])
+
+    checks = {
+        'no_errors': not errors and succeeded + rejected == args.requests,
+        'successes': succeeded == expected_successes,
+        'final_balance': final_balance == balance - succeeded * amount,
+    }
+    if args.dsn:
+        from scaffold.ledger import reconcile
+        stats, _ = reconcile(args.dsn, wallet=wallet['id'], jobs=1)
+        checks['ledger'] = not any(stats[k] for k in ('opening', 'gap', 'drift', 'balance', 'orphan'))
+
+    print(f'{args.requests} withdrawals in {elapsed:.2f}s ({args.requests / elapsed:.0f} req/s)')
+    print(f'   succeeded {succeeded} (expected {expected_successes}), rejected {rejected}, '
+          f'other {len(statuses) - succeeded - rejected}, connection errors {len(errors)}')
+    print(f'   latency p50 {percentile(latencies, 0.50) * 1000:.1f}ms  '
+          f'p95 {percentile(latencies, 0.95) * 1000:.1f}ms  p99 {percentile(latencies, 0.99) * 1000:.1f}ms')
+    print(f'   final balance {final_balance}')
+    for name, ok in checks.items():
+        print(f"   {'✅' if ok else '❌'} {name}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'requests': args.requests, 'seconds': round(elapsed, 3),
+                'requests_per_second': round(args.requests / elapsed, 1),
+                'succeeded': succeeded, 'rejected': rejected, 'errors': len(errors),
+                'latency_ms': {p: round(percentile(latencies, q) * 1000, 2)
+                               for p, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))},
+                'final_balance': str(final_balance), 'checks': checks,
+            }, f, indent=2)
+            f.write('\n')
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
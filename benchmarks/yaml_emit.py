@@ -0,0 +1,61 @@
+"""Micro-benchmark: libyaml CSafeDumper vs pure-Python SafeDumper.
+
+Dumps the ci_workflow and docker_compose structures from script_2.py with
+both emitters, checks the output is byte-identical and reports the time per
+dump. ``--fanout N`` emits N copies as one multi-document stream, which is
+what templating per-service workflows and compose overlays looks like.
+
+    python benchmarks/yaml_emit.py --repeat 50 --fanout 40
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import script_2  # noqa: E402
+from scaffold.emit import dump_yaml_all, has_libyaml  # noqa: E402
+
+STRUCTURES = {
+    'ci_workflow': lambda: script_2.ci_workflow(script_2.services(), script_2.workspaces()),
+    'docker_compose': script_2.docker_compose,
+}
+
+
+def time_dump(documents, pure, repeat):
+    best = float('inf')
+    output = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = dump_yaml_all(documents, pure=pure)
+        best = min(best, time.perf_counter() - started)
+    return best, output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help='runs per case (best is kept)')
+    parser.add_argument('--fanout', type=int, default=1, help='documents per stream')
+    args = parser.parse_args(argv)
+
+    if not has_libyaml():
+        print('PyYAML was built without libyaml; only the pure-Python emitter is available.')
+        return 1
+
+    print(f"{'structure':<16} {'docs':>5} {'python ms':>10} {'libyaml ms':>11} {'speedup':>8}")
+    for name, factory in STRUCTURES.items():
+        documents = [factory() for _ in range(args.fanout)]
+        pure_time, pure_out = time_dump(documents, True, args.repeat)
+        c_time, c_out = time_dump(documents, False, args.repeat)
+        if pure_out != c_out:
+            print(f"{name}: emitters disagree", file=sys.stderr)
+            return 2
+        print(f"{name:<16} {args.fanout:>5} {pure_time * 1000:>10.2f} "
+              f"{c_time * 1000:>11.2f} {pure_time / c_time:>7.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
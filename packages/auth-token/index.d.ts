@@ -0,0 +1,38 @@
+export interface TokenClaims {
+  userId: string;
+  exp?: number;
+  iat?: number;
+  [claim: string]: unknown;
+}
+
+export interface TokenVerifierMetrics {
+  hits: number;
+  misses: number;
+  rejected: number;
+  revoked: number;
+  errors: number;
+  size: number;
+}
+
+export interface TokenVerifier {
+  verify(token: string): Promise<TokenClaims | null>;
+  revoke(token: string): Promise<void>;
+  metrics: TokenVerifierMetrics;
+}
+
+export function createTokenVerifier(options: {
+  secret: string;
+  maxEntries?: number;
+  redisUrl?: string;
+}): TokenVerifier;
+
+export function tokenDigest(token: string): string;
+
+export class TokenCache {
+  constructor(maxEntries: number);
+  readonly size: number;
+  get(digest: string, now: number): TokenClaims | undefined;
+  set(digest: string, claims: TokenClaims, expiresAt: number, now: number): void;
+  delete(digest: string): void;
+  clear(): void;
+}
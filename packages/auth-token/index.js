@@ -0,0 +1,223 @@
+// JWT verification shared by the services' authenticate middleware.
+//
+// A verified token is remembered by its SHA-256 digest until it expires, so
+// repeat requests cost one hash and a Map lookup instead of an HMAC verify
+// and a JSON parse. The cache is an LRU bounded by `maxEntries`; entries
+// past their `exp` are dropped when read and preferred for eviction.
+//
+// Revocation (logout) lives in Redis: `auth:revoked:<digest>` keys that
+// expire with the token, plus a pub/sub message so every process drops the
+// token from its cache at once. A token is checked against Redis once per
+// process, when it is first verified; after that revocations arrive by
+// message. Without REDIS_URL tokens are valid until they expire.
+
+const crypto = require('crypto');
+const jwt = require('jsonwebtoken');
+
+const REVOKED_PREFIX = 'auth:revoked:';
+const REVOCATION_CHANNEL = 'auth:revocations';
+
+// Tokens without an `exp` claim are re-verified at least this often
+const MAX_CACHE_AGE_MS = 5 * 60 * 1000;
+
+// How many of the least recently used entries to look at for an expired one
+const EVICTION_SCAN = 16;
+
+// Base64url SHA-256 of the token: what sessions and revocations are keyed by
+function tokenDigest(token) {
+  return crypto.createHash('sha256').update(token).digest('base64url');
+}
+
+class TokenCache {
+  constructor(maxEntries) {
+    this.maxEntries = maxEntries;
+    this.entries = new Map();
+  }
+
+  get size() {
+    return this.entries.size;
+  }
+
+  get(digest, now) {
+    const entry = this.entries.get(digest);
+    if (!entry) {
+      return undefined;
+    }
+    this.entries.delete(digest);
+    if (entry.expiresAt <= now) {
+      return undefined;
+    }
+    // Map keeps insertion order; re-inserting marks it most recently used
+    this.entries.set(digest, entry);
+    return entry.claims;
+  }
+
+  set(digest, claims, expiresAt, now) {
+    this.entries.delete(digest);
+    if (this.entries.size >= this.maxEntries) {
+      this.evict(now);
+    }
+    this.entries.set(digest, { claims, expiresAt });
+  }
+
+  evict(now) {
+    let scanned = 0;
+    for (const [digest, entry] of this.entries) {
+      if (entry.expiresAt <= now) {
+        this.entries.delete(digest);
+        return;
+      }
+      if (++scanned >= EVICTION_SCAN) {
+        break;
+      }
+    }
+    this.entries.delete(this.entries.keys().next().value);
+  }
+
+  delete(digest) {
+    this.entries.delete(digest);
+  }
+
+  clear() {
+    this.entries.clear();
+  }
+}
+
+function expiresAtOf(claims, now) {
+  const limit = now + MAX_CACHE_AGE_MS;
+  return typeof claims.exp === 'number' ? Math.min(claims.exp * 1000, limit) : limit;
+}
+
+function createTokenVerifier({ secret, maxEntries = 10000, redisUrl } = {}) {
+  const cache = new TokenCache(maxEntries);
+  // Revocations heard on the channel, digest -> expiry; blocks a token that
+  // is revoked while its first verification is waiting on Redis.
+  const revoked = new Map();
+  const metrics = { hits: 0, misses: 0, rejected: 0, revoked: 0, errors: 0, size: 0 };
+  let redis;
+
+  function forget(digest, expiresAt) {
+    cache.delete(digest);
+    revoked.set(digest, expiresAt);
+    if (revoked.size > maxEntries) {
+      const now = Date.now();
+      for (const [key, until] of revoked) {
+        if (until <= now) {
+          revoked.delete(key);
+        }
+      }
+    }
+  }
+
+  // Created on first use, after dotenv has loaded the environment
+  function client() {
+    if (redis === undefined) {
+      const url = redisUrl || process.env.REDIS_URL;
+      if (!url) {
+        redis = null;
+        return redis;
+      }
+      const Redis = require('ioredis');
+      redis = new Redis(url, { maxRetriesPerRequest: 1, enableOfflineQueue: false });
+      redis.on('error', () => {
+        metrics.errors++;
+      });
+
+      const subscriber = redis.duplicate();
+      let connected = false;
+      subscriber.on('error', () => {
+        metrics.errors++;
+      });
+      subscriber.on('ready', () => {
+        // Revocations sent while disconnected were missed
+        if (connected) {
+          cache.clear();
+        }
+        connected = true;
+      });
+      subscriber.on('message', (_channel, message) => {
+        const [digest, expiresAt] = message.split(' ');
+        forget(digest, Number(expiresAt));
+      });
+      subscriber.subscribe(REVOCATION_CHANNEL).catch(() => {
+        metrics.errors++;
+      });
+    }
+    return redis;
+  }
+
+  function isRevoked(digest, now) {
+    const until = revoked.get(digest);
+    return until !== undefined && until > now;
+  }
+
+  // Claims of a valid, unrevoked token, or null
+  async function verify(token) {
+    const digest = tokenDigest(token);
+    const now = Date.now();
+    const cached = cache.get(digest, now);
+    if (cached) {
+      metrics.hits++;
+      return cached;
+    }
+    metrics.misses++;
+    if (isRevoked(digest, now)) {
+      metrics.revoked++;
+      return null;
+    }
+
+    let claims;
+    try {
+      claims = jwt.verify(token, secret);
+    } catch {
+      metrics.rejected++;
+      return null;
+    }
+
+    const redisClient = client();
+    if (redisClient) {
+      try {
+        if (await redisClient.exists(REVOKED_PREFIX + digest)) {
+          metrics.revoked++;
+          return null;
+        }
+      } catch {
+        // Redis is down: accept the verified token but keep re-checking
+        // (fails open; see README)
+        metrics.errors++;
+        return claims;
+      }
+    }
+    if (!isRevoked(digest, Date.now())) {
+      cache.set(digest, claims, expiresAtOf(claims, now), now);
+      metrics.size = cache.size;
+    }
+    return claims;
+  }
+
+  async function revoke(token) {
+    const digest = tokenDigest(token);
+    const claims = jwt.decode(token);
+    const expiresAt = expiresAtOf(claims || {}, Date.now());
+    forget(digest, expiresAt);
+    metrics.size = cache.size;
+
+    // The session is already gone and this process forgot the token, so a
+    // Redis failure does not fail the logout; other processes keep
+    // accepting the token until it expires (see README).
+    const redisClient = client();
+    if (redisClient) {
+      try {
+        await redisClient.set(REVOKED_PREFIX + digest, '1', 'PXAT', expiresAt);
+        await redisClient.publish(REVOCATION_CHANNEL, `${digest} ${expiresAt}`);
+      } catch (error) {
+        metrics.errors++;
+        console.error('Token revocation not shared, Redis unavailable:', error);
+      }
+    }
+  }
+
+  return { verify, revoke, metrics };
+}
+
+module.exports = { createTokenVerifier, tokenDigest, TokenCache };
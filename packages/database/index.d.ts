@@ -0,0 +1,8 @@
+export function pooledDatabaseUrl(env?: NodeJS.ProcessEnv): string;
+
+export function getPrismaClient<T>(
+  PrismaClient: new (options?: any) => T,
+  options?: Record<string, unknown>
+): T;
+
+export function disconnectPrismaClient(): Promise<void>;
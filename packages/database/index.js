@@ -0,0 +1,76 @@
+// One pooled PrismaClient per process, shared by every module of a service.
+//
+// Each `new PrismaClient()` opens its own connection pool, so a service that
+// constructs one per module multiplies its connections by the number of
+// modules, and again by the number of replicas. Services pass in their own
+// generated PrismaClient class (their schema and client version) and get the
+// same instance back everywhere.
+//
+// Pool settings come from the environment and are applied as Prisma
+// connection URL parameters, unless DATABASE_URL already sets them:
+//
+//   DATABASE_POOL_SIZE        connection_limit per process   (default 5)
+//   DATABASE_POOL_TIMEOUT     pool_timeout, seconds          (default 10)
+//   DATABASE_CONNECT_TIMEOUT  connect_timeout, seconds       (default 5)
+//   DATABASE_PGBOUNCER        "true" behind PgBouncer in transaction mode
+
+const DEFAULTS = {
+  connection_limit: 5,
+  pool_timeout: 10,
+  connect_timeout: 5,
+};
+
+const ENV_PARAMS = {
+  connection_limit: 'DATABASE_POOL_SIZE',
+  pool_timeout: 'DATABASE_POOL_TIMEOUT',
+  connect_timeout: 'DATABASE_CONNECT_TIMEOUT',
+};
+
+const INSTANCE = Symbol.for('sarva.database.prisma');
+
+function pooledDatabaseUrl(env = process.env) {
+  if (!env.DATABASE_URL) {
+    throw new Error('DATABASE_URL is not set');
+  }
+  const url = new URL(env.DATABASE_URL);
+  for (const [param, name] of Object.entries(ENV_PARAMS)) {
+    if (!url.searchParams.has(param)) {
+      url.searchParams.set(param, String(env[name] || DEFAULTS[param]));
+    }
+  }
+  // PgBouncer in transaction mode cannot keep prepared statements across
+  // transactions; this makes Prisma stop relying on them.
+  if (env.DATABASE_PGBOUNCER === 'true' && !url.searchParams.has('pgbouncer')) {
+    url.searchParams.set('pgbouncer', 'true');
+  }
+  return url.toString();
+}
+
+// The client is created on first use rather than on import, so services
+// that import their modules before calling dotenv.config() still see the
+// pool settings from .env.
+function getPrismaClient(PrismaClient, options = {}) {
+  if (!globalThis[INSTANCE]) {
+    const holder = { client: undefined };
+    const client = () =>
+      holder.client || (holder.client = new PrismaClient({ datasourceUrl: pooledDatabaseUrl(), ...options }));
+    const proxy = new Proxy(holder, {
+      get(_target, property) {
+        const value = Reflect.get(client(), property);
+        return typeof value === 'function' ? value.bind(holder.client) : value;
+      },
+    });
+    globalThis[INSTANCE] = { holder, proxy };
+  }
+  return globalThis[INSTANCE].proxy;
+}
+
+async function disconnectPrismaClient() {
+  const instance = globalThis[INSTANCE];
+  globalThis[INSTANCE] = undefined;
+  if (instance && instance.holder.client) {
+    await instance.holder.client.$disconnect();
+  }
+}
+
+module.exports = { getPrismaClient, disconnectPrismaClient, pooledDatabaseUrl };
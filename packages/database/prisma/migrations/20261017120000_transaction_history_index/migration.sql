@@ -0,0 +1,37 @@
+-- The transactions table was created by the wallet service's own schema
+-- (prisma db push), so the enum, table and foreign key are only created
+-- where they are missing.
+
+-- CreateEnum
+DO $$ BEGIN
+    CREATE TYPE "TransactionType" AS ENUM ('DEPOSIT', 'WITHDRAWAL', 'TRANSFER_IN', 'TRANSFER_OUT');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+-- CreateTable
+CREATE TABLE IF NOT EXISTS "transactions" (
+    "id" TEXT NOT NULL,
+    "walletId" TEXT NOT NULL,
+    "type" "TransactionType" NOT NULL,
+    "amount" DECIMAL(15,2) NOT NULL,
+    "balanceBefore" DECIMAL(15,2) NOT NULL,
+    "balanceAfter" DECIMAL(15,2) NOT NULL,
+    "description" TEXT,
+    "recipientId" TEXT,
+    "status" TEXT NOT NULL DEFAULT 'completed',
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "transactions_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+-- Serves keyset-paginated history: WHERE "walletId" = $1 AND ("createdAt", "id") < ($2, $3)
+-- ORDER BY "createdAt" DESC, "id" DESC. On a large live table, build it first with
+-- CREATE INDEX CONCURRENTLY under the same name; this statement then does nothing.
+CREATE INDEX IF NOT EXISTS "transactions_walletId_createdAt_id_idx" ON "transactions"("walletId", "createdAt", "id");
+
+-- AddForeignKey
+DO $$ BEGIN
+    ALTER TABLE "transactions" ADD CONSTRAINT "transactions_walletId_fkey" FOREIGN KEY ("walletId") REFERENCES "wallets"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
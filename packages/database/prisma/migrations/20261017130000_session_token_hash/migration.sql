@@ -0,0 +1,13 @@
+-- Sessions are looked up by a SHA-256 digest of the token (base64url, no
+-- padding; see packages/auth-token) instead of the raw JWT. Existing rows
+-- are hashed in place so sessions issued before the change keep working.
+
+ALTER TABLE "sessions" RENAME COLUMN "token" TO "tokenHash";
+ALTER TABLE "sessions" RENAME COLUMN "refreshToken" TO "refreshTokenHash";
+
+UPDATE "sessions" SET
+    "tokenHash" = rtrim(translate(encode(sha256(convert_to("tokenHash", 'UTF8')), 'base64'), '+/', '-_'), '='),
+    "refreshTokenHash" = rtrim(translate(encode(sha256(convert_to("refreshTokenHash", 'UTF8')), 'base64'), '+/', '-_'), '=');
+
+ALTER INDEX "sessions_token_key" RENAME TO "sessions_tokenHash_key";
+ALTER INDEX "sessions_refreshToken_key" RENAME TO "sessions_refreshTokenHash_key";
@@ -0,0 +1,7 @@
+-- Proposed by python3 -m scaffold.indexes:
+-- foreign key to users has no index
+-- On a large live table, build it first with CREATE INDEX CONCURRENTLY under
+-- the same name; this statement then does nothing.
+
+-- CreateIndex
+CREATE INDEX IF NOT EXISTS "sessions_userId_idx" ON "sessions"("userId");
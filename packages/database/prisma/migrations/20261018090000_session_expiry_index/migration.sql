@@ -0,0 +1,8 @@
+-- The auth-service session reaper deletes expired sessions in batches of
+-- WHERE "expiresAt" < now() ORDER BY "expiresAt" LIMIT n; this index lets
+-- each batch read only the rows it deletes. On a large live table, build it
+-- first with CREATE INDEX CONCURRENTLY under the same name; this statement
+-- then does nothing.
+
+-- CreateIndex
+CREATE INDEX IF NOT EXISTS "sessions_expiresAt_idx" ON "sessions"("expiresAt");
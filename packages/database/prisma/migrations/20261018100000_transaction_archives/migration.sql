@@ -0,0 +1,26 @@
+-- Catalog of monthly transactions partitions archived to Parquet by
+-- python3 -m scaffold.archive. A row is written in the same transaction
+-- that detaches its partition, so every transaction is either in the
+-- table or in exactly one archive.
+
+-- CreateTable
+CREATE TABLE "transaction_archives" (
+    "id" TEXT NOT NULL,
+    "partition" TEXT NOT NULL,
+    "rangeStart" TIMESTAMP(3) NOT NULL,
+    "rangeEnd" TIMESTAMP(3) NOT NULL,
+    "location" TEXT NOT NULL,
+    "buckets" INTEGER NOT NULL,
+    "rowCount" INTEGER NOT NULL,
+    "bytes" BIGINT NOT NULL,
+    "compression" TEXT NOT NULL,
+    "archivedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "transaction_archives_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "transaction_archives_partition_key" ON "transaction_archives"("partition");
+
+-- CreateIndex
+CREATE INDEX "transaction_archives_rangeStart_idx" ON "transaction_archives"("rangeStart");
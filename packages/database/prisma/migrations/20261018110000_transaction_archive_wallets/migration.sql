@@ -0,0 +1,19 @@
+-- Which wallets have rows in each archived month, written by
+-- python3 -m scaffold.archive in the transaction that records the archive.
+-- The wallet service reads only the months listed for the wallet, so a
+-- wallet with no archived history never reads S3.
+
+-- CreateTable
+CREATE TABLE "transaction_archive_wallets" (
+    "walletId" TEXT NOT NULL,
+    "rangeStart" TIMESTAMP(3) NOT NULL,
+    "archiveId" TEXT NOT NULL,
+
+    CONSTRAINT "transaction_archive_wallets_pkey" PRIMARY KEY ("walletId","rangeStart")
+);
+
+-- CreateIndex
+CREATE INDEX "transaction_archive_wallets_archiveId_idx" ON "transaction_archive_wallets"("archiveId");
+
+-- AddForeignKey
+ALTER TABLE "transaction_archive_wallets" ADD CONSTRAINT "transaction_archive_wallets_archiveId_fkey" FOREIGN KEY ("archiveId") REFERENCES "transaction_archives"("id") ON DELETE CASCADE ON UPDATE CASCADE;
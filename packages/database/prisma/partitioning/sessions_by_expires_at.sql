@@ -0,0 +1,65 @@
+-- Opt-in: turns sessions into daily range partitions on "expiresAt", so the
+-- auth-service reaper drops expired days whole instead of deleting rows.
+-- This is not a migration. Run it once, by hand, in a maintenance window:
+--
+--   psql "$DATABASE_URL" -f packages/database/prisma/partitioning/sessions_by_expires_at.sql
+--
+-- Postgres only allows unique constraints that include the partition key,
+-- so the primary key becomes (id, "expiresAt") and the token digests get
+-- plain indexes. They are SHA-256 digests of tokens carrying a random jti,
+-- so nothing relies on the database to keep them unique. schema.prisma
+-- still describes the unpartitioned table: apply later migrations with
+-- `prisma migrate deploy`, since `migrate dev` would report this as drift.
+--
+-- Sessions that already expired are not copied. Partitions are created
+-- through 14 days ahead; from then on the reaper keeps
+-- SESSION_PARTITION_DAYS_AHEAD days ahead. Sessions expiring outside every
+-- partition (the reaper not running for longer than that, a lifetime
+-- longer than the horizon) go to sessions_default instead of failing the
+-- login; the reaper's next pass moves them into partitions of their own
+-- days. Partition bounds are UTC days.
+
+BEGIN;
+
+LOCK TABLE sessions IN ACCESS EXCLUSIVE MODE;
+
+CREATE TABLE sessions_partitioned (
+    "id" TEXT NOT NULL,
+    "userId" TEXT NOT NULL,
+    "tokenHash" TEXT NOT NULL,
+    "refreshTokenHash" TEXT NOT NULL,
+    "expiresAt" TIMESTAMP(3) NOT NULL,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE ("expiresAt");
+
+DO $$
+DECLARE
+    day date := (now() AT TIME ZONE 'UTC')::date;
+    last date := greatest((SELECT max("expiresAt") FROM sessions)::date,
+                          (now() AT TIME ZONE 'UTC')::date + 14);
+BEGIN
+    WHILE day <= last LOOP
+        EXECUTE format('CREATE TABLE %I PARTITION OF sessions_partitioned FOR VALUES FROM (%L) TO (%L)',
+                       'sessions_p' || to_char(day, 'YYYYMMDD'), day, day + 1);
+        day := day + 1;
+    END LOOP;
+END $$;
+
+CREATE TABLE sessions_default PARTITION OF sessions_partitioned DEFAULT;
+
+INSERT INTO sessions_partitioned
+SELECT "id", "userId", "tokenHash", "refreshTokenHash", "expiresAt", "createdAt"
+FROM sessions
+WHERE "expiresAt" >= (now() AT TIME ZONE 'UTC')::date;
+
+DROP TABLE sessions;
+ALTER TABLE sessions_partitioned RENAME TO sessions;
+
+ALTER TABLE "sessions" ADD CONSTRAINT "sessions_pkey" PRIMARY KEY ("id", "expiresAt");
+CREATE INDEX "sessions_tokenHash_key" ON "sessions"("tokenHash");
+CREATE INDEX "sessions_refreshTokenHash_key" ON "sessions"("refreshTokenHash");
+CREATE INDEX "sessions_userId_idx" ON "sessions"("userId");
+CREATE INDEX "sessions_expiresAt_idx" ON "sessions"("expiresAt");
+ALTER TABLE "sessions" ADD CONSTRAINT "sessions_userId_fkey" FOREIGN KEY ("userId") REFERENCES "users"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+COMMIT;
@@ -0,0 +1,68 @@
+-- Opt-in: turns transactions into monthly range partitions on "createdAt",
+-- so python3 -m scaffold.archive can move closed months to Parquet and
+-- detach them. This is not a migration. Run it once, by hand, in a
+-- maintenance window (every row is copied under an exclusive lock):
+--
+--   psql "$DATABASE_URL" -f packages/database/prisma/partitioning/transactions_by_month.sql
+--
+-- Postgres only allows unique constraints that include the partition key,
+-- so the primary key becomes (id, "createdAt"). Ids are UUIDs generated per
+-- row, so nothing relies on the database to keep them unique.
+-- schema.prisma still describes the unpartitioned table: apply later
+-- migrations with `prisma migrate deploy`, since `migrate dev` would
+-- report this as drift.
+--
+-- Partitions are created from the oldest row's month through three months
+-- ahead, and scaffold.archive keeps --ahead months ahead from then on.
+-- Rows dated outside every partition (the archiver not running for months,
+-- a backdated import) go to transactions_default instead of failing; the
+-- archiver's next run moves them into partitions of their own months.
+-- Partition bounds are UTC months.
+
+BEGIN;
+
+LOCK TABLE transactions IN ACCESS EXCLUSIVE MODE;
+
+CREATE TABLE transactions_partitioned (
+    "id" TEXT NOT NULL,
+    "walletId" TEXT NOT NULL,
+    "type" "TransactionType" NOT NULL,
+    "amount" DECIMAL(15,2) NOT NULL,
+    "balanceBefore" DECIMAL(15,2) NOT NULL,
+    "balanceAfter" DECIMAL(15,2) NOT NULL,
+    "description" TEXT,
+    "recipientId" TEXT,
+    "status" TEXT NOT NULL DEFAULT 'completed',
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE ("createdAt");
+
+DO $$
+DECLARE
+    month date := date_trunc('month', coalesce((SELECT min("createdAt") FROM transactions),
+                                               now() AT TIME ZONE 'UTC'))::date;
+    last date := date_trunc('month', now() AT TIME ZONE 'UTC')::date + interval '3 months';
+BEGIN
+    WHILE month <= last LOOP
+        EXECUTE format('CREATE TABLE %I PARTITION OF transactions_partitioned FOR VALUES FROM (%L) TO (%L)',
+                       'transactions_p' || to_char(month, 'YYYYMM'), month, month + interval '1 month');
+        month := month + interval '1 month';
+    END LOOP;
+END $$;
+
+CREATE TABLE transactions_default PARTITION OF transactions_partitioned DEFAULT;
+
+INSERT INTO transactions_partitioned
+SELECT "id", "walletId", "type", "amount", "balanceBefore", "balanceAfter",
+       "description", "recipientId", "status", "createdAt"
+FROM transactions;
+
+DROP TABLE transactions;
+ALTER TABLE transactions_partitioned RENAME TO transactions;
+
+ALTER TABLE "transactions" ADD CONSTRAINT "transactions_pkey" PRIMARY KEY ("id", "createdAt");
+CREATE INDEX "transactions_walletId_createdAt_id_idx" ON "transactions"("walletId", "createdAt", "id");
+ALTER TABLE "transactions" ADD CONSTRAINT "transactions_walletId_fkey" FOREIGN KEY ("walletId") REFERENCES "wallets"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+COMMIT;
+
+ANALYZE transactions;
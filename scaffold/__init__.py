@@ -0,0 +1,37 @@
+"""Shared generation core for the Sarva scaffolding scripts."""
+
+from .core import (
+    CREATED,
+    MANIFEST_NAME,
+    UNCHANGED,
+    UPDATED,
+    Manifest,
+    content_hash,
+    report,
+    write_artifacts,
+    write_if_changed,
+)
+from .emit import dump_yaml, dump_yaml_all, iter_yaml_mapping, literal
+from .graph import GRAPH, BuildGraph, GraphError, Node, artifact, option
+
+__all__ = [
+    'CREATED',
+    'GRAPH',
+    'MANIFEST_NAME',
+    'UNCHANGED',
+    'UPDATED',
+    'BuildGraph',
+    'GraphError',
+    'Manifest',
+    'Node',
+    'artifact',
+    'dump_yaml',
+    'dump_yaml_all',
+    'iter_yaml_mapping',
+    'literal',
+    'option',
+    'content_hash',
+    'report',
+    'write_artifacts',
+    'write_if_changed',
+]
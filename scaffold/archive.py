@@ -0,0 +1,360 @@
+"""Archive closed monthly transactions partitions to Parquet in MinIO.
+
+    python3 -m scaffold.archive --dsn "$DATABASE_URL"               # archive, then detach and drop
+    python3 -m scaffold.archive --hot-months 6 --keep-detached --dry-run
+
+Run it from cron at least monthly, once transactions has been converted
+with packages/database/prisma/partitioning/transactions_by_month.sql.
+Each run:
+
+1. moves rows that landed in the default partition (dated past the last
+   partition, or before the first) into partitions of their own months,
+   then creates the monthly partitions for the next ``--ahead`` months;
+2. picks partitions older than the ``--hot-months`` most recent months;
+3. streams each one through a server-side cursor, ordered by wallet, into
+   ``--buckets`` Parquet files (a wallet's rows all land in bucket
+   ``md5(walletId) % buckets``, so reading one wallet back fetches one
+   file), and uploads them to ``s3://BUCKET/PREFIX/YYYY-MM/``;
+4. checks that the uploaded row count matches the partition, then, in
+   one transaction, records the archive in ``transaction_archives``, lists
+   the month's wallets in ``transaction_archive_wallets`` and detaches the
+   partition; and
+5. drops the detached table, unless ``--keep-detached`` is given.
+
+The wallet service reads only the months listed for a wallet and serves
+history pages older than the table from these files. Anything else, such as
+DuckDB or Spark, can read them as ordinary Parquet.
+
+Requires psycopg 3, pyarrow and boto3. S3 settings come from the
+environment like the services: AWS_S3_ENDPOINT, AWS_S3_BUCKET,
+AWS_REGION, AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY.
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from scaffold.ledger import LedgerError, connect
+
+DEFAULT_BUCKETS = 64
+DEFAULT_PREFIX = 'archive/transactions'
+ROW_GROUP_ROWS = 50000
+FETCH_ROWS = 20000
+# The wallet service's Parquet reader handles these codecs
+COMPRESSIONS = ('snappy', 'gzip')
+
+COLUMNS = ('id', '"walletId"', 'type::text', 'amount', '"balanceBefore"', '"balanceAfter"',
+           'description', '"recipientId"', 'status', '"createdAt"')
+
+Partition = namedtuple('Partition', 'name start end')
+Archive = namedtuple('Archive', 'partition rows bytes location')
+# Rows of one month in the default partition; ``archived`` months stay there
+Stray = namedtuple('Stray', 'partition rows archived')
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def wallet_bucket(wallet_id, buckets):
+    """Bucket of a wallet; services/wallet-service computes the same."""
+    return int(hashlib.md5(wallet_id.encode()).hexdigest()[:8], 16) % buckets
+
+
+def month_start(moment, offset=0):
+    """First instant of the month ``offset`` months after ``moment``'s."""
+    month = moment.year * 12 + moment.month - 1 + offset
+    return datetime(month // 12, month % 12 + 1, 1)
+
+
+def partition_name(start):
+    return f'transactions_p{start:%Y%m}'
+
+
+def partitions(conn):
+    """Attached partitions of transactions, oldest first."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table"
+                       " WHERE partrelid = to_regclass('transactions'))")
+        if not cursor.fetchone()[0]:
+            raise ArchiveError('transactions is not partitioned; run '
+                               'packages/database/prisma/partitioning/transactions_by_month.sql first')
+        cursor.execute("""
+            SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass('transactions')
+        """)
+        found = []
+        for (name,) in cursor.fetchall():
+            try:
+                start = datetime.strptime(name, 'transactions_p%Y%m')
+            except ValueError:
+                continue
+            found.append(Partition(name, start, month_start(start, 1)))
+    return sorted(found, key=lambda partition: partition.start)
+
+
+def default_partition(conn):
+    """Name of the default partition of transactions, or None."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT NULLIF(partdefid, 0)::regclass::text FROM pg_partitioned_table"
+                       " WHERE partrelid = to_regclass('transactions')")
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def split_default(conn):
+    """Moves default-partition rows into partitions of their months.
+
+    A month can only get its partition once the default holds none of its
+    rows, so each month is moved in one transaction: a standalone table is
+    filled from the default and attached, which also builds its indexes.
+    Months already archived are left in the default: a new partition for
+    them would be archived again over the existing files.
+    """
+    default = default_partition(conn)
+    if default is None:
+        return []
+    with conn.cursor() as cursor:
+        cursor.execute(f'SELECT date_trunc(\'month\', "createdAt"), count(*) FROM {default} GROUP BY 1 ORDER BY 1')
+        months = cursor.fetchall()
+        cursor.execute('SELECT "rangeStart" FROM transaction_archives')
+        archived = {start for (start,) in cursor.fetchall()}
+    conn.rollback()
+
+    strays = []
+    for start, rows in months:
+        partition = Partition(partition_name(start), start, month_start(start, 1))
+        strays.append(Stray(partition, rows, start in archived))
+        if start in archived:
+            continue
+        bounds = f"FOR VALUES FROM ('{partition.start:%Y-%m-%d}') TO ('{partition.end:%Y-%m-%d}')"
+        with conn.transaction():
+            # Blocks writes to the default while rows move; give up rather
+            # than queue writers behind it, and let the next run retry.
+            conn.execute("SET LOCAL lock_timeout = '5s'")
+            conn.execute(f'CREATE TABLE "{partition.name}" (LIKE transactions INCLUDING DEFAULTS)')
+            conn.execute(f'WITH moved AS (DELETE FROM {default} WHERE "createdAt" >= %s AND "createdAt" < %s'
+                         f' RETURNING *) INSERT INTO "{partition.name}" SELECT * FROM moved',
+                         (partition.start, partition.end))
+            conn.execute(f'ALTER TABLE transactions ATTACH PARTITION "{partition.name}" {bounds}')
+    return strays
+
+
+def create_ahead(conn, now, ahead):
+    """Creates missing partitions from this month through ``ahead`` months on."""
+    existing = {partition.name for partition in partitions(conn)}
+    created = []
+    for offset in range(ahead + 1):
+        start = month_start(now, offset)
+        name = partition_name(start)
+        if name not in existing:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF transactions'
+                         f" FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{month_start(start, 1):%Y-%m-%d}')")
+            created.append(name)
+    conn.commit()
+    return created
+
+
+def parquet_schema():
+    import pyarrow as pa
+
+    money = pa.decimal128(15, 2)
+    return pa.schema([
+        ('id', pa.string()), ('walletId', pa.string()), ('type', pa.string()),
+        ('amount', money), ('balanceBefore', money), ('balanceAfter', money),
+        ('description', pa.string()), ('recipientId', pa.string()), ('status', pa.string()),
+        ('createdAt', pa.timestamp('ms')),
+    ])
+
+
+def export_partition(conn, partition, directory, buckets, compression):
+    """Writes the partition into per-bucket Parquet files; returns (paths, rows)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    names = schema.names
+    writers, pending, paths = {}, {}, {}
+    rows = 0
+
+    def flush(bucket):
+        if bucket not in writers:
+            paths[bucket] = os.path.join(directory, f'bucket={bucket:03d}.parquet')
+            writers[bucket] = pq.ParquetWriter(paths[bucket], schema, compression=compression)
+        columns = list(zip(*pending.pop(bucket)))
+        writers[bucket].write_table(pa.Table.from_arrays(
+            [pa.array(column, type=schema.field(i).type) for i, column in enumerate(columns)], names=names))
+
+    # Wallet order keeps each wallet's rows together and sorted by time,
+    # which both compresses well and lets readers stop early.
+    with conn.transaction():
+        cursor = conn.cursor(name=f'archive_{partition.name}')
+        cursor.itersize = FETCH_ROWS
+        cursor.execute(f'SELECT {", ".join(COLUMNS)} FROM "{partition.name}"'
+                       ' ORDER BY "walletId", "createdAt", id')
+        for row in cursor:
+            bucket = wallet_bucket(row[1], buckets)
+            pending.setdefault(bucket, []).append(row)
+            rows += 1
+            if len(pending[bucket]) >= ROW_GROUP_ROWS:
+                flush(bucket)
+        cursor.close()
+    for bucket in list(pending):
+        flush(bucket)
+    for writer in writers.values():
+        writer.close()
+    return paths, rows
+
+
+def s3_client():
+    try:
+        import boto3
+    except ImportError:
+        raise ArchiveError('boto3 is not installed; pip install boto3') from None
+    from botocore.config import Config
+
+    return boto3.client('s3', endpoint_url=os.environ.get('AWS_S3_ENDPOINT') or None,
+                        region_name=os.environ.get('AWS_REGION', 'us-east-1'),
+                        config=Config(s3={'addressing_style': 'path'}))
+
+
+def upload(s3, bucket, prefix, partition, paths):
+    """Uploads the files; returns (location, bytes, rows read back from their footers)."""
+    import pyarrow.parquet as pq
+
+    key = f'{prefix.strip("/")}/{partition.start:%Y-%m}'
+    total_bytes = total_rows = 0
+    for path in paths.values():
+        total_rows += pq.ParquetFile(path).metadata.num_rows
+        total_bytes += os.path.getsize(path)
+        s3.upload_file(path, bucket, f'{key}/{os.path.basename(path)}')
+    for path in paths.values():
+        name = os.path.basename(path)
+        head = s3.head_object(Bucket=bucket, Key=f'{key}/{name}')
+        if head['ContentLength'] != os.path.getsize(path):
+            raise ArchiveError(f's3://{bucket}/{key}/{name}: size mismatch after upload')
+    return f's3://{bucket}/{key}', total_bytes, total_rows
+
+
+def detach(conn, partition, location, buckets, rows, size, compression, keep):
+    """Records the archive and its wallets and detaches the partition in one transaction."""
+    archive_id = str(uuid.uuid4())
+    with conn.transaction():
+        # A brief exclusive lock on transactions; give up rather than queue
+        # writers behind it, and let the next run retry.
+        conn.execute("SET LOCAL lock_timeout = '5s'")
+        conn.execute('INSERT INTO transaction_archives (id, partition, "rangeStart", "rangeEnd", location,'
+                     ' buckets, "rowCount", bytes, compression)'
+                     ' VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)',
+                     (archive_id, partition.name, partition.start, partition.end, location, buckets, rows,
+                      size, compression))
+        # Reads only the partition, so the lock on transactions is taken last
+        conn.execute('INSERT INTO transaction_archive_wallets ("walletId", "rangeStart", "archiveId")'
+                     f' SELECT DISTINCT "walletId", %s::timestamp, %s FROM "{partition.name}"',
+                     (partition.start, archive_id))
+        conn.execute(f'ALTER TABLE transactions DETACH PARTITION "{partition.name}"')
+    if not keep:
+        conn.execute(f'DROP TABLE "{partition.name}"')
+        conn.commit()
+
+
+def archive(dsn, schema=None, hot_months=3, ahead=3, buckets=DEFAULT_BUCKETS, bucket=None,
+            prefix=DEFAULT_PREFIX, compression='snappy', keep=False, dry_run=False, now=None):
+    """Returns (partitions created, default-partition rows moved or kept, archives written)."""
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    cutoff = month_start(now, 1 - hot_months)
+    if not dry_run:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ArchiveError('pyarrow is not installed; pip install pyarrow') from None
+        bucket = bucket or os.environ.get('AWS_S3_BUCKET')
+        if not bucket:
+            raise ArchiveError('--bucket or AWS_S3_BUCKET is required')
+        s3 = s3_client()
+
+    archives = []
+    with connect(dsn, schema) as conn:
+        strays = [] if dry_run else split_default(conn)
+        created = [] if dry_run else create_ahead(conn, now, ahead)
+        for partition in partitions(conn):
+            if partition.end > cutoff:
+                break
+            if dry_run:
+                with conn.cursor() as cursor:
+                    cursor.execute(f'SELECT count(*) FROM "{partition.name}"')
+                    archives.append(Archive(partition, cursor.fetchone()[0], None, None))
+                conn.rollback()
+                continue
+            with tempfile.TemporaryDirectory(prefix=f'{partition.name}-') as directory:
+                paths, rows = export_partition(conn, partition, directory, buckets, compression)
+                location, size, uploaded = upload(s3, bucket, prefix, partition, paths)
+            with conn.cursor() as cursor:
+                cursor.execute(f'SELECT count(*) FROM "{partition.name}"')
+                (count,) = cursor.fetchone()
+            conn.rollback()
+            if not rows == uploaded == count:
+                raise ArchiveError(f'{partition.name}: {count} rows in the table, {rows} exported, '
+                                   f'{uploaded} uploaded; left attached')
+            detach(conn, partition, location, buckets, rows, size, compression, keep)
+            archives.append(Archive(partition, rows, size, location))
+    return created, strays, archives
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m scaffold.archive', description=__doc__.splitlines()[0])
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'),
+                        help='PostgreSQL URL (default: $DATABASE_URL)')
+    parser.add_argument('--schema', help='search_path to use (default: ?schema= in the URL)')
+    parser.add_argument('--hot-months', type=int, default=3,
+                        help='most recent months kept in the table, including this one (default: 3)')
+    parser.add_argument('--ahead', type=int, default=3, help='months of partitions to create ahead (default: 3)')
+    parser.add_argument('--buckets', type=int, default=DEFAULT_BUCKETS,
+                        help=f'Parquet files per month, by wallet (default: {DEFAULT_BUCKETS})')
+    parser.add_argument('--bucket', help='S3 bucket (default: $AWS_S3_BUCKET)')
+    parser.add_argument('--prefix', default=DEFAULT_PREFIX, help=f'key prefix (default: {DEFAULT_PREFIX})')
+    parser.add_argument('--compression', choices=COMPRESSIONS, default='snappy')
+    parser.add_argument('--keep-detached', action='store_true', help='keep archived partitions as plain tables')
+    parser.add_argument('--dry-run', action='store_true', help='list what would be archived')
+    args = parser.parse_args(argv)
+
+    if not args.dsn:
+        parser.error('--dsn or DATABASE_URL is required')
+    if args.hot_months < 1 or args.buckets < 1 or args.ahead < 0:
+        parser.error('--hot-months and --buckets must be positive and --ahead not negative')
+    started = time.perf_counter()
+    try:
+        created, strays, archives = archive(args.dsn, args.schema, args.hot_months, args.ahead,
+                                            args.buckets, args.bucket, args.prefix, args.compression,
+                                            args.keep_detached, args.dry_run)
+    except (LedgerError, ArchiveError) as exc:
+        print(f'python -m scaffold.archive: {exc}', file=sys.stderr)
+        return 2
+
+    print(f"✅ Archive{' (dry run)' if args.dry_run else ''} ({time.perf_counter() - started:.1f}s):")
+    for stray in strays:
+        if stray.archived:
+            print(f'   ⚠️  default partition holds {stray.rows:,} rows of archived month '
+                  f'{stray.partition.start:%Y-%m}; left in place')
+        else:
+            print(f'   ✅ moved {stray.rows:,} rows from the default partition into {stray.partition.name}')
+    for name in created:
+        print(f'   ✅ created {name}')
+    for item in archives:
+        if item.location is None:
+            print(f'   would archive {item.partition.name}: {item.rows:,} rows')
+        else:
+            print(f'   ✅ {item.partition.name}: {item.rows:,} rows, {item.bytes / 1e6:.1f} MB -> {item.location}')
+    if not archives:
+        print('   nothing to archive')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
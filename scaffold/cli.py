@@ -0,0 +1,89 @@
+"""``sarva-scaffold``: regenerate repository artifacts in a single process.
+
+Usage::
+
+    python -m scaffold                      # build everything
+    python -m scaffold --only ci-workflow   # one artifact (name or path)
+    python -m scaffold --set test_shards=6   # generator option
+    python -m scaffold --list
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+
+from .core import report
+from .graph import GRAPH, GraphError
+
+# Modules whose import registers artifacts on GRAPH.
+ARTIFACT_MODULES = ('script', 'script_1', 'script_2', 'script_3')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_artifacts(modules=ARTIFACT_MODULES):
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    for name in modules:
+        importlib.import_module(name)
+    return GRAPH
+
+
+def parse_option(text):
+    name, sep, value = text.partition('=')
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {text!r}")
+    if value.lower() in ('true', 'false'):
+        return name, value.lower() == 'true'
+    try:
+        return name, int(value)
+    except ValueError:
+        return name, value
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='sarva-scaffold',
+        description='Render Sarva repository artifacts and write the ones that changed.')
+    parser.add_argument('--only', action='append', metavar='ARTIFACT',
+                        help='build only this artifact (name or output path); repeatable')
+    parser.add_argument('--list', action='store_true',
+                        help='list registered artifacts and exit')
+    parser.add_argument('--root', default='.',
+                        help='directory to write artifacts into (default: current directory)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='render threads (default: Python thread pool default)')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        type=parse_option, dest='options',
+                        help='set a generator option (e.g. test_shards=6); repeatable')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='only report files that changed')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    graph = load_artifacts()
+    graph.options.update(args.options)
+
+    if args.list:
+        for node in graph.nodes.values():
+            deps = f"  <- {', '.join(node.deps)}" if node.deps else ''
+            target = node.path or ('(multiple files)' if node.multi else '(data)')
+            print(f"{node.name:<26} {target}{deps}")
+        return 0
+
+    started = time.perf_counter()
+    try:
+        results = graph.build(args.only, root=args.root, jobs=args.jobs)
+    except GraphError as exc:
+        print(f"sarva-scaffold: {exc}", file=sys.stderr)
+        return 2
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if args.quiet:
+        results = [r for r in results if r[1] != 'unchanged']
+    report(results, f"✅ Scaffold ({len(results)} files, {elapsed_ms:.1f} ms):")
+    return 0
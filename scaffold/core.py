@@ -0,0 +1,164 @@
+"""Incremental write path shared by the Sarva scaffolders.
+
+Every generator renders its artifacts to text and hands them to
+``write_artifacts``. Rendered content is hashed and recorded in a manifest
+at the output root; a file is only rewritten when its content actually
+changed, so a no-op regen leaves mtimes alone and does not invalidate
+turbo/docker build caches or editor file watchers.
+
+Heavier stdlib modules (json, tempfile) are imported on first use so that
+tooling which only lists artifacts stays cheap to start.
+"""
+
+import hashlib
+import os
+
+MANIFEST_NAME = '.scaffold-manifest.json'
+MANIFEST_VERSION = 1
+
+CREATED = 'created'
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+
+
+def content_hash(data):
+    """Return the sha256 hex digest of ``data`` (str or bytes)."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def _atomic_write(path, data):
+    import tempfile
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.scaffold-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp creates 0600 files; keep the permissions open() would give.
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class Manifest:
+    """Content hashes of generated files, keyed by path relative to ``root``.
+
+    Each entry also stores the size and mtime the file had right after it
+    was last written or verified, so an untouched file can be skipped
+    without reading it back from disk.
+    """
+
+    def __init__(self, root='.', entries=None):
+        self.root = root
+        self.entries = dict(entries or {})
+        self._dirty = False
+
+    @property
+    def path(self):
+        return os.path.join(self.root, MANIFEST_NAME)
+
+    @classmethod
+    def load(cls, root='.'):
+        import json
+
+        manifest = cls(root)
+        try:
+            with open(manifest.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        if data.get('version') == MANIFEST_VERSION:
+            manifest.entries = data.get('files', {})
+        return manifest
+
+    def get(self, relpath):
+        return self.entries.get(relpath)
+
+    def record(self, relpath, digest):
+        st = os.stat(os.path.join(self.root, relpath))
+        entry = {'sha256': digest, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        if self.entries.get(relpath) != entry:
+            self.entries[relpath] = entry
+            self._dirty = True
+
+    def is_fresh(self, relpath, digest):
+        """True if ``relpath`` is known to hold ``digest`` and is untouched since."""
+        entry = self.entries.get(relpath)
+        if not entry or entry.get('sha256') != digest:
+            return False
+        try:
+            st = os.stat(os.path.join(self.root, relpath))
+        except OSError:
+            return False
+        return st.st_size == entry.get('size') and st.st_mtime_ns == entry.get('mtime_ns')
+
+    def save(self):
+        if not self._dirty:
+            return False
+        import json
+
+        data = {'version': MANIFEST_VERSION, 'files': dict(sorted(self.entries.items()))}
+        _atomic_write(self.path, (json.dumps(data, indent=2) + '\n').encode('utf-8'))
+        self._dirty = False
+        return True
+
+
+def write_if_changed(relpath, content, manifest):
+    """Write ``content`` to ``relpath`` under the manifest root unless it is already there.
+
+    ``content`` may be str, bytes or an iterable of str chunks (a streamed
+    render). Returns one of ``CREATED``, ``UPDATED`` or ``UNCHANGED``.
+    """
+    if not isinstance(content, (str, bytes)):
+        content = ''.join(content)
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    digest = content_hash(data)
+    if manifest.is_fresh(relpath, digest):
+        return UNCHANGED
+
+    path = os.path.join(manifest.root, relpath)
+    try:
+        with open(path, 'rb') as f:
+            existing = f.read()
+    except FileNotFoundError:
+        existing = None
+
+    if existing == data:
+        status = UNCHANGED
+    else:
+        _atomic_write(path, data)
+        status = CREATED if existing is None else UPDATED
+    manifest.record(relpath, digest)
+    return status
+
+
+def write_artifacts(artifacts, root='.'):
+    """Write a ``{relpath: content}`` mapping incrementally.
+
+    Returns a list of ``(relpath, status)`` tuples in input order.
+    """
+    manifest = Manifest.load(root)
+    results = [(relpath, write_if_changed(relpath, content, manifest))
+               for relpath, content in artifacts.items()]
+    manifest.save()
+    return results
+
+
+def report(results, title=None):
+    """Print a summary of ``write_artifacts`` results."""
+    if title:
+        print(title)
+    for relpath, status in results:
+        marker = '✅' if status != UNCHANGED else '  '
+        print(f"   {marker} {relpath} ({status})")
@@ -0,0 +1,89 @@
+"""YAML emitter used by the scaffold artifacts.
+
+``dump_yaml`` serializes with libyaml's ``CSafeDumper`` when PyYAML was
+built with it and falls back to the pure-Python ``SafeDumper`` otherwise.
+Both paths use the same representer and resolver and pin every emitter
+option that differs between them by default, so the output is
+byte-identical either way. Set ``SARVA_YAML_PURE=1`` to force the
+pure-Python path.
+"""
+
+import os
+
+# Options shared by both emitters. Long scalars are never folded: libyaml
+# and the Python emitter pick different break points when they fold, and
+# unfolded lines are identical in both.
+UNFOLDED_WIDTH = 1 << 30
+
+YAML_OPTIONS = {
+    'default_flow_style': False,
+    'sort_keys': False,
+    'allow_unicode': False,
+    'width': UNFOLDED_WIDTH,
+    'indent': 2,
+    'line_break': '\n',
+}
+
+_dumpers = {}
+
+
+class literal(str):
+    """A str emitted as a ``|`` block scalar (multi-line scripts, embedded YAML)."""
+
+
+def _represent_literal(dumper, data):
+    return dumper.represent_scalar('tag:yaml.org,2002:str', str(data), style='|')
+
+
+def _yaml():
+    # Imported on first use so listing artifacts does not pay for PyYAML.
+    import yaml
+    return yaml
+
+
+def get_dumper(pure=None):
+    """Return the Dumper class to use; ``pure`` forces the Python emitter."""
+    if pure is None:
+        pure = os.environ.get('SARVA_YAML_PURE', '') not in ('', '0')
+    if pure not in _dumpers:
+        yaml = _yaml()
+        base = yaml.SafeDumper if pure else getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+        # A private subclass, so the representer never leaks into PyYAML's
+        # own dumpers for other callers in the process.
+        dumper = type('_' + base.__name__, (base,), {})
+        dumper.add_representer(literal, _represent_literal)
+        _dumpers[pure] = dumper
+    return _dumpers[pure]
+
+
+def has_libyaml():
+    return hasattr(_yaml(), 'CSafeDumper')
+
+
+def dump_yaml(data, pure=None):
+    """Serialize ``data`` to a YAML string."""
+    return _yaml().dump(data, Dumper=get_dumper(pure), **YAML_OPTIONS)
+
+
+def dump_yaml_all(documents, pure=None):
+    """Serialize several documents into one ``---``-separated stream."""
+    return _yaml().dump_all(documents, Dumper=get_dumper(pure), **YAML_OPTIONS)
+
+
+def iter_yaml_mapping(entries, key=None, pure=None):
+    """Stream a mapping as YAML text chunks, one ``(name, value)`` entry at a time.
+
+    Each entry is dumped on its own, so the full mapping is never built in
+    memory. With ``key`` the entries are nested under that (plain) key.
+    """
+    pad = '  ' if key else ''
+    empty = True
+    for name, value in entries:
+        chunk = dump_yaml({name: value}, pure)
+        if empty and key:
+            yield f'{key}:\n'
+        empty = False
+        yield ''.join(pad + line if line.strip() else line
+                      for line in chunk.splitlines(True))
+    if empty:
+        yield f'{key}: {{}}\n' if key else '{}\n'
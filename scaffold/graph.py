@@ -0,0 +1,162 @@
+"""Dependency-aware build graph of scaffold artifacts.
+
+Artifacts register themselves as nodes with the ``artifact`` decorator. A
+node's render function receives the rendered values of its dependencies as
+keyword arguments; nodes with a ``path`` (or ``multi`` nodes, which render
+several files) are written to disk, the rest are shared data. ``BuildGraph.build`` renders only the requested nodes
+and their dependencies, running independent nodes in parallel on a thread
+pool, then writes the results through the incremental core. Generator
+options (``BuildGraph.options``) let render functions be parameterized from
+the command line.
+"""
+
+import os
+
+from .core import write_artifacts
+
+
+class GraphError(Exception):
+    """Raised for unknown artifacts, duplicate names or dependency cycles."""
+
+
+class Node:
+    """A registered artifact.
+
+    ``path`` names the file the rendered value is written to. A ``multi``
+    node instead renders a ``{path: content}`` mapping (one file per
+    service, say); a node with neither is shared data for other nodes.
+    """
+
+    __slots__ = ('name', 'render', 'path', 'deps', 'module', 'multi')
+
+    def __init__(self, name, render, path=None, deps=(), module=None, multi=False):
+        self.name = name
+        self.render = render
+        self.path = path
+        self.deps = tuple(deps)
+        self.module = module
+        self.multi = multi
+
+    @property
+    def writes_files(self):
+        return bool(self.path or self.multi)
+
+    def __repr__(self):
+        return f"Node({self.name!r}, path={self.path!r}, deps={self.deps!r})"
+
+
+class BuildGraph:
+    def __init__(self):
+        self.nodes = {}
+        self.options = {}
+
+    def option(self, name, default=None):
+        """Generator option set with ``sarva-scaffold --set name=value``."""
+        return self.options.get(name, default)
+
+    def add(self, name, render, path=None, deps=(), module=None, multi=False):
+        if name in self.nodes:
+            raise GraphError(f"artifact {name!r} is already registered")
+        if path and multi:
+            raise GraphError(f"artifact {name!r}: a multi-file node cannot have a path")
+        node = Node(name, render, path, deps, module, multi)
+        self.nodes[name] = node
+        return node
+
+    def artifact(self, name, path=None, deps=(), multi=False):
+        """Decorator registering ``func`` as the render function of ``name``."""
+        def decorator(func):
+            self.add(name, func, path, deps, func.__module__, multi)
+            return func
+        return decorator
+
+    def resolve(self, name):
+        """Look up a node by name or by output path."""
+        node = self.nodes.get(name)
+        if node is not None:
+            return node
+        normalized = os.path.normpath(name)
+        for node in self.nodes.values():
+            if node.path and os.path.normpath(node.path) == normalized:
+                return node
+        raise GraphError(f"unknown artifact {name!r}")
+
+    def order(self, targets=None):
+        """Topologically ordered nodes needed to build ``targets`` (default: all)."""
+        roots = [self.resolve(t) for t in targets] if targets else list(self.nodes.values())
+        ordered, done, active = [], set(), set()
+
+        def visit(node):
+            if node.name in done:
+                return
+            if node.name in active:
+                raise GraphError(f"dependency cycle through {node.name!r}")
+            active.add(node.name)
+            for dep in node.deps:
+                if dep not in self.nodes:
+                    raise GraphError(f"{node.name!r} depends on unknown artifact {dep!r}")
+                visit(self.nodes[dep])
+            active.discard(node.name)
+            done.add(node.name)
+            ordered.append(node)
+
+        for root in roots:
+            visit(root)
+        return ordered
+
+    def render(self, targets=None, jobs=None):
+        """Render ``targets`` and their dependencies; returns ``{name: value}``.
+
+        A node is submitted as soon as all of its dependencies have rendered,
+        so independent branches of the graph run concurrently.
+        """
+        import concurrent.futures
+
+        pending = {node.name: node for node in self.order(targets)}
+        values = {}
+        if not pending:
+            return values
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+            running = {}
+
+            def submit_ready():
+                for name, node in list(pending.items()):
+                    if all(dep in values for dep in node.deps):
+                        kwargs = {dep.replace('-', '_').replace('.', '_'): values[dep]
+                                  for dep in node.deps}
+                        running[pool.submit(node.render, **kwargs)] = name
+                        del pending[name]
+
+            submit_ready()
+            while running:
+                finished, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    values[running.pop(future)] = future.result()
+                submit_ready()
+        return values
+
+    def build(self, targets=None, root='.', jobs=None):
+        """Render and incrementally write the file artifacts in ``targets``.
+
+        With explicit targets only those files are written; their data
+        dependencies are rendered but not written.
+        """
+        values = self.render(targets, jobs)
+        wanted = ({self.resolve(t).name for t in targets} if targets
+                  else set(self.nodes))
+        files = {}
+        for node in self.order(targets):
+            if node.name not in wanted:
+                continue
+            if node.multi:
+                files.update(values[node.name])
+            elif node.path:
+                files[node.path] = values[node.name]
+        return write_artifacts(files, root)
+
+
+GRAPH = BuildGraph()
+artifact = GRAPH.artifact
+option = GRAPH.option
@@ -0,0 +1,516 @@
+"""Find missing indexes from the Prisma schemas and the services' query plans.
+
+    python3 -m scaffold.indexes                          # schema checks only
+    python3 -m scaffold.indexes --dsn $DATABASE_URL      # plus EXPLAIN of the services' queries
+    python3 -m scaffold.indexes --dsn $DATABASE_URL --write
+
+The schema checks parse every schema.prisma and need no database. They
+report foreign keys with no index leading on their columns (an
+``ON DELETE CASCADE`` from the parent then scans the whole child table),
+and models that differ between the schema files.
+
+With a database, best seeded by ``python3 -m scaffold.seed``, each query
+in QUERIES runs under ``EXPLAIN (ANALYZE, BUFFERS)`` with parameters
+sampled from the data. Writes are rolled back. A sequential scan that
+filters out at least ``--min-rows`` rows becomes a candidate index: its
+equality columns first, then a range column or the sort keys above it.
+Each candidate, and each unindexed foreign key, is created inside a
+transaction, the affected queries are timed again, and the transaction
+is rolled back. Candidates at least ``--min-speedup`` times faster are
+proposed. ``--write`` turns proposals into migration files under
+``--migrations`` and adds the matching ``@@index`` to each schema.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+
+from scaffold.ledger import LedgerError, connect
+
+SCHEMAS = ('packages/database/prisma/schema.prisma', 'services/wallet-service/prisma/schema.prisma')
+MIGRATIONS = 'packages/database/prisma/migrations'
+
+Field = namedtuple('Field', 'name column type attributes')
+Model = namedtuple('Model', 'name table fields indexes relations')
+Index = namedtuple('Index', 'table columns unique')
+Relation = namedtuple('Relation', 'table columns target references on_delete')
+Query = namedtuple('Query', 'name sql sample')
+Candidate = namedtuple('Candidate', 'table columns reasons queries')
+Measurement = namedtuple('Measurement', 'query before_ms after_ms before_buffers after_buffers')
+
+
+# Representative queries of the services, with a statement that samples
+# their parameters from the data. ``{sample}`` becomes a TABLESAMPLE clause,
+# so busy wallets (most rows) are the likeliest picks; it is dropped when
+# the sample comes back empty.
+QUERIES = (
+    Query('auth: user by email',
+          'SELECT * FROM users WHERE email = %s LIMIT 1',
+          'SELECT email FROM users{sample} LIMIT 1'),
+    Query('auth: logout',
+          'DELETE FROM sessions WHERE "tokenHash" = %s',
+          'SELECT "tokenHash" FROM sessions{sample} LIMIT 1'),
+    Query('auth: sessions of a user',
+          'SELECT id FROM sessions WHERE "userId" = %s',
+          'SELECT "userId" FROM sessions{sample} LIMIT 1'),
+    Query('auth: expired sessions',
+          'SELECT id FROM sessions WHERE "expiresAt" < (now() AT TIME ZONE \'UTC\') LIMIT 1000',
+          None),
+    Query('wallet: wallet by user',
+          'SELECT id, balance, currency FROM wallets WHERE "userId" = %s',
+          'SELECT "userId" FROM wallets{sample} LIMIT 1'),
+    Query('wallet: withdraw',
+          'UPDATE wallets SET balance = balance - 1, "updatedAt" = now()'
+          ' WHERE "userId" = %s AND balance >= 1 RETURNING id',
+          'SELECT "userId" FROM wallets{sample} LIMIT 1'),
+    Query('wallet: transfer recipients',
+          'SELECT id FROM users WHERE id = ANY(%s)',
+          'SELECT array_agg(id) FROM (SELECT id FROM users{sample} LIMIT 50) AS ids'),
+    Query('wallet: history',
+          'SELECT * FROM transactions WHERE "walletId" = %s ORDER BY "createdAt" DESC, id DESC LIMIT 51',
+          'SELECT "walletId" FROM transactions{sample} LIMIT 1'),
+    Query('wallet: history by type',
+          'SELECT * FROM transactions WHERE "walletId" = %s AND type::text = ANY(%s)'
+          ' ORDER BY "createdAt" DESC, id DESC LIMIT 51',
+          'SELECT "walletId", ARRAY[\'DEPOSIT\'] FROM transactions{sample} LIMIT 1'),
+    Query('wallet: history last 30 days',
+          'SELECT * FROM transactions WHERE "walletId" = %s AND "createdAt" >= now() - interval \'30 days\''
+          ' ORDER BY "createdAt" DESC, id DESC LIMIT 51',
+          'SELECT "walletId" FROM transactions{sample} LIMIT 1'),
+)
+
+# ---------------------------------------------------------------------------
+# Schema parsing
+
+_BLOCK = re.compile(r'^(model|enum)\s+(\w+)\s*\{(.*?)^\}', re.M | re.S)
+_LIST = re.compile(r'\[([^\]]*)\]')
+_MAP = re.compile(r'@map\("([^"]+)"\)')
+
+
+def _names(text):
+    return [name.strip() for name in text.split(',') if name.strip()]
+
+
+def _argument(attribute, name):
+    match = re.search(name + r':\s*(\[[^\]]*\]|\w+)', attribute)
+    if not match:
+        return None
+    value = match.group(1)
+    return _names(value[1:-1]) if value.startswith('[') else value
+
+
+def parse_schema(text):
+    """Models of a schema.prisma, keyed by model name."""
+    blocks = [(kind, name, body) for kind, name, body in _BLOCK.findall(text)]
+    names = {name for kind, name, _ in blocks if kind == 'model'}
+    models = {}
+    for kind, name, body in blocks:
+        if kind != 'model':
+            continue
+        table, fields, block_attributes = name, [], []
+        for line in body.splitlines():
+            line = line.split('//')[0].strip()
+            if not line:
+                continue
+            if line.startswith('@@'):
+                block_attributes.append(line)
+                mapped = re.match(r'@@map\("([^"]+)"\)', line)
+                if mapped:
+                    table = mapped.group(1)
+                continue
+            parts = line.split(None, 2)
+            attributes = ' '.join(parts[2].split()) if len(parts) > 2 else ''
+            column = _MAP.search(attributes)
+            fields.append(Field(parts[0], column.group(1) if column else parts[0], parts[1], attributes))
+
+        columns = {field.name: field.column for field in fields}
+        indexes, relations = [], []
+        for field in fields:
+            if re.search(r'@(id|unique)\b', field.attributes):
+                indexes.append(Index(table, (field.column,), True))
+            relation = re.search(r'@relation\((.*)\)', field.attributes)
+            if relation and field.type.rstrip('?') in names and _argument(relation.group(1), 'fields'):
+                relations.append(Relation(
+                    table, tuple(columns[f] for f in _argument(relation.group(1), 'fields')),
+                    field.type.rstrip('?'), tuple(_argument(relation.group(1), 'references')),
+                    _argument(relation.group(1), 'onDelete')))
+        for attribute in block_attributes:
+            kind = re.match(r'@@(\w+)', attribute).group(1)
+            if kind in ('id', 'unique', 'index'):
+                listed = _LIST.search(attribute)
+                indexes.append(Index(table, tuple(columns.get(f.split('(')[0], f) for f in _names(listed.group(1))),
+                                     kind != 'index'))
+        models[name] = Model(name, table, fields, indexes, relations)
+    return models
+
+
+def load_schemas(paths):
+    schemas = {}
+    for path in paths:
+        with open(path) as f:
+            schemas[path] = parse_schema(f.read())
+    return schemas
+
+
+def covered(indexes, columns):
+    """Whether some index leads with ``columns``, in any order."""
+    want = set(columns)
+    return any(set(index.columns[:len(columns)]) == want for index in indexes)
+
+
+def index_name(table, columns):
+    """Prisma's default name for ``@@index``."""
+    return f'{table}_{"_".join(columns)}_idx'
+
+
+def unindexed_foreign_keys(models):
+    """(relation, parent model) pairs whose child columns lead no index."""
+    found = []
+    for model in models.values():
+        for relation in model.relations:
+            if not covered(model.indexes, relation.columns):
+                found.append((relation, models[relation.target]))
+    return found
+
+
+def schema_drift(schemas):
+    """Differences between models that appear in several schema files."""
+    (first_path, first), *others = schemas.items()
+    drift = []
+    for path, models in others:
+        for name in sorted(set(first) | set(models)):
+            if name not in models or name not in first:
+                drift.append(f'model {name} only in {path if name in models else first_path}')
+                continue
+            ours = {field.name: field for field in first[name].fields}
+            theirs = {field.name: field for field in models[name].fields}
+            for field in sorted(set(ours) | set(theirs)):
+                a, b = ours.get(field), theirs.get(field)
+                if a is None or b is None:
+                    drift.append(f'{name}.{field} only in {path if a is None else first_path}')
+                elif (a.type, a.attributes) != (b.type, b.attributes):
+                    drift.append(f'{name}.{field}: {a.type} {a.attributes} in {first_path}, '
+                                 f'{b.type} {b.attributes} in {path}')
+            if set(first[name].indexes) != set(models[name].indexes):
+                drift.append(f'{name} indexes differ between {first_path} and {path}')
+    return drift
+
+
+# ---------------------------------------------------------------------------
+# Plans
+
+_CONDITION = re.compile(r'\(*"?([A-Za-z_]\w*)"?\)?(?:::\w+(?:\[\])?)?\s*(=\s*ANY|=|<=|>=|<|>)')
+_SORT_KEY = re.compile(r'"?([A-Za-z_]\w*)"?(?:\s+(?:ASC|DESC))?(?:\s+NULLS\s+\w+)?$')
+
+
+def filter_columns(condition, table_columns):
+    """(equality columns, range columns) compared in a plan's Filter.
+
+    ``= ANY(...)`` counts as a range: an index leading with it cannot return
+    rows in the order of the columns after it.
+    """
+    equality, ranges = [], []
+    for column, operator in _CONDITION.findall(condition or ''):
+        if column not in table_columns:
+            continue
+        target = equality if operator == '=' else ranges
+        if column not in equality and column not in ranges:
+            target.append(column)
+    return equality, ranges
+
+
+def sort_columns(keys, table_columns):
+    columns = []
+    for key in keys:
+        match = _SORT_KEY.search(key.strip())
+        if match and match.group(1) in table_columns:
+            columns.append(match.group(1))
+    return columns
+
+
+def walk(plan, parent=None):
+    yield plan, parent
+    for child in plan.get('Plans', ()):
+        yield from walk(child, plan)
+
+
+def scan_candidates(plan, columns_by_table, min_rows):
+    """(table, columns, reason) for sequential scans worth an index."""
+    found = []
+    for node, parent in walk(plan):
+        if node.get('Node Type') != 'Seq Scan':
+            continue
+        table = node.get('Relation Name')
+        removed = node.get('Rows Removed by Filter', 0) * node.get('Actual Loops', 1)
+        if table not in columns_by_table or removed < min_rows:
+            continue
+        equality, ranges = filter_columns(node.get('Filter'), columns_by_table[table])
+        columns = equality[:]
+        sort = []
+        if parent is not None and parent.get('Node Type') == 'Sort':
+            sort = sort_columns(parent.get('Sort Key', ()), columns_by_table[table])
+        if sort:
+            columns += [column for column in sort if column not in columns]
+        elif ranges:
+            columns.append(ranges[0])
+        if columns:
+            found.append((table, tuple(columns), f'seq scan of {table} removed {removed:,} rows'))
+    return found
+
+
+def sample_params(cursor, sample):
+    if sample is None:
+        return ()
+    for clause in (' TABLESAMPLE SYSTEM (1)', ''):
+        cursor.execute(sample.format(sample=clause))
+        row = cursor.fetchone()
+        if row is not None and row[0] is not None:
+            return tuple(row)
+    return None
+
+
+def explain(conn, sql, params, repeat=1):
+    """Fastest of ``repeat`` runs: (plan, execution ms incl. triggers, shared buffers).
+
+    Each run is rolled back to a savepoint, so writes are measured but never
+    kept, while anything the caller did earlier in the transaction stays.
+    """
+    best = None
+    with conn.cursor() as cursor:
+        for _ in range(repeat):
+            cursor.execute('SAVEPOINT explain')
+            cursor.execute('EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + sql, params)
+            result = cursor.fetchone()[0]
+            cursor.execute('ROLLBACK TO SAVEPOINT explain')
+            if isinstance(result, str):
+                result = json.loads(result)
+            plan = result[0]['Plan']
+            elapsed = result[0]['Execution Time']
+            buffers = plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0)
+            if best is None or elapsed < best[1]:
+                best = (plan, elapsed, buffers)
+    return best
+
+
+def live_indexes(conn, tables):
+    """Index (leading columns) currently on ``tables`` in the database."""
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT tablename, indexdef FROM pg_indexes'
+                       ' WHERE tablename = ANY(%s) AND schemaname = current_schema()', (list(tables),))
+        rows = cursor.fetchall()
+    conn.rollback()
+    indexes = []
+    for table, definition in rows:
+        listed = re.search(r'USING \w+ \(([^)]*)\)', definition)
+        if listed:
+            columns = tuple(key.split()[0].strip('"') for key in _names(listed.group(1)))
+            indexes.append(Index(table, columns, definition.startswith('CREATE UNIQUE')))
+    return indexes
+
+
+def cascade_query(relation, parent):
+    """DELETE of one parent row, which cascades into the relation's table."""
+    references = ', '.join(f'"{column}"' for column in relation.references)
+    columns = ', '.join(f'"{column}"' for column in relation.columns)
+    return Query(f'cascade: {parent.table} -> {relation.table}',
+                 f'DELETE FROM "{parent.table}" WHERE ({references}) = ({", ".join(["%s"] * len(relation.columns))})',
+                 f'SELECT {columns} FROM "{relation.table}"{{sample}} LIMIT 1')
+
+
+def benchmark(conn, candidate, repeat):
+    """Times the candidate's queries without and with its index (rolled back)."""
+    measured = []
+    columns = ', '.join(f'"{column}"' for column in candidate.columns)
+    for query, params in candidate.queries:
+        _, before_ms, before_buffers = explain(conn, query.sql, params, repeat)
+        with conn.cursor() as cursor:
+            cursor.execute(f'CREATE INDEX "{index_name(candidate.table, candidate.columns)}"'
+                           f' ON "{candidate.table}" ({columns})')
+            cursor.execute(f'ANALYZE "{candidate.table}"')
+        _, after_ms, after_buffers = explain(conn, query.sql, params, repeat)
+        conn.rollback()
+        measured.append(Measurement(query.name, before_ms, after_ms, before_buffers, after_buffers))
+    return measured
+
+
+def advise(dsn, schema, models, queries=QUERIES, min_rows=1000, repeat=3):
+    """Returns ({query name: (ms, buffers, findings)}, [(candidate, measurements)])."""
+    columns_by_table = {model.table: {field.column for field in model.fields} for model in models.values()}
+    report, candidates = {}, {}
+    with connect(dsn, schema) as conn:
+        existing = live_indexes(conn, columns_by_table)
+        with conn.cursor() as cursor:
+            sampled = [(query, sample_params(cursor, query.sample)) for query in queries]
+            for relation, parent in unindexed_foreign_keys(models):
+                if covered([i for i in existing if i.table == relation.table], relation.columns):
+                    continue
+                measured = []
+                # Only a cascading delete can be timed; a restricting one fails
+                if relation.on_delete in ('Cascade', 'SetNull'):
+                    query = cascade_query(relation, parent)
+                    params = sample_params(cursor, query.sample)
+                    if params is not None:
+                        measured.append((query, params))
+                candidates[relation.table, relation.columns] = Candidate(
+                    relation.table, relation.columns, [f'foreign key to {parent.table} has no index'], measured)
+        conn.rollback()
+
+        for query, params in sampled:
+            if params is None:
+                report[query.name] = (None, None, ['no sample rows; seed the database first'])
+                continue
+            plan, elapsed, buffers = explain(conn, query.sql, params, repeat)
+            conn.rollback()
+            findings = []
+            for table, columns, reason in scan_candidates(plan, columns_by_table, min_rows):
+                findings.append(reason)
+                if covered([i for i in existing if i.table == table], columns):
+                    continue
+                candidate = candidates.setdefault((table, columns), Candidate(table, columns, [], []))
+                candidate.reasons.append(f'{query.name}: {reason}')
+                candidate.queries.append((query, params))
+            report[query.name] = (elapsed, buffers, findings)
+
+        results = [(candidate, benchmark(conn, candidate, repeat)) for candidate in candidates.values()]
+    return report, results
+
+
+def speedup(measurements):
+    """Worst-case speedup over the candidate's queries."""
+    ratios = [m.before_ms / max(m.after_ms, 0.001) for m in measurements]
+    return min(ratios) if ratios else None
+
+
+# ---------------------------------------------------------------------------
+# Migrations
+
+def migration_sql(candidate, measurements):
+    columns = ', '.join(f'"{column}"' for column in candidate.columns)
+    lines = ['-- Proposed by python3 -m scaffold.indexes:']
+    lines += [f'-- {reason}' for reason in candidate.reasons]
+    for m in measurements:
+        lines.append(f'-- {m.query}: {m.before_ms:.2f}ms -> {m.after_ms:.2f}ms, '
+                     f'{m.before_buffers} -> {m.after_buffers} buffers')
+    lines += [
+        '-- On a large live table, build it first with CREATE INDEX CONCURRENTLY under',
+        '-- the same name; this statement then does nothing.',
+        '',
+        '-- CreateIndex',
+        f'CREATE INDEX IF NOT EXISTS "{index_name(candidate.table, candidate.columns)}"'
+        f' ON "{candidate.table}"({columns});',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def add_schema_index(text, table, columns):
+    """schema.prisma text with ``@@index([...])`` added to the table's model."""
+    for match in _BLOCK.finditer(text):
+        kind, name, body = match.groups()
+        model = parse_schema(match.group(0)).get(name) if kind == 'model' else None
+        if model is None or model.table != table:
+            continue
+        if covered(model.indexes, columns):
+            return text
+        fields = {field.column: field.name for field in model.fields}
+        line = f'  @@index([{", ".join(fields.get(column, column) for column in columns)}])\n'
+        mapped = re.search(r'^[ \t]*@@map\(', body, re.M)
+        at = match.start(3) + (mapped.start() if mapped else len(body))
+        return text[:at] + line + text[at:]
+    return text
+
+
+def write_migration(root, migrations, candidate, measurements, schema_paths, stamp):
+    slug = f'{candidate.table}_{"_".join(candidate.columns)}_index'.lower()
+    directory = os.path.join(root, migrations, f'{stamp}_{slug}')
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'migration.sql'), 'w') as f:
+        f.write(migration_sql(candidate, measurements))
+    for path in schema_paths:
+        with open(path) as f:
+            text = f.read()
+        updated = add_schema_index(text, candidate.table, candidate.columns)
+        if updated != text:
+            with open(path, 'w') as f:
+                f.write(updated)
+    return directory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m scaffold.indexes', description=__doc__.splitlines()[0])
+    parser.add_argument('schemas', nargs='*', help=f'schema.prisma files (default: {", ".join(SCHEMAS)})')
+    parser.add_argument('--root', default='.', help='repository root')
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'),
+                        help='seeded PostgreSQL to EXPLAIN against (default: $DATABASE_URL; none: schema checks only)')
+    parser.add_argument('--schema', help='search_path to use (default: ?schema= in the URL)')
+    parser.add_argument('--min-rows', type=int, default=1000,
+                        help='rows a sequential scan must filter out to be flagged (default: 1000)')
+    parser.add_argument('--min-speedup', type=float, default=2.0,
+                        help='proposed only when every affected query gets this much faster (default: 2)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; the fastest counts')
+    parser.add_argument('--migrations', default=MIGRATIONS, help=f'where --write puts migrations ({MIGRATIONS})')
+    parser.add_argument('--write', action='store_true', help='write migrations and @@index lines for proposals')
+    args = parser.parse_args(argv)
+
+    paths = [os.path.join(args.root, path) for path in (args.schemas or SCHEMAS)]
+    paths = [path for path in paths if os.path.exists(path)] or glob.glob(
+        os.path.join(args.root, '**/prisma/schema.prisma'), recursive=True)
+    if not paths:
+        print('python -m scaffold.indexes: no schema.prisma found', file=sys.stderr)
+        return 2
+    schemas = load_schemas(paths)
+    models = {}
+    for parsed in reversed(list(schemas.values())):
+        models.update(parsed)
+
+    drift = schema_drift(schemas) if len(schemas) > 1 else []
+    foreign_keys = unindexed_foreign_keys(models)
+    print(f"{'✅' if not drift and not foreign_keys else '⚠️ '} Schemas ({len(paths)} files, {len(models)} models):")
+    for relation, parent in foreign_keys:
+        print(f'   ⚠️  {relation.table}({", ".join(relation.columns)}) references {parent.table} '
+              f'(onDelete: {relation.on_delete or "none"}) with no index')
+    for line in drift:
+        print(f'   ⚠️  drift: {line}')
+
+    if args.dsn:
+        try:
+            report, results = advise(args.dsn, args.schema, models, min_rows=args.min_rows, repeat=args.repeat)
+        except LedgerError as exc:
+            print(f'python -m scaffold.indexes: {exc}', file=sys.stderr)
+            return 2
+        print('✅ Query plans:')
+        for name, (elapsed, buffers, findings) in report.items():
+            mark = '⚠️ ' if findings else '✅'
+            timing = f'{elapsed:.2f}ms, {buffers} buffers' if elapsed is not None else 'not run'
+            print(f'   {mark} {name}: {timing}')
+            for finding in findings:
+                print(f'      {finding}')
+        proposals = []
+        for candidate, measurements in results:
+            ratio = speedup(measurements)
+            keep = ratio is not None and ratio >= args.min_speedup
+            print(f"   {'✅' if keep else '❌'} {index_name(candidate.table, candidate.columns)}: "
+                  + (f'{ratio:.1f}x' if ratio is not None else 'not measured'))
+            for m in measurements:
+                print(f'      {m.query}: {m.before_ms:.2f}ms -> {m.after_ms:.2f}ms')
+            if keep:
+                proposals.append((candidate, measurements))
+    else:
+        proposals = [(Candidate(relation.table, relation.columns, [f'foreign key to {parent.table} has no index'], []), [])
+                     for relation, parent in foreign_keys]
+
+    if args.write and proposals:
+        started = time.time()
+        print('✅ Migrations:')
+        for offset, (candidate, measurements) in enumerate(proposals):
+            stamp = time.strftime('%Y%m%d%H%M%S', time.gmtime(started + offset))
+            print(f'   ✅ {write_migration(args.root, args.migrations, candidate, measurements, paths, stamp)}')
+    return 1 if proposals and not args.write else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,334 @@
+"""Replay wallet ledgers and reconcile them against the wallet balances.
+
+    python3 -m scaffold.ledger --dsn "$DATABASE_URL" -j 8
+    python3 -m scaffold.ledger --wallet 3f0c...e1 -o issues.jsonl
+
+Every completed ``transactions`` row records ``balanceBefore`` and
+``balanceAfter``. The replay walks each wallet's rows in ``createdAt``
+order with Decimal arithmetic and reports:
+
+- ``opening``: the first row does not start from a zero balance
+- ``gap``: ``balanceBefore`` is not the previous row's ``balanceAfter``
+- ``drift``: ``balanceAfter`` is not ``balanceBefore`` +/- ``amount``
+- ``balance``: the last ``balanceAfter`` is not ``wallets.balance``
+- ``orphan``: rows whose wallet no longer exists
+- ``type``: a transaction type the replay does not know
+
+Months archived by ``python3 -m scaffold.archive`` are no longer in the
+table, so wallets created before the newest archived month are not
+checked for ``opening``: their first remaining row continues a history
+that now lives in Parquet.
+
+Wallets are split into ``--partitions`` contiguous id ranges that a
+process pool replays in parallel. Each worker reads its range through
+two server-side cursors (wallets and transactions, both ordered by wallet
+id) inside one repeatable-read snapshot and merges them, so memory stays
+bounded by ``--batch-size`` whatever the table size.
+
+Requires psycopg 3 (``pip install "psycopg[binary]"``).
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter, namedtuple
+from decimal import Decimal
+
+CREDIT_TYPES = frozenset({'DEPOSIT', 'TRANSFER_IN'})
+DEBIT_TYPES = frozenset({'WITHDRAWAL', 'TRANSFER_OUT'})
+COMPLETED = 'completed'
+ZERO = Decimal('0')
+
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_MAX_ISSUES = 1000
+
+Row = namedtuple('Row', ['wallet_id', 'id', 'type', 'amount', 'balance_before',
+                         'balance_after', 'status', 'created_at'])
+Issue = namedtuple('Issue', ['wallet_id', 'transaction_id', 'kind', 'expected', 'actual'])
+
+_TRANSACTION_COLUMNS = ('"walletId", id, type::text, amount, "balanceBefore", '
+                        '"balanceAfter", status, "createdAt"')
+
+
+class LedgerError(Exception):
+    pass
+
+
+def _decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _chain_order(previous, rows):
+    """Order rows sharing one ``createdAt`` so each starts where the last ended.
+
+    Millisecond timestamps collide under load, and a batched transfer
+    writes all of its rows with one timestamp, so without this rows would
+    be reported as gaps. Linear in the group size: rows are indexed by
+    ``balanceBefore``; when nothing continues the chain, the next row that
+    no other row leads into is taken, then any row in id order.
+    """
+    by_before = {}
+    for position, row in enumerate(rows):
+        by_before.setdefault(_decimal(row.balance_before), []).append(position)
+    for positions in by_before.values():
+        positions.reverse()
+    afters = {_decimal(row.balance_after) for row in rows}
+    heads = [p for p, row in enumerate(rows) if _decimal(row.balance_before) not in afters]
+    fallback = iter(heads + list(range(len(rows))))
+    used = [False] * len(rows)
+    ordered = []
+    while len(ordered) < len(rows):
+        candidates = by_before.get(previous)
+        while candidates and used[candidates[-1]]:
+            candidates.pop()
+        if candidates:
+            position = candidates.pop()
+        else:
+            position = next(p for p in fallback if not used[p])
+        used[position] = True
+        ordered.append(rows[position])
+        previous = _decimal(rows[position].balance_after)
+    return ordered
+
+
+def replay_wallet(wallet_id, rows, balance=None, archived=False):
+    """Replay one wallet's rows (in ``createdAt`` order).
+
+    Returns ``(completed_rows, skipped_rows, issues)``; ``balance`` is the
+    wallet's stored balance, or None when the wallet does not exist.
+    ``archived`` means earlier rows may be archived: the first row's
+    ``balanceBefore`` is taken as the opening balance.
+    """
+    issues = []
+    completed = skipped = 0
+    previous = ZERO
+    first = True
+    if archived:
+        # Peek at the first completed row without materializing the wallet
+        rows = iter(rows)
+        leading = []
+        for row in rows:
+            leading.append(row)
+            if row.status == COMPLETED:
+                previous = _decimal(row.balance_before)
+                break
+        rows = itertools.chain(leading, rows)
+    for _, group in itertools.groupby(rows, key=lambda row: row.created_at):
+        group = list(group)
+        kept = [row for row in group if row.status == COMPLETED]
+        skipped += len(group) - len(kept)
+        for row in _chain_order(previous, kept) if len(kept) > 1 else kept:
+            completed += 1
+            before = _decimal(row.balance_before)
+            after = _decimal(row.balance_after)
+            amount = _decimal(row.amount)
+            if before != previous:
+                issues.append(Issue(wallet_id, row.id, 'opening' if first else 'gap',
+                                    str(previous), str(before)))
+            if row.type in CREDIT_TYPES:
+                expected = before + amount
+            elif row.type in DEBIT_TYPES:
+                expected = before - amount
+            else:
+                issues.append(Issue(wallet_id, row.id, 'type', None, row.type))
+                expected = after
+            if after != expected:
+                issues.append(Issue(wallet_id, row.id, 'drift', str(expected), str(after)))
+            previous = after
+            first = False
+    if balance is None:
+        if completed or skipped:
+            issues.append(Issue(wallet_id, None, 'orphan', None, str(completed + skipped)))
+    elif _decimal(balance) != previous:
+        issues.append(Issue(wallet_id, None, 'balance', str(previous), str(_decimal(balance))))
+    return completed, skipped, issues
+
+
+def connect(dsn, schema=None):
+    """psycopg connection; a Prisma-style ``?schema=`` becomes the search_path."""
+    try:
+        import psycopg
+    except ImportError:
+        raise LedgerError('psycopg is not installed; pip install "psycopg[binary]"') from None
+    from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+    parts = urlsplit(dsn)
+    query = parse_qsl(parts.query)
+    schema = schema or dict(query).get('schema')
+    dsn = urlunsplit(parts._replace(query=urlencode([(k, v) for k, v in query if k != 'schema'])))
+    options = f'-c search_path={schema}' if schema else None
+    return psycopg.connect(dsn, options=options) if options else psycopg.connect(dsn)
+
+
+def _range_filter(column, lo, hi):
+    """WHERE clause for ``lo <= column < hi``; ``lo == hi`` selects that one value."""
+    if lo is not None and lo == hi:
+        return f' WHERE {column} = %s', [lo]
+    clauses, params = [], []
+    if lo is not None:
+        clauses.append(f'{column} >= %s')
+        params.append(lo)
+    if hi is not None:
+        clauses.append(f'{column} < %s')
+        params.append(hi)
+    return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+
+def wallet_partitions(conn, count):
+    """Split wallet ids into ``count`` contiguous ``(lo, hi)`` ranges.
+
+    The outer ranges are open so transactions of deleted wallets (orphans)
+    below the first or above the last id are still replayed.
+    """
+    with conn.cursor() as cur:
+        cur.execute('SELECT min(id) FROM (SELECT id, ntile(%s) OVER (ORDER BY id) AS part'
+                    ' FROM wallets) AS parts GROUP BY part ORDER BY 1', (count,))
+        starts = [row[0] for row in cur.fetchall()][1:]
+    bounds = [None] + starts + [None]
+    return list(zip(bounds, bounds[1:]))
+
+
+def reconcile_range(dsn, lo=None, hi=None, schema=None,
+                    batch_size=DEFAULT_BATCH_SIZE, max_issues=DEFAULT_MAX_ISSUES):
+    """Replay every wallet with ``lo <= id < hi``; runs in a pool worker."""
+    import psycopg
+
+    stats = Counter()
+    issues = []
+    with connect(dsn, schema) as conn:
+        conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+        conn.read_only = True
+        with conn.transaction():
+            archived_before = _archived_before(conn)
+            wallet_where, wallet_params = _range_filter('id', lo, hi)
+            tx_where, tx_params = _range_filter('"walletId"', lo, hi)
+            wallet_cur = conn.cursor(name='ledger_wallets')
+            tx_cur = conn.cursor(name='ledger_transactions', row_factory=lambda cursor: Row._make)
+            wallet_cur.itersize = tx_cur.itersize = batch_size
+            # Ids are UUIDs, for which the database's collation order and
+            # Python's string order agree, so the two streams merge directly.
+            wallet_cur.execute(f'SELECT id, balance, "createdAt" < %s FROM wallets{wallet_where} ORDER BY id',
+                               [archived_before] + wallet_params)
+            tx_cur.execute(f'SELECT {_TRANSACTION_COLUMNS} FROM transactions{tx_where}'
+                           ' ORDER BY "walletId", "createdAt", id', tx_params)
+
+            wallets = iter(wallet_cur)
+            wallet = next(wallets, None)
+            for wallet_id, rows in itertools.groupby(tx_cur, key=lambda row: row.wallet_id):
+                while wallet is not None and wallet[0] < wallet_id:
+                    _record(stats, issues, max_issues, *replay_wallet(wallet[0], (), wallet[1]))
+                    wallet = next(wallets, None)
+                if wallet is not None and wallet[0] == wallet_id:
+                    balance, archived = wallet[1], bool(wallet[2])
+                    wallet = next(wallets, None)
+                else:
+                    balance, archived = None, archived_before is not None
+                _record(stats, issues, max_issues, *replay_wallet(wallet_id, rows, balance, archived))
+            while wallet is not None:
+                _record(stats, issues, max_issues, *replay_wallet(wallet[0], (), wallet[1]))
+                wallet = next(wallets, None)
+    return stats, issues
+
+
+def _archived_before(conn):
+    """End of the newest month archived out of transactions, or None."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('transaction_archives') IS NOT NULL")
+        if not cur.fetchone()[0]:
+            return None
+        cur.execute('SELECT max("rangeEnd") FROM transaction_archives')
+        return cur.fetchone()[0]
+
+
+def _record(stats, issues, max_issues, completed, skipped, found):
+    stats['wallets'] += 1
+    stats['transactions'] += completed
+    stats['skipped'] += skipped
+    for issue in found:
+        stats[issue.kind] += 1
+        if len(issues) < max_issues:
+            issues.append(issue)
+
+
+def reconcile(dsn, schema=None, jobs=None, partitions=None, wallet=None,
+              batch_size=DEFAULT_BATCH_SIZE, max_issues=DEFAULT_MAX_ISSUES):
+    """Replay all wallets (or one) on a process pool; returns ``(stats, issues)``."""
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    jobs = jobs or os.cpu_count() or 1
+    if wallet is not None:
+        ranges = [(wallet, wallet)]
+    else:
+        with connect(dsn, schema) as conn:
+            ranges = wallet_partitions(conn, partitions or jobs * 4)
+
+    stats = Counter()
+    issues = []
+    if jobs == 1 or len(ranges) == 1:
+        results = (reconcile_range(dsn, lo, hi, schema, batch_size, max_issues) for lo, hi in ranges)
+        for part_stats, part_issues in results:
+            stats.update(part_stats)
+            issues.extend(part_issues)
+        return stats, issues
+    with ProcessPoolExecutor(max_workers=min(jobs, len(ranges))) as pool:
+        futures = [pool.submit(reconcile_range, dsn, lo, hi, schema, batch_size, max_issues)
+                   for lo, hi in ranges]
+        for future in as_completed(futures):
+            part_stats, part_issues = future.result()
+            stats.update(part_stats)
+            issues.extend(part_issues)
+    return stats, issues
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m scaffold.ledger', description=__doc__.splitlines()[0])
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'),
+                        help='PostgreSQL URL (default: $DATABASE_URL)')
+    parser.add_argument('--schema', help='search_path to use (default: ?schema= in the URL)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--partitions', type=int, default=None,
+                        help='wallet id ranges to split the work into (default: 4 per job)')
+    parser.add_argument('--wallet', help='replay only this wallet id')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='rows fetched per server-side cursor round trip')
+    parser.add_argument('--max-issues', type=int, default=DEFAULT_MAX_ISSUES,
+                        help='issues kept per partition; all are counted')
+    parser.add_argument('-o', '--output', help='write issues as JSON lines')
+    args = parser.parse_args(argv)
+
+    if not args.dsn:
+        parser.error('--dsn or DATABASE_URL is required')
+    started = time.perf_counter()
+    try:
+        stats, issues = reconcile(args.dsn, args.schema, args.jobs, args.partitions, args.wallet,
+                                  args.batch_size, args.max_issues)
+    except LedgerError as exc:
+        print(f'python -m scaffold.ledger: {exc}', file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - started
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            for issue in issues:
+                f.write(json.dumps(issue._asdict()) + '\n')
+
+    found = sum(stats[kind] for kind in ('opening', 'gap', 'drift', 'balance', 'orphan', 'type'))
+    print(f"{'✅' if not found else '❌'} Ledger ({stats['wallets']} wallets, "
+          f"{stats['transactions']} transactions, {elapsed:.1f}s):")
+    for kind in ('opening', 'gap', 'drift', 'balance', 'orphan', 'type'):
+        if stats[kind]:
+            print(f'   {kind:<8} {stats[kind]}')
+    if stats['skipped']:
+        print(f"   skipped {stats['skipped']} rows that are not {COMPLETED}")
+    for issue in issues[:20]:
+        print(f'   {issue.kind}: wallet {issue.wallet_id} transaction {issue.transaction_id} '
+              f'expected {issue.expected} got {issue.actual}')
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
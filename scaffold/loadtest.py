@@ -0,0 +1,389 @@
+"""Open-loop load test of the user flows, with per-endpoint latency histograms.
+
+    python3 -m scaffold.loadtest --rate 50 --duration 60 -o run.json
+    python3 -m scaffold.loadtest --rate 50 --duration 60 --baseline last-release.json
+
+Virtual users arrive as a Poisson process at ``--rate`` per second for
+``--duration`` seconds, independently of how fast earlier ones finish
+(open loop), so a slow service shows up as latency instead of quietly
+lowering the load. Each user walks the flow demo-sarva.sh used to show:
+register, login, read the wallet, deposit twice, withdraw, list the
+transactions and read the wallet again. At most ``--max-users`` run at
+once; arrivals beyond that are counted as dropped.
+
+Latencies go into HdrHistogram-style log-linear histograms (two
+significant digits by default) per endpoint, plus one for whole flows
+measured from their scheduled arrival. The JSON report can be diffed
+between runs; with ``--baseline`` the p99 of every endpoint is compared
+to a previous report and the run fails past ``--max-regression``.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from urllib.parse import urlsplit
+
+PERCENTILES = (('p50', 50.0), ('p90', 90.0), ('p99', 99.0), ('p999', 99.9))
+
+DEFAULT_PASSWORD = 'LoadTest123!'
+
+
+class Histogram:
+    """Log-linear histogram of integer values (microseconds here).
+
+    Values below ``2 * 10**digits`` rounded up to a power of two are exact;
+    above that every power-of-two range is split into the same number of
+    linear buckets, so any recorded value is reported within a relative
+    error of 10**-digits, at a fixed few KB whatever the range.
+    """
+
+    def __init__(self, digits=2):
+        self.digits = digits
+        self.sub_bits = math.ceil(math.log2(2 * 10 ** digits))
+        self.half = 1 << (self.sub_bits - 1)
+        self.counts = []
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+    def _index(self, value):
+        shift = value.bit_length() - self.sub_bits
+        if shift <= 0:
+            return value
+        return shift * self.half + (value >> shift)
+
+    def _highest_equivalent(self, index):
+        if index < 2 * self.half:
+            return index
+        shift, sub = divmod(index - 2 * self.half, self.half)
+        shift += 1
+        return ((sub + self.half + 1) << shift) - 1
+
+    def record(self, value):
+        value = max(0, int(value))
+        index = self._index(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent):
+        if not self.total:
+            return 0
+        rank = max(1, math.ceil(percent / 100 * self.total))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def summary(self, scale=1000.0):
+        """Count, mean, percentiles and max, in milliseconds for microsecond values."""
+        result = {'count': self.total, 'mean': round(self.sum / self.total / scale, 3) if self.total else 0}
+        for name, percent in PERCENTILES:
+            result[name] = round(self.percentile(percent) / scale, 3)
+        result['max'] = round(self.max / scale, 3)
+        return result
+
+
+class HTTPConnection:
+    """One persistent HTTP/1.1 connection; requests are sent one at a time."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers, body=b''):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}',
+                 f'Content-Length: {len(body)}'] + headers
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed by server')
+        status = int(status_line.split(b' ', 2)[1])
+        length, chunked, close = 0, False, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'transfer-encoding':
+                chunked = 'chunked' in value
+            elif name == 'connection':
+                close = value == 'close'
+        if chunked:
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                chunks.append((await self.reader.readexactly(size + 2))[:size])
+                if size == 0:
+                    break
+            content = b''.join(chunks)
+        else:
+            content = await self.reader.readexactly(length) if length else b''
+        if close:
+            self.close()
+        return status, content
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class ConnectionPool:
+    """Up to ``size`` keep-alive connections to one origin, shared by all users."""
+
+    def __init__(self, url, size):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.idle = []
+        self.slots = asyncio.Semaphore(size)
+
+    async def request(self, method, path, headers, body=b''):
+        async with self.slots:
+            connection = self.idle.pop() if self.idle else HTTPConnection(self.host, self.port)
+            try:
+                result = await connection.request(method, path, headers, body)
+            except BaseException:
+                connection.close()
+                raise
+            self.idle.append(connection)
+            return result
+
+    def close(self):
+        for connection in self.idle:
+            connection.close()
+        self.idle.clear()
+
+
+class Recorder:
+    def __init__(self, digits):
+        self.digits = digits
+        self.endpoints = {}
+        self.flows = Histogram(digits)
+        self.completed = self.failed = self.dropped = self.started = 0
+
+    def endpoint(self, name):
+        if name not in self.endpoints:
+            self.endpoints[name] = {'histogram': Histogram(self.digits), 'statuses': {}, 'errors': 0}
+        return self.endpoints[name]
+
+
+class FlowFailed(Exception):
+    pass
+
+
+class VirtualUser:
+    def __init__(self, pools, recorder):
+        self.pools = pools
+        self.recorder = recorder
+        self.token = None
+
+    async def call(self, service, method, path, body=None, expect=(200,)):
+        name = f'{method} {path.split("?")[0]}'
+        stats = self.recorder.endpoint(name)
+        headers = []
+        payload = b''
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers.append('Content-Type: application/json')
+        if self.token:
+            headers.append(f'Authorization: Bearer {self.token}')
+        started = time.perf_counter()
+        try:
+            status, content = await self.pools[service].request(method, path, headers, payload)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError) as exc:
+            stats['errors'] += 1
+            raise FlowFailed(f'{name}: {exc}') from exc
+        stats['histogram'].record((time.perf_counter() - started) * 1e6)
+        stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+        if status not in expect:
+            stats['errors'] += 1
+            raise FlowFailed(f'{name}: HTTP {status}')
+        return json.loads(content) if content else None
+
+
+async def demo_flow(user):
+    """register -> login -> wallet -> deposit x2 -> withdraw -> history -> wallet"""
+    email = f'load-{uuid.uuid4().hex[:16]}@sarva.dev'
+    await user.call('auth', 'POST', '/api/auth/register', {
+        'email': email, 'password': DEFAULT_PASSWORD, 'firstName': 'Load', 'lastName': 'User'}, expect=(201,))
+    login = await user.call('auth', 'POST', '/api/auth/login', {'email': email, 'password': DEFAULT_PASSWORD})
+    user.token = login['token']
+    await user.call('wallet', 'GET', '/api/wallet')
+    await user.call('wallet', 'POST', '/api/wallet/deposit', {'amount': 1000, 'description': 'Initial funding'})
+    await user.call('wallet', 'POST', '/api/wallet/deposit', {'amount': 500, 'description': 'Additional funds'})
+    await user.call('wallet', 'POST', '/api/wallet/withdraw', {'amount': 300, 'description': 'Purchase'})
+    await user.call('wallet', 'GET', '/api/wallet/transactions?limit=20')
+    await user.call('wallet', 'GET', '/api/wallet')
+
+
+FLOWS = {'demo': demo_flow}
+
+
+async def run(config):
+    """Drive the load; returns the Recorder and the elapsed seconds."""
+    pools = {'auth': ConnectionPool(config.auth_url, config.connections),
+             'wallet': ConnectionPool(config.wallet_url, config.connections)}
+    recorder = Recorder(config.digits)
+    flow = FLOWS[config.flow]
+    rng = random.Random(config.seed)
+    active = set()
+
+    async def user_task(scheduled):
+        try:
+            await flow(VirtualUser(pools, recorder))
+            recorder.completed += 1
+        except FlowFailed:
+            recorder.failed += 1
+        # From the scheduled arrival, so a stalled event loop counts too
+        recorder.flows.record((time.perf_counter() - scheduled) * 1e6)
+
+    started = time.perf_counter()
+    arrival = started
+    end = started + config.duration
+    while True:
+        arrival += rng.expovariate(config.rate)
+        if arrival >= end:
+            break
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(active) >= config.max_users:
+            recorder.dropped += 1
+            continue
+        recorder.started += 1
+        task = asyncio.ensure_future(user_task(arrival))
+        active.add(task)
+        task.add_done_callback(active.discard)
+    if active:
+        await asyncio.gather(*active)
+    elapsed = time.perf_counter() - started
+    for pool in pools.values():
+        pool.close()
+    return recorder, elapsed
+
+
+def report(config, recorder, elapsed):
+    endpoints = {}
+    for name, stats in sorted(recorder.endpoints.items()):
+        endpoints[name] = {
+            'latency_ms': stats['histogram'].summary(),
+            'statuses': {str(status): count for status, count in sorted(stats['statuses'].items())},
+            'errors': stats['errors'],
+        }
+    return {
+        'config': {'flow': config.flow, 'rate': config.rate, 'duration': config.duration,
+                   'max_users': config.max_users, 'connections': config.connections,
+                   'auth_url': config.auth_url, 'wallet_url': config.wallet_url},
+        'elapsed_seconds': round(elapsed, 2),
+        'users': {'started': recorder.started, 'completed': recorder.completed,
+                  'failed': recorder.failed, 'dropped': recorder.dropped,
+                  'arrival_rate': round(recorder.started / config.duration, 2)},
+        'flow_latency_ms': recorder.flows.summary(),
+        'endpoints': endpoints,
+    }
+
+
+def compare(result, baseline, max_regression):
+    """Per-endpoint p99 change against a previous report; returns the regressions."""
+    regressions = []
+    for name, stats in result['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before or not before['latency_ms']['p99']:
+            continue
+        change = (stats['latency_ms']['p99'] / before['latency_ms']['p99'] - 1) * 100
+        marker = '❌' if change > max_regression else '✅'
+        print(f"   {marker} {name:<34} p99 {before['latency_ms']['p99']:>9.2f} -> "
+              f"{stats['latency_ms']['p99']:>9.2f}ms ({change:+.1f}%)")
+        if change > max_regression:
+            regressions.append(name)
+    return regressions
+
+
+def print_report(result):
+    users = result['users']
+    print(f"✅ Load test ({result['config']['flow']} flow, {result['config']['rate']:g} users/s "
+          f"for {result['config']['duration']:g}s):")
+    print(f"   users: {users['started']} started, {users['completed']} completed, "
+          f"{users['failed']} failed, {users['dropped']} dropped")
+    width = max([len(name) for name in result['endpoints']] + [len('flow')])
+    print(f"   {'endpoint':<{width}}  {'count':>7}  {'p50':>8}  {'p99':>8}  {'p999':>8}  {'max':>8}  {'errors':>6}")
+    rows = list(result['endpoints'].items()) + [('flow', {'latency_ms': result['flow_latency_ms'],
+                                                           'errors': users['failed']})]
+    for name, stats in rows:
+        latency = stats['latency_ms']
+        print(f"   {name:<{width}}  {latency['count']:>7}  {latency['p50']:>8.2f}  {latency['p99']:>8.2f}  "
+              f"{latency['p999']:>8.2f}  {latency['max']:>8.2f}  {stats['errors']:>6}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m scaffold.loadtest', description=__doc__.splitlines()[0])
+    parser.add_argument('--auth-url', default='http://localhost:8001')
+    parser.add_argument('--wallet-url', default='http://localhost:8002')
+    parser.add_argument('--flow', choices=sorted(FLOWS), default='demo')
+    parser.add_argument('--rate', type=float, default=10.0, help='virtual user arrivals per second')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of arrivals')
+    parser.add_argument('--max-users', type=int, default=5000, help='concurrent virtual users')
+    parser.add_argument('--connections', type=int, default=256, help='keep-alive connections per service')
+    parser.add_argument('--digits', type=int, default=2, help='histogram precision in significant digits')
+    parser.add_argument('--seed', type=int, help='seed for the arrival schedule')
+    parser.add_argument('--baseline', help='previous JSON report to compare p99s against')
+    parser.add_argument('--max-regression', type=float, default=10.0,
+                        help='allowed p99 increase over the baseline, in percent (default: 10)')
+    parser.add_argument('-o', '--output', help='write the report as JSON')
+    args = parser.parse_args(argv)
+    if args.rate <= 0 or args.duration <= 0 or args.max_users < 1 or args.connections < 1:
+        print('python -m scaffold.loadtest: --rate, --duration, --max-users and --connections '
+              'must be positive', file=sys.stderr)
+        return 2
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as exc:
+            print(f'python -m scaffold.loadtest: cannot read baseline: {exc}', file=sys.stderr)
+            return 2
+
+    recorder, elapsed = asyncio.run(run(args))
+    result = report(args, recorder, elapsed)
+    print_report(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+            f.write('\n')
+
+    failed = recorder.failed > 0 or recorder.started == 0
+    if baseline is not None:
+        print(f'✅ Compared with {args.baseline}:')
+        failed = bool(compare(result, baseline, args.max_regression)) or failed
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Discovery of npm workspaces and the microservices under ``services/``.
+
+Each directory with a ``package.json`` is a service. Everything the
+generators need to fan out per service (compose entries, CI path filters,
+build matrix) is derived from that package.json and a couple of
+conventional files, so adding a service directory is enough to get it
+built and wired into the local stack.
+"""
+
+import glob
+import json
+import os
+import re
+from collections import namedtuple
+
+SERVICES_DIR = 'services'
+
+Service = namedtuple('Service', ['name', 'path', 'package', 'port', 'dependencies'])
+Service.__doc__ = """A service directory; ``path`` is relative to the repository root."""
+
+_PORT_PATTERNS = (
+    re.compile(r'^\s*PORT\s*=\s*"?(\d{2,5})"?\s*$', re.M),
+    re.compile(r'\bPORT\s*(?:=|\|\|)\s*(\d{2,5})\b'),
+)
+_ENTRY_POINTS = ('src/index.ts', 'src/index.js')
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _detect_port(service_dir):
+    """Listening port from ``.env.example`` or the entry point, if declared."""
+    candidates = [('.env.example', _PORT_PATTERNS[0])]
+    candidates += [(entry, _PORT_PATTERNS[1]) for entry in _ENTRY_POINTS]
+    for relpath, pattern in candidates:
+        text = _read(os.path.join(service_dir, relpath))
+        match = pattern.search(text) if text else None
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def load_service(root, name):
+    """Return the ``Service`` at ``services/<name>`` or None if it has no package.json."""
+    path = f"{SERVICES_DIR}/{name}"
+    service_dir = os.path.join(root, SERVICES_DIR, name)
+    text = _read(os.path.join(service_dir, 'package.json'))
+    if text is None:
+        return None
+    package = json.loads(text)
+    dependencies = frozenset(package.get('dependencies', {})) | frozenset(
+        package.get('devDependencies', {}))
+    return Service(name, path, package, _detect_port(service_dir), dependencies)
+
+
+def iter_services(root='.'):
+    """Yield services in name order without loading them all up front."""
+    try:
+        names = sorted(os.listdir(os.path.join(root, SERVICES_DIR)))
+    except FileNotFoundError:
+        return
+    for name in names:
+        service = load_service(root, name)
+        if service is not None:
+            yield service
+
+
+def discover_services(root='.'):
+    return list(iter_services(root))
+
+
+def uses_postgres(service):
+    return bool(service.dependencies & {'@prisma/client', 'pg', 'prisma'})
+
+
+def uses_redis(service):
+    return bool(service.dependencies & {'redis', 'ioredis'})
+
+
+def uses_s3(service):
+    return bool(service.dependencies & {'@aws-sdk/client-s3', 'aws-sdk'})
+
+
+def expand_workspaces(root, patterns):
+    """Expand npm ``workspaces`` globs to the directories that have a package.json.
+
+    Returns repository-relative paths with forward slashes, in sorted order.
+    """
+    found = set()
+    for pattern in patterns:
+        for manifest in glob.glob(os.path.join(root, pattern, 'package.json')):
+            relpath = os.path.relpath(os.path.dirname(manifest), root)
+            found.add(relpath.replace(os.sep, '/'))
+    return sorted(found)
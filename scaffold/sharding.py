@@ -0,0 +1,188 @@
+"""Timing-balanced Jest sharding for the generated test-backend jobs.
+
+The CI workflow calls this module on the runners:
+
+    python3 -m scaffold.sharding plan --shard 2 --total 4 --timings T services/auth-service
+    python3 -m scaffold.sharding merge-timings -o T --previous T shards/*/jest-results.json
+    python3 -m scaffold.sharding merge-lcov -o coverage/lcov.info shards/*/coverage/lcov.info
+
+``plan`` assigns test files to shards greedily, longest first, using the
+per-file durations recorded by earlier runs. Files with no history are
+assumed to take the mean known duration. ``merge-timings`` folds Jest
+``--json`` results back into that history. ``merge-lcov`` combines the
+per-shard coverage reports into one.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+TEST_SUFFIXES = ('.test.ts', '.test.js', '.spec.ts', '.spec.js', '.test.tsx', '.spec.tsx')
+SKIP_DIRS = {'node_modules', 'dist', 'build', 'coverage', '.git'}
+DEFAULT_DURATION = 1.0
+
+
+def find_test_files(paths):
+    found = []
+    for base in paths:
+        if os.path.isfile(base):
+            found.append(base)
+            continue
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+            found.extend(os.path.join(dirpath, name) for name in sorted(filenames)
+                         if name.endswith(TEST_SUFFIXES))
+    return sorted({os.path.normpath(p).replace(os.sep, '/') for p in found})
+
+
+def load_timings(path):
+    if not path:
+        return {}
+    try:
+        with open(path) as f:
+            return {k: float(v) for k, v in json.load(f).items()}
+    except (OSError, ValueError):
+        return {}
+
+
+def plan_shards(files, timings, total):
+    """Split ``files`` into ``total`` lists with roughly equal summed duration."""
+    known = [timings[f] for f in files if f in timings]
+    fallback = sum(known) / len(known) if known else DEFAULT_DURATION
+    weighted = sorted(((timings.get(f, fallback), f) for f in files),
+                      key=lambda item: (-item[0], item[1]))
+    shards = [[] for _ in range(total)]
+    loads = [0.0] * total
+    for duration, name in weighted:
+        target = min(range(total), key=lambda i: (loads[i], i))
+        shards[target].append(name)
+        loads[target] += duration
+    return [sorted(shard) for shard in shards], loads
+
+
+def jest_durations(results_path):
+    """Per-file durations in seconds from a Jest ``--json`` output file."""
+    with open(results_path) as f:
+        results = json.load(f)
+    durations = {}
+    for result in results.get('testResults', []):
+        stats = result.get('perfStats') or {}
+        runtime_ms = stats.get('runtime')
+        if runtime_ms is None:
+            start = stats.get('start', result.get('startTime'))
+            end = stats.get('end', result.get('endTime'))
+            if start is None or end is None:
+                continue
+            runtime_ms = end - start
+        name = os.path.relpath(result['name']) if os.path.isabs(result['name']) else result['name']
+        durations[name.replace(os.sep, '/')] = round(runtime_ms / 1000.0, 3)
+    return durations
+
+
+def merge_lcov(paths):
+    """Merge lcov tracefiles, summing hit counts per source file."""
+    files = {}
+    for path in paths:
+        record = None
+        with open(path) as f:
+            for raw in f:
+                line = raw.strip()
+                if line.startswith('SF:'):
+                    record = files.setdefault(line[3:], {'fn': {}, 'fnda': {}, 'da': {}, 'brda': {}})
+                elif record is None or line.startswith(('TN:', 'LF:', 'LH:', 'FNF:', 'FNH:', 'BRF:', 'BRH:')):
+                    continue
+                elif line == 'end_of_record':
+                    record = None
+                elif line.startswith('FN:'):
+                    lineno, name = line[3:].split(',', 1)
+                    record['fn'][name] = lineno
+                elif line.startswith('FNDA:'):
+                    hits, name = line[5:].split(',', 1)
+                    record['fnda'][name] = record['fnda'].get(name, 0) + int(hits)
+                elif line.startswith('DA:'):
+                    lineno, hits = line[3:].split(',')[:2]
+                    key = int(lineno)
+                    record['da'][key] = record['da'].get(key, 0) + int(hits)
+                elif line.startswith('BRDA:'):
+                    lineno, block, branch, taken = line[5:].split(',')
+                    key = (int(lineno), block, branch)
+                    previous = record['brda'].get(key, '-')
+                    if taken == '-':
+                        record['brda'][key] = previous
+                    else:
+                        record['brda'][key] = int(taken) + (0 if previous == '-' else previous)
+
+    out = []
+    for source in sorted(files):
+        record = files[source]
+        out.append('TN:')
+        out.append(f'SF:{source}')
+        for name, lineno in sorted(record['fn'].items(), key=lambda item: (int(item[1]), item[0])):
+            out.append(f'FN:{lineno},{name}')
+        for name in sorted(record['fnda']):
+            out.append(f"FNDA:{record['fnda'][name]},{name}")
+        out.append(f"FNF:{len(record['fn'])}")
+        out.append(f"FNH:{sum(1 for hits in record['fnda'].values() if hits > 0)}")
+        for (lineno, block, branch), taken in sorted(record['brda'].items()):
+            out.append(f'BRDA:{lineno},{block},{branch},{taken}')
+        out.append(f"BRF:{len(record['brda'])}")
+        out.append(f"BRH:{sum(1 for taken in record['brda'].values() if taken not in ('-', 0))}")
+        for lineno in sorted(record['da']):
+            out.append(f"DA:{lineno},{record['da'][lineno]}")
+        out.append(f"LF:{len(record['da'])}")
+        out.append(f"LH:{sum(1 for hits in record['da'].values() if hits > 0)}")
+        out.append('end_of_record')
+    return '\n'.join(out) + '\n' if out else ''
+
+
+def _write(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m scaffold.sharding', description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    plan = commands.add_parser('plan', help='print the test files of one shard')
+    plan.add_argument('--shard', type=int, required=True, help='1-based shard index')
+    plan.add_argument('--total', type=int, required=True)
+    plan.add_argument('--timings', help='JSON {file: seconds} from earlier runs')
+    plan.add_argument('paths', nargs='*', default=['.'])
+
+    timings = commands.add_parser('merge-timings', help='fold Jest --json results into the timing history')
+    timings.add_argument('-o', '--output', required=True)
+    timings.add_argument('--previous', help='existing timing history to update')
+    timings.add_argument('results', nargs='*')
+
+    lcov = commands.add_parser('merge-lcov', help='merge lcov tracefiles')
+    lcov.add_argument('-o', '--output', required=True)
+    lcov.add_argument('tracefiles', nargs='*')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'plan':
+        if not 1 <= args.shard <= args.total:
+            parser.error('--shard must be between 1 and --total')
+        shards, loads = plan_shards(find_test_files(args.paths), load_timings(args.timings), args.total)
+        print(f'shard {args.shard}/{args.total}: {len(shards[args.shard - 1])} files, '
+              f'~{loads[args.shard - 1]:.1f}s', file=sys.stderr)
+        print('\n'.join(shards[args.shard - 1]))
+    elif args.command == 'merge-timings':
+        merged = load_timings(args.previous)
+        for path in args.results:
+            if os.path.exists(path):
+                merged.update(jest_durations(path))
+        _write(args.output, json.dumps(dict(sorted(merged.items())), indent=2) + '\n')
+    elif args.command == 'merge-lcov':
+        existing = [p for p in args.tracefiles if os.path.exists(p)]
+        _write(args.output, merge_lcov(existing))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Start the local infrastructure and wait until every container is ready.
+
+    python3 -m scaffold.stack up                        # minimal stack
+    python3 -m scaffold.stack up --profile full
+    python3 -m scaffold.stack up -f docker-compose.yml -f docker-compose.tmpfs.yml
+    python3 -m scaffold.stack wait postgres redis       # started elsewhere
+
+``up`` runs ``docker compose up -d`` (which creates the containers in
+parallel) and, at the same time, polls every selected service
+concurrently until its healthcheck passes or, for a container without
+one, until it is running. Time-to-ready is measured from the start of
+the command and printed as each service becomes ready, so the slowest
+container is obvious and nothing has to ``sleep``. The exit status is
+non-zero if any service ends up unhealthy, exits or times out.
+
+The generated healthchecks use ``start_interval``, which needs Docker
+Compose 2.20.2 or later on Docker Engine 25 or later; docker-compose v1
+rejects the files. The ``docker compose`` plugin is preferred, and a
+standalone ``docker-compose`` is only used when the plugin is missing.
+"""
+
+import argparse
+import asyncio
+import functools
+import shutil
+import subprocess
+import sys
+import time
+
+POLL_INTERVAL = 0.25
+DEFAULT_TIMEOUT = 180.0
+
+_STATE_FORMAT = '{{.State.Status}} {{if .State.Health}}{{.State.Health.Status}}{{end}}'
+
+
+class StackError(Exception):
+    pass
+
+
+@functools.lru_cache(maxsize=None)
+def has_compose_plugin():
+    if not shutil.which('docker'):
+        return False
+    try:
+        return subprocess.run(['docker', 'compose', 'version'], capture_output=True).returncode == 0
+    except OSError:
+        return False
+
+
+def compose_command(files=(), profiles=()):
+    """Base argv for the ``docker compose`` plugin, else a standalone docker-compose."""
+    if has_compose_plugin() or not shutil.which('docker-compose'):
+        command = ['docker', 'compose']
+    else:
+        command = ['docker-compose']
+    for path in files:
+        command += ['-f', path]
+    for profile in profiles:
+        command += ['--profile', profile]
+    return command
+
+
+async def _run(*argv):
+    process = await asyncio.create_subprocess_exec(
+        *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    out, err = await process.communicate()
+    return process.returncode, out.decode(), err.decode()
+
+
+async def list_services(compose):
+    returncode, out, err = await _run(*compose, 'config', '--services')
+    if returncode != 0:
+        raise StackError(err.strip() or 'docker compose config failed')
+    return out.split()
+
+
+async def container_state(container_id):
+    """(status, health) of a container; health is None without a healthcheck."""
+    returncode, out, _ = await _run('docker', 'inspect', '-f', _STATE_FORMAT, container_id)
+    if returncode != 0:
+        return None, None
+    parts = out.split()
+    return (parts[0] if parts else None), (parts[1] if len(parts) > 1 else None)
+
+
+async def wait_ready(compose, service, started, deadline):
+    """Poll one service; return (service, outcome, seconds since ``started``)."""
+    container = None
+    while True:
+        if container is None:
+            returncode, out, _ = await _run(*compose, 'ps', '-a', '-q', service)
+            ids = out.split() if returncode == 0 else []
+            container = ids[0] if ids else None
+        if container is not None:
+            status, health = await container_state(container)
+            if health == 'healthy' or (health is None and status == 'running'):
+                return service, 'ready', time.monotonic() - started
+            if health == 'unhealthy' or status in ('exited', 'dead'):
+                return service, health or status, time.monotonic() - started
+        if time.monotonic() >= deadline:
+            return service, 'timeout', time.monotonic() - started
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def bring_up(compose, services, timeout, start=True):
+    started = time.monotonic()
+    deadline = started + timeout
+    if not services:
+        services = await list_services(compose)
+    if not services:
+        raise StackError('no services selected')
+
+    up = None
+    if start:
+        up = asyncio.ensure_future(_run(*compose, 'up', '-d', *services))
+    waiters = [asyncio.ensure_future(wait_ready(compose, name, started, deadline))
+               for name in services]
+
+    results = []
+    width = max(len(name) for name in services)
+    try:
+        if up is not None:
+            # Report compose failures (bad file, port in use) instead of
+            # polling until the deadline for containers that never appear.
+            pending = set(waiters) | {up}
+            while up in pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is not up:
+                        results.append(_print_result(task.result(), width))
+            returncode, _, err = up.result()
+            if returncode != 0:
+                raise StackError(err.strip() or 'docker compose up failed')
+            waiters = [task for task in waiters if not task.done()]
+        for task in asyncio.as_completed(waiters):
+            results.append(_print_result(await task, width))
+    finally:
+        for task in waiters:
+            task.cancel()
+    return results, time.monotonic() - started
+
+
+def _print_result(result, width):
+    service, outcome, elapsed = result
+    if outcome == 'ready':
+        print(f'   ✅ {service:<{width}}  ready in {elapsed:5.1f}s')
+    else:
+        print(f'   ❌ {service:<{width}}  {outcome} after {elapsed:.1f}s')
+    sys.stdout.flush()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m scaffold.stack', description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('up', 'start services and wait until they are ready'),
+                            ('wait', 'wait for already started services')):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('-f', '--file', action='append', default=[], dest='files',
+                             help='compose file; repeatable (default: docker-compose.yml)')
+        command.add_argument('--profile', action='append', default=[], dest='profiles',
+                             help='compose profile to enable; repeatable')
+        command.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                             help=f'seconds to wait for all services (default: {DEFAULT_TIMEOUT:g})')
+        command.add_argument('services', nargs='*', help='services to start (default: all selected)')
+    args = parser.parse_args(argv)
+
+    if not (shutil.which('docker') or shutil.which('docker-compose')):
+        print('python -m scaffold.stack: docker is not installed', file=sys.stderr)
+        return 2
+    compose = compose_command(args.files, args.profiles)
+    print('✅ Stack:' if args.command == 'up' else '✅ Waiting for stack:')
+    try:
+        results, elapsed = asyncio.run(
+            bring_up(compose, args.services, args.timeout, start=args.command == 'up'))
+    except StackError as exc:
+        print(f'python -m scaffold.stack: {exc}', file=sys.stderr)
+        return 2
+    failed = [service for service, outcome, _ in results if outcome != 'ready']
+    print(f'   {len(results) - len(failed)}/{len(results)} ready in {elapsed:.1f}s')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,13 @@
 
-import json
+from scaffold import GRAPH, artifact, report
 
 # Create comprehensive setup documentation and files
 
+
 # 1. Main README.md
-readme_content = """# Sarva - Super App Platform
+@artifact('readme', path='README.md')
+def readme():
+    return """# Sarva - Super App Platform
 
 [![License: MIT](https://img.shields.io/badge/License-MIT-yellow.svg)](https://opensource.org/licenses/MIT)
 [![CI/CD](https://github.com/YOUR_ORG/sarva/actions/workflows/ci.yml/badge.svg)](https://github.com/YOUR_ORG/sarva/actions)
@@ -22,7 +25,7 @@ cd sarva
 ./scripts/setup.sh
 
 # Start development environment
-docker-compose up -d
+docker compose up -d
 ```
 
 ## 📋 Table of Contents
@@ -195,7 +198,7 @@ sarva/
 
 4. **Start local infrastructure**
    ```bash
-   docker-compose up -d postgres redis mongodb rabbitmq
+   docker compose up -d postgres redis mongodb rabbitmq
    ```
 
 5. **Run database migrations**
@@ -366,8 +369,7 @@ This project is licensed under the MIT License - see the [LICENSE](LICENSE) file
 Made with ❤️ by the Sarva Team
 """
 
-# Save README
-with open('README.md', 'w') as f:
-    f.write(readme_content)
 
-print("✅ Created: README.md")
+if __name__ == '__main__':
+    # Save README (only rewritten when its content changes)
+    report(GRAPH.build(), "✅ README:")
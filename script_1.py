@@ -1,8 +1,13 @@
 
+from scaffold import GRAPH, artifact, report
+
 # Create additional essential files for GitHub repository setup
 
+
 # 2. CONTRIBUTING.md
-contributing_content = """# Contributing to Sarva
+@artifact('contributing', path='CONTRIBUTING.md')
+def contributing():
+    return """# Contributing to Sarva
 
 Thank you for your interest in contributing to Sarva! This document provides guidelines and instructions for contributing.
 
@@ -396,8 +401,11 @@ Contributors will be:
 Thank you for contributing to Sarva! 🎉
 """
 
+
 # 3. .gitignore
-gitignore_content = """# Dependencies
+@artifact('gitignore', path='.gitignore')
+def gitignore():
+    return """# Dependencies
 node_modules/
 npm-debug.log*
 yarn-debug.log*
@@ -448,9 +456,6 @@ ENV/
 *.dylib
 vendor/
 
-# Docker
-.dockerignore
-
 # Kubernetes
 secrets/
 
@@ -468,6 +473,9 @@ tmp/
 temp/
 *.tmp
 
+# Scaffold manifest (local hashes and mtimes)
+.scaffold-manifest.json
+
 # OS
 Thumbs.db
 .DS_Store
@@ -482,8 +490,13 @@ apps/mobile/android/app/build/
 *.zip
 """
 
+
 # 4. GitHub Issue Template - Bug Report
-bug_template = """---
+# Templates go straight to their .github locations so a regen does not churn
+# them through a write-then-move.
+@artifact('bug-report-template', path='.github/ISSUE_TEMPLATE/bug_report.md')
+def bug_report_template():
+    return """---
 name: Bug Report
 about: Create a report to help us improve
 title: '[BUG] '
@@ -522,8 +535,11 @@ Add any other context about the problem here.
 Link to related Linear issues: SAR-XXX
 """
 
+
 # 5. GitHub Issue Template - Feature Request
-feature_template = """---
+@artifact('feature-request-template', path='.github/ISSUE_TEMPLATE/feature_request.md')
+def feature_request_template():
+    return """---
 name: Feature Request
 about: Suggest an idea for this project
 title: '[FEATURE] '
@@ -557,8 +573,11 @@ If applicable, add mockups or design references.
 Add any other context or information about the feature request.
 """
 
+
 # 6. Pull Request Template
-pr_template = """## 📝 Description
+@artifact('pr-template', path='.github/PULL_REQUEST_TEMPLATE.md')
+def pull_request_template():
+    return """## 📝 Description
 <!-- Provide a brief description of the changes -->
 
 ## 🎯 Related Issues
@@ -621,8 +640,11 @@ Closes SAR-XXX
 - [ ] Security implications
 """
 
+
 # 7. LICENSE (MIT)
-license_content = """MIT License
+@artifact('license', path='LICENSE')
+def license_file():
+    return """MIT License
 
 Copyright (c) 2026 Sarva Team
 
@@ -645,33 +667,7 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-# Save files
-files_created = []
-
-with open('CONTRIBUTING.md', 'w') as f:
-    f.write(contributing_content)
-files_created.append('CONTRIBUTING.md')
-
-with open('.gitignore', 'w') as f:
-    f.write(gitignore_content)
-files_created.append('.gitignore')
-
-with open('BUG_REPORT_TEMPLATE.md', 'w') as f:
-    f.write(bug_template)
-files_created.append('BUG_REPORT_TEMPLATE.md')
-
-with open('FEATURE_REQUEST_TEMPLATE.md', 'w') as f:
-    f.write(feature_template)
-files_created.append('FEATURE_REQUEST_TEMPLATE.md')
-
-with open('PULL_REQUEST_TEMPLATE.md', 'w') as f:
-    f.write(pr_template)
-files_created.append('PULL_REQUEST_TEMPLATE.md')
-
-with open('LICENSE', 'w') as f:
-    f.write(license_content)
-files_created.append('LICENSE')
 
-print("✅ GitHub Repository Files Created:")
-for file in files_created:
-    print(f"   - {file}")
+if __name__ == '__main__':
+    # Save files (only rewritten when their content changes)
+    report(GRAPH.build(), "✅ GitHub Repository Files:")
@@ -0,0 +1,191 @@
+
+import json
+import os
+import posixpath
+
+import script_2  # noqa: F401  (registers the 'services' node)
+from scaffold import GRAPH, artifact, report
+
+# Create Dockerfiles for every service in the build matrix
+
+NODE_IMAGE = 'node:18-alpine'
+TURBO_VERSION = '2'
+
+# Schema used by services that talk to Prisma but do not ship their own
+SHARED_PRISMA_SCHEMA = 'packages/database/prisma/schema.prisma'
+
+
+def start_command(service):
+    """Exec-form CMD for the service, from its ``start`` script when it is plain ``node <file>``."""
+    start = service.package.get('scripts', {}).get('start', '')
+    parts = start.split()
+    if len(parts) == 2 and parts[0] == 'node':
+        return ['node', parts[1]]
+    return ['npm', 'start']
+
+
+def runtime_dir(service):
+    """Top-level directory the running service needs (``dist`` when built, else ``src``)."""
+    command = start_command(service)
+    if command[0] == 'node' and '/' in command[1]:
+        return command[1].split('/', 1)[0]
+    return 'dist' if 'build' in service.package.get('scripts', {}) else 'src'
+
+
+def prisma_schema(service):
+    """Schema to generate the Prisma client from, or None if the service has no Prisma."""
+    if '@prisma/client' not in service.dependencies:
+        return None
+    for schema in (posixpath.join(service.path, 'prisma', 'schema.prisma'), SHARED_PRISMA_SCHEMA):
+        if os.path.exists(os.path.join(script_2.REPO_ROOT, schema)):
+            return schema
+    return None
+
+
+def prisma_client_dir(service):
+    """node_modules that holds the service's @prisma/client, and so its generated client.
+
+    A service pinning a different Prisma major than the root gets its own
+    copy under the service directory (wallet-service does).
+    """
+    nested = posixpath.join(service.path, 'node_modules')
+    with open(os.path.join(script_2.REPO_ROOT, 'package-lock.json')) as f:
+        packages = json.load(f).get('packages', {})
+    return nested if f'{nested}/@prisma/client' in packages else 'node_modules'
+
+
+def local_packages(service, workspaces):
+    """Workspaces under packages/ that the service depends on, by path.
+
+    npm links these into node_modules instead of installing them, so the
+    runner has to carry their sources itself.
+    """
+    paths = []
+    for workspace in workspaces:
+        if not workspace.startswith('packages/'):
+            continue
+        with open(os.path.join(script_2.REPO_ROOT, workspace, 'package.json')) as f:
+            if json.load(f).get('name') in service.dependencies:
+                paths.append(workspace)
+    return paths
+
+
+def render_dockerfile(service, workspaces=()):
+    name = service.package.get('name', service.name)
+    path = service.path
+    schema = prisma_schema(service)
+    has_build = 'build' in service.package.get('scripts', {})
+    builder_base = 'prisma' if schema else 'deps'
+    runtime = runtime_dir(service)
+
+    lines = [
+        '# syntax=docker/dockerfile:1.6',
+        f'# Generated by script_3.py for {name}; edit the generator, not this file.',
+        '',
+        f'FROM {NODE_IMAGE} AS base',
+        'RUN apk add --no-cache libc6-compat openssl',
+        'WORKDIR /app',
+        '',
+        '# Prune the monorepo down to this service and the workspaces it uses',
+        'FROM base AS pruner',
+        f'RUN npm install -g turbo@{TURBO_VERSION}',
+        'COPY . .',
+        f'RUN turbo prune {name} --docker',
+        '',
+        '# Dependencies: keyed on package.json files and the lockfile only',
+        'FROM base AS deps',
+        'COPY --from=pruner /app/out/json/ .',
+        'RUN --mount=type=cache,target=/root/.npm npm ci',
+        '',
+    ]
+    if schema:
+        lines += [
+            '# Prisma client: only rebuilt when the schema changes',
+            'FROM deps AS prisma',
+            f'COPY --from=pruner /app/{schema} ./{schema}',
+            # The service's own prisma CLI, matching the client it generates into
+            f'RUN npm exec -w {path} -- prisma generate --schema /app/{schema}',
+            '',
+        ]
+    lines += [
+        f'FROM {builder_base} AS builder',
+        'COPY --from=pruner /app/out/full/ .',
+    ]
+    if has_build:
+        lines.append(f'RUN npx turbo run build --filter={name}')
+    lines += [
+        '',
+        '# Production dependencies only',
+        'FROM base AS prod-deps',
+        'COPY --from=pruner /app/out/json/ .',
+        'RUN --mount=type=cache,target=/root/.npm npm ci --omit=dev',
+        f'RUN mkdir -p {path}/node_modules',
+        '',
+        'FROM base AS runner',
+        'ENV NODE_ENV=production',
+        'COPY --from=prod-deps --chown=node:node /app/node_modules ./node_modules',
+    ]
+    lines += [
+        f'COPY --from=prod-deps --chown=node:node /app/{path}/node_modules ./{path}/node_modules',
+    ]
+    if schema:
+        # After node_modules, whose .prisma is only @prisma/client's stub
+        client = prisma_client_dir(service)
+        lines.append(f'COPY --from=prisma --chown=node:node /app/{client}/.prisma ./{client}/.prisma')
+    lines += [f'COPY --from=builder --chown=node:node /app/{package} ./{package}'
+              for package in local_packages(service, workspaces)]
+    lines += [
+        f'COPY --from=builder --chown=node:node /app/{path}/package.json ./{path}/package.json',
+        f'COPY --from=builder --chown=node:node /app/{path}/{runtime} ./{path}/{runtime}',
+        f'WORKDIR /app/{path}',
+        'USER node',
+    ]
+    if service.port:
+        lines.append(f'EXPOSE {service.port}')
+    lines.append('CMD [' + ', '.join(f'"{part}"' for part in start_command(service)) + ']')
+    return '\n'.join(lines) + '\n'
+
+
+# 1. One Dockerfile per service
+@artifact('dockerfiles', deps=['services', 'workspaces'], multi=True)
+def dockerfiles(services, workspaces):
+    return {f'{service.path}/Dockerfile': render_dockerfile(service, workspaces) for service in services}
+
+
+# 2. Build context ignore list (the context is the repository root)
+@artifact('dockerignore', path='.dockerignore')
+def dockerignore():
+    return """# Dependencies and build output are rebuilt inside the image
+**/node_modules
+**/dist
+**/build
+**/coverage
+**/.turbo
+out/
+
+# VCS, editors and local state
+.git
+.github
+.vscode
+.idea
+**/.DS_Store
+**/*.log
+.scaffold-manifest.json
+
+# Secrets
+**/.env
+**/.env.*
+!**/.env.example
+
+# Not needed to build services
+docs/
+frontend/
+apps/mobile/
+**/*.md
+**/__pycache__
+"""
+
+
+if __name__ == '__main__':
+    # Save files (only rewritten when their content changes)
+    report(GRAPH.build(['dockerfiles', 'dockerignore']), "✅ Docker Files:")
@@ -2,15 +2,41 @@
 const express = require('express');
 const cors = require('cors');
 const dotenv = require('dotenv');
+const { createProxy } = require('./proxy');
 
 dotenv.config();
 
 const app = express();
 const PORT = process.env.PORT || 8000;
 
+// Upstream services; bodies are streamed through, so no body parser here
+const ROUTES = [
+  {
+    prefix: '/api/auth',
+    target: process.env.AUTH_SERVICE_URL || 'http://localhost:8001',
+    // Login and register wait on password hashing
+    timeoutMs: Number(process.env.AUTH_SERVICE_TIMEOUT_MS) || 5000,
+  },
+  {
+    prefix: '/api/wallet',
+    target: process.env.WALLET_SERVICE_URL || 'http://localhost:8002',
+    // Batched transfers can take a while
+    timeoutMs: Number(process.env.WALLET_SERVICE_TIMEOUT_MS) || 15000,
+  },
+];
+
+const proxies = ROUTES.map((route) => ({
+  prefix: route.prefix,
+  proxy: createProxy({
+    target: route.target,
+    timeoutMs: route.timeoutMs,
+    retries: Number(process.env.GATEWAY_RETRIES ?? 2),
+    maxSockets: Number(process.env.GATEWAY_MAX_SOCKETS) || 128,
+  }),
+}));
+
 // Middleware
 app.use(cors());
-app.use(express.json());
 
 // Health check
 app.get('/health', (req, res) => {
@@ -23,6 +49,14 @@ app.get('/health', (req, res) => {
   });
 });
 
+app.get('/metrics', (req, res) => {
+  res.json({ upstreams: Object.fromEntries(proxies.map(({ prefix, proxy }) => [prefix, proxy.metrics()])) });
+});
+
+for (const { prefix, proxy } of proxies) {
+  app.use(prefix, (req, res) => proxy.handle(req, res));
+}
+
 // Root endpoint
 app.get('/', (req, res) => {
   res.json({
@@ -31,8 +65,7 @@ app.get('/', (req, res) => {
     endpoints: {
       health: '/health',
       auth: '/api/auth',
-      wallet: '/api/wallet',
-      messaging: '/api/messaging'
+      wallet: '/api/wallet'
     }
   });
 });
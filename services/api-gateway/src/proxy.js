@@ -0,0 +1,243 @@
+const http = require('http');
+
+// Streaming reverse proxy to one upstream service.
+//
+// Requests and responses are piped through without buffering, over a
+// keep-alive agent so each upstream sees a small pool of long-lived
+// connections instead of one TCP handshake per request. On top of that:
+//
+// - timeoutMs bounds the wait for the upstream's response headers (504);
+// - bodyless idempotent requests (GET, HEAD, OPTIONS) are retried on
+//   connection errors, timeouts and 502/503/504, with a short backoff;
+// - a circuit breaker opens after `failureThreshold` consecutive failures
+//   and answers 503 at once for `cooldownMs`, then lets one probe through.
+//
+// A 503 with Retry-After is the upstream shedding load on purpose: it is
+// passed straight to the client, neither retried nor counted as a failure.
+
+const RETRYABLE_METHODS = new Set(['GET', 'HEAD', 'OPTIONS']);
+const RETRYABLE_STATUSES = new Set([502, 503, 504]);
+
+// Hop-by-hop headers apply to one connection and are not forwarded
+const HOP_BY_HOP = new Set([
+  'connection',
+  'keep-alive',
+  'proxy-authenticate',
+  'proxy-authorization',
+  'proxy-connection',
+  'te',
+  'trailer',
+  'transfer-encoding',
+  'upgrade',
+]);
+
+const RETRY_BACKOFF_MS = 25;
+
+class UpstreamTimeout extends Error {
+  constructor(timeoutMs) {
+    super(`no response within ${timeoutMs}ms`);
+    this.code = 'UPSTREAM_TIMEOUT';
+  }
+}
+
+class CircuitBreaker {
+  constructor({ failureThreshold = 5, cooldownMs = 10000 } = {}) {
+    this.failureThreshold = failureThreshold;
+    this.cooldownMs = cooldownMs;
+    this.failures = 0;
+    this.openedAt = 0;
+    this.probing = false;
+  }
+
+  get state() {
+    if (this.failures < this.failureThreshold) {
+      return 'closed';
+    }
+    return Date.now() - this.openedAt >= this.cooldownMs ? 'half-open' : 'open';
+  }
+
+  // Whether a request may go to the upstream now
+  allow() {
+    const state = this.state;
+    if (state === 'closed') {
+      return true;
+    }
+    if (state === 'half-open' && !this.probing) {
+      this.probing = true;
+      return true;
+    }
+    return false;
+  }
+
+  success() {
+    this.failures = 0;
+    this.probing = false;
+  }
+
+  failure() {
+    this.probing = false;
+    this.failures++;
+    if (this.failures >= this.failureThreshold) {
+      this.openedAt = Date.now();
+    }
+  }
+}
+
+function forwardHeaders(req) {
+  const headers = {};
+  for (const [name, value] of Object.entries(req.headers)) {
+    if (!HOP_BY_HOP.has(name)) {
+      headers[name] = value;
+    }
+  }
+  const forwardedFor = req.headers['x-forwarded-for'];
+  const address = req.socket.remoteAddress || '';
+  headers['x-forwarded-for'] = forwardedFor ? `${forwardedFor}, ${address}` : address;
+  headers['x-forwarded-proto'] = req.protocol || 'http';
+  headers['x-forwarded-host'] = req.headers.host || '';
+  return headers;
+}
+
+function responseHeaders(upstream) {
+  const headers = {};
+  for (const [name, value] of Object.entries(upstream.headers)) {
+    if (!HOP_BY_HOP.has(name)) {
+      headers[name] = value;
+    }
+  }
+  return headers;
+}
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+function createProxy({
+  target,
+  timeoutMs = 10000,
+  retries = 2,
+  maxSockets = 128,
+  maxFreeSockets = 32,
+  breaker: breakerOptions,
+}) {
+  const upstreamUrl = new URL(target);
+  // lifo hands out the most recently used socket, so idle ones time out
+  // and close instead of all being kept barely alive.
+  const agent = new http.Agent({ keepAlive: true, maxSockets, maxFreeSockets, scheduling: 'lifo' });
+  const breaker = new CircuitBreaker(breakerOptions);
+  const metrics = { requests: 0, retries: 0, failures: 0, timeouts: 0, rejected: 0, shed: 0 };
+
+  // One attempt; resolves with the upstream response once its headers arrive
+  function attempt(req, headers, replayable) {
+    return new Promise((resolve, reject) => {
+      const upstreamReq = http.request({
+        protocol: upstreamUrl.protocol,
+        hostname: upstreamUrl.hostname,
+        port: upstreamUrl.port,
+        method: req.method,
+        path: req.originalUrl,
+        headers,
+        agent,
+      });
+      const timer = setTimeout(() => upstreamReq.destroy(new UpstreamTimeout(timeoutMs)), timeoutMs);
+      upstreamReq.on('response', (upstream) => {
+        clearTimeout(timer);
+        resolve({ upstream, upstreamReq });
+      });
+      upstreamReq.on('error', (error) => {
+        clearTimeout(timer);
+        reject(error);
+      });
+      if (replayable) {
+        upstreamReq.end();
+      } else {
+        req.pipe(upstreamReq);
+      }
+    });
+  }
+
+  function fail(res, status, message) {
+    if (!res.headersSent) {
+      res.status(status).json({ error: message });
+    } else {
+      res.destroy();
+    }
+  }
+
+  async function handle(req, res) {
+    metrics.requests++;
+    if (!breaker.allow()) {
+      metrics.rejected++;
+      res.set('Retry-After', String(Math.ceil(breaker.cooldownMs / 1000)));
+      return fail(res, 503, 'Upstream unavailable');
+    }
+
+    const headers = forwardHeaders(req);
+    const replayable = RETRYABLE_METHODS.has(req.method) && !req.headers['content-length'] && !req.headers['transfer-encoding'];
+    const attempts = replayable ? retries + 1 : 1;
+
+    let closed = false;
+    let current;
+    res.on('close', () => {
+      closed = true;
+      // Client went away before the response finished: drop the upstream request
+      if (!res.writableFinished && current) {
+        current.destroy();
+      }
+    });
+
+    for (let i = 0; i < attempts && !closed; i++) {
+      if (i > 0) {
+        metrics.retries++;
+        await sleep(RETRY_BACKOFF_MS * 2 ** (i - 1) * (0.5 + Math.random()));
+      }
+      let result;
+      try {
+        result = await attempt(req, headers, replayable);
+      } catch (error) {
+        if (error.code === 'UPSTREAM_TIMEOUT') {
+          metrics.timeouts++;
+        }
+        breaker.failure();
+        if (i + 1 < attempts && breaker.allow()) {
+          continue;
+        }
+        metrics.failures++;
+        return error.code === 'UPSTREAM_TIMEOUT'
+          ? fail(res, 504, 'Upstream timed out')
+          : fail(res, 502, 'Upstream unreachable');
+      }
+
+      const { upstream, upstreamReq } = result;
+      current = upstreamReq;
+      if (upstream.statusCode === 503 && upstream.headers['retry-after'] !== undefined) {
+        metrics.shed++;
+        breaker.success();
+      } else if (RETRYABLE_STATUSES.has(upstream.statusCode)) {
+        breaker.failure();
+        if (i + 1 < attempts && breaker.allow()) {
+          upstream.resume();
+          continue;
+        }
+        metrics.failures++;
+      } else {
+        breaker.success();
+      }
+      if (closed) {
+        upstreamReq.destroy();
+        return;
+      }
+      res.writeHead(upstream.statusCode, responseHeaders(upstream));
+      upstream.pipe(res);
+      upstream.on('error', () => res.destroy());
+      return;
+    }
+  }
+
+  return {
+    handle,
+    metrics() {
+      return { target, state: breaker.state, ...metrics };
+    },
+  };
+}
+
+module.exports = { createProxy, CircuitBreaker };
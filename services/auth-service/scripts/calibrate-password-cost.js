@@ -0,0 +1,74 @@
+#!/usr/bin/env node
+// Pick the bcrypt cost for this machine: the highest cost whose median hash
+// time stays under the target latency. Run it on the hardware the service
+// is deployed to and set the result as PASSWORD_HASH_COST.
+//
+//   npm run calibrate:hash -- --target-ms 250 --workers 3
+//
+// --workers is PASSWORD_HASH_WORKERS; it is used to estimate how many
+// logins per second one replica can absorb at the chosen cost.
+
+const bcrypt = require('bcrypt');
+
+const MIN_COST = 8;
+const MAX_COST = 16;
+
+function parseArgs(argv) {
+  const args = { targetMs: 250, workers: 1, samples: 5 };
+  for (let i = 0; i < argv.length; i += 2) {
+    const value = Number(argv[i + 1]);
+    if (!Number.isFinite(value) || value <= 0) {
+      throw new Error(`expected a positive number after ${argv[i]}`);
+    }
+    if (argv[i] === '--target-ms') args.targetMs = value;
+    else if (argv[i] === '--workers') args.workers = value;
+    else if (argv[i] === '--samples') args.samples = value;
+    else throw new Error(`unknown option ${argv[i]}`);
+  }
+  return args;
+}
+
+function medianHashMs(cost, samples) {
+  const times = [];
+  for (let i = 0; i < samples; i++) {
+    const started = process.hrtime.bigint();
+    bcrypt.hashSync('calibration-password', cost);
+    times.push(Number(process.hrtime.bigint() - started) / 1e6);
+  }
+  times.sort((a, b) => a - b);
+  return times[Math.floor(times.length / 2)];
+}
+
+function main() {
+  let args;
+  try {
+    args = parseArgs(process.argv.slice(2));
+  } catch (error) {
+    console.error(`calibrate-password-cost: ${error.message}`);
+    return 2;
+  }
+
+  let chosen = null;
+  console.log(`cost  median ms  logins/s (${args.workers} worker${args.workers === 1 ? '' : 's'})`);
+  for (let cost = MIN_COST; cost <= MAX_COST; cost++) {
+    const ms = medianHashMs(cost, args.samples);
+    const marker = ms <= args.targetMs ? '✅' : '  ';
+    console.log(`${marker} ${String(cost).padStart(2)}  ${ms.toFixed(1).padStart(9)}  ${((1000 / ms) * args.workers).toFixed(0).padStart(8)}`);
+    if (ms <= args.targetMs) {
+      chosen = cost;
+    }
+    // Each step doubles the work; stop once well past the target
+    if (ms > args.targetMs * 2) {
+      break;
+    }
+  }
+
+  if (chosen === null) {
+    console.error(`calibrate-password-cost: even cost ${MIN_COST} exceeds ${args.targetMs}ms`);
+    return 1;
+  }
+  console.log(`\nPASSWORD_HASH_COST=${chosen}`);
+  return 0;
+}
+
+process.exitCode = main();
@@ -1,6 +1,7 @@
 import { Request, Response } from 'express';
 import { UserService } from '../services/user.service';
 import { AuthService } from '../services/auth.service';
+import { PasswordHasherBusyError } from '../services/password.hasher';
 
 const userService = new UserService();
 const authService = new AuthService();
@@ -20,6 +21,9 @@ export class AuthController {
 
       res.status(201).json({ message: 'User registered successfully', user, token, refreshToken });
     } catch (error) {
+      if (error instanceof PasswordHasherBusyError) {
+        return res.status(503).set('Retry-After', '1').json({ error: 'Too many requests, try again shortly' });
+      }
       console.error('Register error:', error);
       res.status(500).json({ error: 'Registration failed' });
     }
@@ -43,6 +47,9 @@ export class AuthController {
         refreshToken,
       });
     } catch (error) {
+      if (error instanceof PasswordHasherBusyError) {
+        return res.status(503).set('Retry-After', '1').json({ error: 'Too many requests, try again shortly' });
+      }
       console.error('Login error:', error);
       res.status(500).json({ error: 'Login failed' });
     }
@@ -2,6 +2,9 @@ import express from 'express';
 import cors from 'cors';
 import dotenv from 'dotenv';
 import authRoutes from './routes/auth.routes';
+import { tokenVerifier } from './services/auth.service';
+import { hasherMetrics } from './services/password.hasher';
+import { reaperMetrics, startSessionReaper } from './services/session.reaper';
 
 dotenv.config();
 
@@ -19,9 +22,14 @@ app.get('/health', (req, res) => {
   });
 });
 
+app.get('/metrics', (req, res) => {
+  res.json({ tokenVerifier: tokenVerifier.metrics, passwordHasher: hasherMetrics, sessionReaper: reaperMetrics });
+});
+
 app.use('/api/auth', authRoutes);
 
 app.listen(PORT, () => {
   console.log(`🔐 Auth Service running on http://localhost:${PORT}`);
   console.log(`🏥 Health: http://localhost:${PORT}/health`);
+  startSessionReaper();
 });
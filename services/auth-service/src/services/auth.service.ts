@@ -1,19 +1,27 @@
+import { randomUUID } from 'crypto';
 import { PrismaClient } from '@prisma/client';
+import { getPrismaClient } from 'database';
+import { createTokenVerifier, tokenDigest } from 'auth-token';
 import jwt from 'jsonwebtoken';
 
-const prisma = new PrismaClient();
+const prisma = getPrismaClient(PrismaClient);
 const JWT_SECRET = process.env.JWT_SECRET || 'your-secret-key';
 const JWT_EXPIRATION = '7d';
 
+// One per process: the verification cache is shared by every request
+export const tokenVerifier = createTokenVerifier({ secret: JWT_SECRET });
+
 export class AuthService {
+  // jwtid keeps tokens issued to one user within the same second distinct
   generateToken(userId: string): string {
-    return jwt.sign({ userId }, JWT_SECRET, { expiresIn: JWT_EXPIRATION });
+    return jwt.sign({ userId }, JWT_SECRET, { expiresIn: JWT_EXPIRATION, jwtid: randomUUID() });
   }
 
   generateRefreshToken(userId: string): string {
-    return jwt.sign({ userId, type: 'refresh' }, JWT_SECRET, { expiresIn: '30d' });
+    return jwt.sign({ userId, type: 'refresh' }, JWT_SECRET, { expiresIn: '30d', jwtid: randomUUID() });
   }
 
+  // Sessions store token digests, never the tokens themselves
   async createSession(userId: string) {
     const token = this.generateToken(userId);
     const refreshToken = this.generateRefreshToken(userId);
@@ -21,21 +29,19 @@ export class AuthService {
     expiresAt.setDate(expiresAt.getDate() + 7);
 
     await prisma.session.create({
-      data: { userId, token, refreshToken, expiresAt },
+      data: { userId, tokenHash: tokenDigest(token), refreshTokenHash: tokenDigest(refreshToken), expiresAt },
     });
 
     return { token, refreshToken };
   }
 
-  verifyToken(token: string) {
-    try {
-      return jwt.verify(token, JWT_SECRET) as { userId: string };
-    } catch {
-      return null;
-    }
+  async verifyToken(token: string) {
+    const claims = await tokenVerifier.verify(token);
+    return claims as { userId: string } | null;
   }
 
   async deleteSession(token: string) {
-    await prisma.session.delete({ where: { token } });
+    await prisma.session.deleteMany({ where: { tokenHash: tokenDigest(token) } });
+    await tokenVerifier.revoke(token);
   }
 }
@@ -0,0 +1,179 @@
+import os from 'os';
+import { Worker } from 'worker_threads';
+
+// bcrypt on a dedicated pool of worker threads.
+//
+// bcrypt.hash/compare run on the libuv threadpool (4 threads by default),
+// which fs, dns.lookup and zlib share; a burst of logins used to occupy all
+// of it and stall every other request. Here hashing has its own threads,
+// at most PASSWORD_HASH_WORKERS jobs run at once, and jobs beyond that wait
+// in a queue of at most PASSWORD_HASH_MAX_QUEUE before new ones are refused
+// with PasswordHasherBusyError (the controllers answer 503).
+//
+// PASSWORD_HASH_COST is the bcrypt cost for new hashes; pick it per
+// deployment with `npm run calibrate:hash`. Hashes made with another cost
+// still verify and are replaced on the next successful login.
+
+const DEFAULT_COST = 10;
+const DEFAULT_MAX_QUEUE = 1000;
+
+export class PasswordHasherBusyError extends Error {
+  constructor() {
+    super('Password hashing queue is full');
+    this.name = 'PasswordHasherBusyError';
+  }
+}
+
+export const hasherMetrics = {
+  workers: 0,
+  active: 0,
+  queueDepth: 0,
+  peakQueueDepth: 0,
+  completed: 0,
+  rejected: 0,
+  rehashed: 0,
+  failed: 0,
+  waitMsTotal: 0,
+  runMsTotal: 0,
+};
+
+type Job = {
+  op: 'hash' | 'compare';
+  password: string;
+  hash?: string;
+  cost?: number;
+  queuedAt: number;
+  resolve: (result: any) => void;
+  reject: (error: Error) => void;
+};
+
+type PoolWorker = { worker: Worker; job?: Job; startedAt?: number };
+
+// Evaluated in each worker; bcrypt is resolved here so the worker finds the
+// same copy wherever the service is started from.
+const WORKER_SOURCE = `
+const { parentPort } = require('worker_threads');
+const bcrypt = require(${JSON.stringify(require.resolve('bcrypt'))});
+parentPort.on('message', ({ op, password, hash, cost }) => {
+  try {
+    const result = op === 'hash' ? bcrypt.hashSync(password, cost) : bcrypt.compareSync(password, hash);
+    parentPort.postMessage({ result });
+  } catch (error) {
+    parentPort.postMessage({ error: String((error && error.message) || error) });
+  }
+});
+`;
+
+let config: { workers: number; cost: number; maxQueue: number } | undefined;
+const idle: PoolWorker[] = [];
+const queue: Job[] = [];
+
+// Read on first use, after dotenv has loaded the environment
+function settings() {
+  if (!config) {
+    const cpus = os.cpus().length || 1;
+    config = {
+      workers: Number(process.env.PASSWORD_HASH_WORKERS) || Math.max(1, Math.min(4, cpus - 1)),
+      cost: Number(process.env.PASSWORD_HASH_COST) || DEFAULT_COST,
+      maxQueue: Number(process.env.PASSWORD_HASH_MAX_QUEUE) || DEFAULT_MAX_QUEUE,
+    };
+    for (let i = 0; i < config.workers; i++) {
+      idle.push(spawn());
+    }
+  }
+  return config;
+}
+
+function spawn(): PoolWorker {
+  const entry: PoolWorker = { worker: new Worker(WORKER_SOURCE, { eval: true }) };
+  entry.worker.on('message', (message: { result?: any; error?: string }) => {
+    const job = entry.job!;
+    hasherMetrics.runMsTotal += Date.now() - entry.startedAt!;
+    finish(entry);
+    if (message.error !== undefined) {
+      hasherMetrics.failed++;
+      job.reject(new Error(message.error));
+    } else {
+      hasherMetrics.completed++;
+      job.resolve(message.result);
+    }
+  });
+  entry.worker.on('error', (error) => {
+    // The thread is gone; fail its job and put a fresh worker in its place
+    const job = entry.job;
+    if (job) {
+      entry.job = undefined;
+      hasherMetrics.active--;
+      hasherMetrics.failed++;
+      job.reject(error);
+    }
+    replace(entry);
+  });
+  // Only busy workers keep the process alive; unref after the listeners
+  // are attached, since attaching them refs the worker again.
+  entry.worker.unref();
+  hasherMetrics.workers++;
+  return entry;
+}
+
+function replace(entry: PoolWorker) {
+  hasherMetrics.workers--;
+  if (idle.includes(entry)) {
+    idle.splice(idle.indexOf(entry), 1);
+  }
+  entry.worker.removeAllListeners();
+  entry.worker.terminate().catch(() => undefined);
+  const fresh = spawn();
+  idle.push(fresh);
+  drain();
+}
+
+function finish(entry: PoolWorker) {
+  entry.job = undefined;
+  entry.worker.unref();
+  hasherMetrics.active--;
+  idle.push(entry);
+  drain();
+}
+
+function drain() {
+  while (idle.length && queue.length) {
+    const entry = idle.pop()!;
+    const job = queue.shift()!;
+    hasherMetrics.queueDepth = queue.length;
+    hasherMetrics.active++;
+    hasherMetrics.waitMsTotal += Date.now() - job.queuedAt;
+    entry.job = job;
+    entry.startedAt = Date.now();
+    entry.worker.ref();
+    entry.worker.postMessage({ op: job.op, password: job.password, hash: job.hash, cost: job.cost });
+  }
+}
+
+function submit<T>(job: Omit<Job, 'queuedAt' | 'resolve' | 'reject'>): Promise<T> {
+  const { maxQueue } = settings();
+  if (queue.length >= maxQueue) {
+    hasherMetrics.rejected++;
+    return Promise.reject(new PasswordHasherBusyError());
+  }
+  return new Promise<T>((resolve, reject) => {
+    queue.push({ ...job, queuedAt: Date.now(), resolve, reject });
+    hasherMetrics.queueDepth = queue.length;
+    hasherMetrics.peakQueueDepth = Math.max(hasherMetrics.peakQueueDepth, queue.length);
+    drain();
+  });
+}
+
+export function hashPassword(password: string): Promise<string> {
+  return submit<string>({ op: 'hash', password, cost: settings().cost });
+}
+
+export function comparePassword(password: string, hash: string): Promise<boolean> {
+  return submit<boolean>({ op: 'compare', password, hash });
+}
+
+// True when `hash` was made with a cost other than the configured one
+export function needsRehash(hash: string): boolean {
+  const rounds = Number(hash.split('$')[2]);
+  return rounds !== settings().cost;
+}
@@ -0,0 +1,232 @@
+import { PrismaClient } from '@prisma/client';
+import { getPrismaClient } from 'database';
+
+// Deletes expired sessions in the background.
+//
+// Every SESSION_REAPER_INTERVAL_MS (jittered, so replicas drift apart) the
+// reaper deletes expired rows in batches of SESSION_REAPER_BATCH_SIZE,
+// walking the sessions_expiresAt_idx index, until a batch comes back short
+// or SESSION_REAPER_MAX_BATCHES have run. Each batch is its own short
+// statement, and rows another replica is already deleting are skipped
+// (SKIP LOCKED), so logins never queue behind a large DELETE.
+//
+// When sessions has been converted to daily range partitions on expiresAt
+// (packages/database/prisma/partitioning/sessions_by_expires_at.sql), the
+// reaper also creates partitions SESSION_PARTITION_DAYS_AHEAD days ahead
+// and detaches and drops whole days once every session in them expired:
+// O(1), with no dead tuples left for vacuum. Sessions that landed in
+// sessions_default, because no partition covered their day, are first
+// moved into partitions of their own days. Replicas racing on the same
+// partition fail harmlessly; the next run sees the settled state.
+
+const DEFAULT_INTERVAL_MS = 60_000;
+const DEFAULT_BATCH_SIZE = 1000;
+const DEFAULT_MAX_BATCHES = 100;
+const DEFAULT_DAYS_AHEAD = 14;
+const DAY_MS = 86_400_000;
+
+const prisma = getPrismaClient(PrismaClient);
+
+export const reaperMetrics = {
+  runs: 0,
+  deleted: 0,
+  partitionsCreated: 0,
+  partitionsDropped: 0,
+  rowsMoved: 0,
+  errors: 0,
+  lastRunAt: null as string | null,
+  lastRunMs: 0,
+  lastError: null as string | null,
+};
+
+type ReaperSettings = { intervalMs: number; batchSize: number; maxBatches: number; daysAhead: number };
+
+// Read on first use, after dotenv has loaded the environment
+function settings(): ReaperSettings {
+  return {
+    intervalMs: Number(process.env.SESSION_REAPER_INTERVAL_MS) || DEFAULT_INTERVAL_MS,
+    batchSize: Number(process.env.SESSION_REAPER_BATCH_SIZE) || DEFAULT_BATCH_SIZE,
+    maxBatches: Number(process.env.SESSION_REAPER_MAX_BATCHES) || DEFAULT_MAX_BATCHES,
+    daysAhead: Number(process.env.SESSION_PARTITION_DAYS_AHEAD) || DEFAULT_DAYS_AHEAD,
+  };
+}
+
+// sessions_pYYYYMMDD holds sessions expiring on that UTC day
+function partitionName(day: Date): string {
+  return `sessions_p${day.toISOString().slice(0, 10).replace(/-/g, '')}`;
+}
+
+function partitionDay(name: string): Date | null {
+  const match = /^sessions_p(\d{4})(\d{2})(\d{2})$/.exec(name);
+  return match ? new Date(Date.UTC(Number(match[1]), Number(match[2]) - 1, Number(match[3]))) : null;
+}
+
+async function isPartitioned(): Promise<boolean> {
+  const rows = await prisma.$queryRaw<{ partitioned: boolean }[]>`
+    SELECT EXISTS (
+      SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('sessions')
+    ) AS partitioned
+  `;
+  return rows[0].partitioned;
+}
+
+async function defaultPartition(): Promise<string | null> {
+  const rows = await prisma.$queryRaw<{ name: string | null }[]>`
+    SELECT NULLIF(partdefid, 0)::regclass::text AS name
+    FROM pg_partitioned_table WHERE partrelid = to_regclass('sessions')
+  `;
+  return rows[0]?.name ?? null;
+}
+
+// A day can only get its partition once the default holds none of its
+// rows, so each day is moved in one transaction: a standalone table is
+// filled from the default and attached, which also builds its indexes.
+// Past days are left to deleteExpired, which reaches the default too.
+async function splitDefault(today: Date) {
+  const defaultName = await defaultPartition();
+  if (!defaultName) {
+    return;
+  }
+  const days = await prisma.$queryRawUnsafe<{ day: Date }[]>(
+    `SELECT DISTINCT date_trunc('day', "expiresAt") AS day FROM ${defaultName} ` +
+      `WHERE "expiresAt" >= '${today.toISOString()}' ORDER BY 1`
+  );
+  for (const { day } of days) {
+    const name = partitionName(day);
+    const next = new Date(day.getTime() + DAY_MS);
+    const range = `"expiresAt" >= '${day.toISOString()}' AND "expiresAt" < '${next.toISOString()}'`;
+    const moved = await prisma.$transaction(
+      async (tx) => {
+        // Blocks writes to the default while rows move; give up rather
+        // than queue logins behind it, and let the next run retry.
+        await tx.$executeRawUnsafe(`SET LOCAL lock_timeout = '5s'`);
+        await tx.$executeRawUnsafe(`CREATE TABLE "${name}" (LIKE sessions INCLUDING DEFAULTS)`);
+        const count = await tx.$executeRawUnsafe(
+          `WITH moved AS (DELETE FROM ${defaultName} WHERE ${range} RETURNING *) ` +
+            `INSERT INTO "${name}" SELECT * FROM moved`
+        );
+        await tx.$executeRawUnsafe(
+          `ALTER TABLE sessions ATTACH PARTITION "${name}" ` +
+            `FOR VALUES FROM ('${day.toISOString()}') TO ('${next.toISOString()}')`
+        );
+        return count;
+      },
+      { timeout: 60_000 }
+    );
+    reaperMetrics.partitionsCreated++;
+    reaperMetrics.rowsMoved += moved;
+  }
+}
+
+async function maintainPartitions(daysAhead: number) {
+  const today = new Date(Math.floor(Date.now() / DAY_MS) * DAY_MS);
+  await splitDefault(today);
+
+  const rows = await prisma.$queryRaw<{ name: string; pending: boolean }[]>`
+    SELECT c.relname AS name, i.inhdetachpending AS pending
+    FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = to_regclass('sessions')
+  `;
+  const existing = new Set(rows.map((row) => row.name));
+  const pending = new Set(rows.filter((row) => row.pending).map((row) => row.name));
+
+  for (let i = 0; i <= daysAhead; i++) {
+    const day = new Date(today.getTime() + i * DAY_MS);
+    const name = partitionName(day);
+    if (!existing.has(name)) {
+      const next = new Date(day.getTime() + DAY_MS);
+      await prisma.$executeRawUnsafe(
+        `CREATE TABLE IF NOT EXISTS "${name}" PARTITION OF sessions ` +
+          `FOR VALUES FROM ('${day.toISOString()}') TO ('${next.toISOString()}')`
+      );
+      reaperMetrics.partitionsCreated++;
+    }
+  }
+
+  // Days before today hold only expired sessions. Detaching concurrently
+  // waits out running queries instead of blocking inserts behind a lock.
+  // A detach that was interrupted (process killed, connection lost) leaves
+  // the partition pending, and only FINALIZE completes it.
+  for (const name of existing) {
+    const day = partitionDay(name);
+    if (day && day < today) {
+      const mode = pending.has(name) ? 'FINALIZE' : 'CONCURRENTLY';
+      await prisma.$executeRawUnsafe(`ALTER TABLE sessions DETACH PARTITION "${name}" ${mode}`);
+      await prisma.$executeRawUnsafe(`DROP TABLE "${name}"`);
+      reaperMetrics.partitionsDropped++;
+    }
+  }
+}
+
+async function deleteExpired(batchSize: number, maxBatches: number): Promise<number> {
+  let total = 0;
+  for (let i = 0; i < maxBatches; i++) {
+    const deleted = await prisma.$executeRaw`
+      DELETE FROM sessions WHERE id IN (
+        SELECT id FROM sessions
+        WHERE "expiresAt" < (now() AT TIME ZONE 'UTC')
+        ORDER BY "expiresAt"
+        LIMIT ${batchSize}
+        FOR UPDATE SKIP LOCKED
+      )
+    `;
+    total += deleted;
+    if (deleted < batchSize) {
+      break;
+    }
+  }
+  return total;
+}
+
+// One pass; exported for scripts and tests
+export async function reapSessions(options: Partial<ReaperSettings> = {}): Promise<number> {
+  const { batchSize, maxBatches, daysAhead } = { ...settings(), ...options };
+  const started = Date.now();
+  reaperMetrics.runs++;
+  try {
+    if (await isPartitioned()) {
+      await maintainPartitions(daysAhead);
+    }
+    const deleted = await deleteExpired(batchSize, maxBatches);
+    reaperMetrics.deleted += deleted;
+    return deleted;
+  } catch (error) {
+    reaperMetrics.errors++;
+    reaperMetrics.lastError = String((error as Error).message || error);
+    throw error;
+  } finally {
+    reaperMetrics.lastRunAt = new Date(started).toISOString();
+    reaperMetrics.lastRunMs = Date.now() - started;
+  }
+}
+
+let timer: NodeJS.Timeout | undefined;
+
+export function startSessionReaper() {
+  if (timer || process.env.SESSION_REAPER_ENABLED === 'false') {
+    return;
+  }
+  const { intervalMs } = settings();
+  const schedule = () => {
+    timer = setTimeout(async () => {
+      try {
+        await reapSessions();
+      } catch (error) {
+        console.error('Session reaper failed:', error);
+      }
+      if (timer) {
+        schedule();
+      }
+    }, intervalMs * (0.5 + Math.random()));
+    // The reaper alone never keeps the process alive
+    timer.unref();
+  };
+  schedule();
+}
+
+export function stopSessionReaper() {
+  if (timer) {
+    clearTimeout(timer);
+    timer = undefined;
+  }
+}
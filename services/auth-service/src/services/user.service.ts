@@ -1,7 +1,8 @@
 import { PrismaClient } from '@prisma/client';
-import bcrypt from 'bcrypt';
+import { getPrismaClient } from 'database';
+import { comparePassword, hashPassword, hasherMetrics, needsRehash } from './password.hasher';
 
-const prisma = new PrismaClient();
+const prisma = getPrismaClient(PrismaClient);
 
 export class UserService {
   async createUser(data: {
@@ -11,7 +12,7 @@ export class UserService {
     firstName: string;
     lastName: string;
   }) {
-    const passwordHash = await bcrypt.hash(data.password, 10);
+    const passwordHash = await hashPassword(data.password);
     
     const user = await prisma.user.create({
       data: {
@@ -56,6 +57,17 @@ export class UserService {
   }
 
   async verifyPassword(user: any, password: string) {
-    return bcrypt.compare(password, user.passwordHash);
+    const valid = await comparePassword(password, user.passwordHash);
+    if (valid && needsRehash(user.passwordHash)) {
+      // Upgrade to the configured cost without holding up the login
+      this.rehashPassword(user.id, password).catch((error) => console.error('Rehash error:', error));
+    }
+    return valid;
+  }
+
+  private async rehashPassword(id: string, password: string) {
+    const passwordHash = await hashPassword(password);
+    await prisma.user.update({ where: { id }, data: { passwordHash } });
+    hasherMetrics.rehashed++;
   }
 }
@@ -1,18 +1,27 @@
 import { Request, Response } from 'express';
-import { WalletService } from '../services/wallet.service';
+import { Prisma, TransactionType } from '@prisma/client';
+import {
+  decodeCursor,
+  MAX_TRANSFER_BATCH,
+  TransactionQuery,
+  TransferError,
+  TransferInput,
+  WalletService,
+} from '../services/wallet.service';
 
 const walletService = new WalletService();
+const MAX_PAGE_SIZE = 200;
 
 export class WalletController {
   async getWallet(req: Request, res: Response) {
     try {
       const userId = (req as any).userId;
-      const wallet = await walletService.getOrCreateWallet(userId);
-      
+      const wallet = await walletService.getBalance(userId);
+
       res.json({
         wallet: {
           id: wallet.id,
-          balance: wallet.balance.toString(),
+          balance: wallet.balance,
           currency: wallet.currency,
         },
       });
@@ -67,10 +76,86 @@ export class WalletController {
     }
   }
 
+  async transferBatch(req: Request, res: Response) {
+    try {
+      const userId = (req as any).userId;
+      const { transfers } = req.body;
+
+      if (!Array.isArray(transfers) || transfers.length === 0) {
+        return res.status(400).json({ error: 'transfers must be a non-empty array' });
+      }
+      if (transfers.length > MAX_TRANSFER_BATCH) {
+        return res.status(400).json({ error: `At most ${MAX_TRANSFER_BATCH} transfers per batch` });
+      }
+
+      const parsed: TransferInput[] = [];
+      for (const [index, transfer] of transfers.entries()) {
+        const amount = String(transfer?.amount ?? '');
+        if (typeof transfer?.recipientId !== 'string' || !/^\d+(\.\d{1,2})?$/.test(amount) || Number(amount) <= 0) {
+          return res.status(400).json({ error: `Invalid transfer at index ${index}` });
+        }
+        parsed.push({
+          recipientId: transfer.recipientId,
+          amount: new Prisma.Decimal(amount),
+          description: typeof transfer.description === 'string' ? transfer.description : undefined,
+        });
+      }
+
+      const result = await walletService.transferBatch(userId, parsed);
+
+      res.json({
+        message: 'Transfers successful',
+        transfers: result.transfers,
+        recipients: result.recipients,
+        total: result.total.toString(),
+        wallet: { balance: result.wallet.balance.toString() },
+      });
+    } catch (error: any) {
+      if (error instanceof TransferError) {
+        return res.status(400).json({ error: error.message, details: error.details });
+      }
+      console.error('Transfer batch error:', error);
+      res.status(500).json({ error: 'Transfer failed' });
+    }
+  }
+
   async getTransactions(req: Request, res: Response) {
     try {
       const userId = (req as any).userId;
-      const transactions = await walletService.getTransactions(userId);
+      const { limit, cursor, type, from, to } = req.query;
+
+      const query: TransactionQuery = {};
+      if (limit !== undefined) {
+        query.limit = Number(limit);
+        if (!Number.isInteger(query.limit) || query.limit < 1 || query.limit > MAX_PAGE_SIZE) {
+          return res.status(400).json({ error: `limit must be between 1 and ${MAX_PAGE_SIZE}` });
+        }
+      }
+      if (typeof cursor === 'string') {
+        const decoded = decodeCursor(cursor);
+        if (!decoded) {
+          return res.status(400).json({ error: 'Invalid cursor' });
+        }
+        query.cursor = decoded;
+      }
+      if (typeof type === 'string') {
+        const types = type.split(',');
+        if (!types.every((t) => t in TransactionType)) {
+          return res.status(400).json({ error: `type must be one of ${Object.keys(TransactionType).join(', ')}` });
+        }
+        query.types = types as TransactionType[];
+      }
+      for (const [name, value] of [['from', from], ['to', to]] as const) {
+        if (typeof value === 'string') {
+          const date = new Date(value);
+          if (Number.isNaN(date.getTime())) {
+            return res.status(400).json({ error: `Invalid ${name} date` });
+          }
+          query[name] = date;
+        }
+      }
+
+      const { transactions, nextCursor } = await walletService.getTransactions(userId, query);
 
       res.json({
         transactions: transactions.map(tx => ({
@@ -80,6 +165,7 @@ export class WalletController {
           description: tx.description,
           createdAt: tx.createdAt,
         })),
+        nextCursor,
       });
     } catch (error: any) {
       res.status(500).json({ error: 'Failed to get transactions' });
@@ -2,6 +2,9 @@ import express from 'express';
 import cors from 'cors';
 import dotenv from 'dotenv';
 import walletRoutes from './routes/wallet.routes';
+import { cacheMetrics } from './services/balance.cache';
+import { archiveMetrics } from './services/transaction.archive';
+import { tokenVerifier } from './middleware/auth.middleware';
 
 dotenv.config();
 
@@ -9,7 +12,8 @@ const app = express();
 const PORT = 8002; // Hardcoded
 
 app.use(cors());
-app.use(express.json());
+// Batched transfers carry up to MAX_TRANSFER_BATCH rows
+app.use(express.json({ limit: '2mb' }));
 
 app.get('/health', (req, res) => {
   res.json({
@@ -19,6 +23,10 @@ app.get('/health', (req, res) => {
   });
 });
 
+app.get('/metrics', (req, res) => {
+  res.json({ balanceCache: cacheMetrics, tokenVerifier: tokenVerifier.metrics, archive: archiveMetrics });
+});
+
 app.use('/api/wallet', walletRoutes);
 
 app.listen(PORT, () => {
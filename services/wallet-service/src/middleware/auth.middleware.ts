@@ -1,20 +1,22 @@
 import { Request, Response, NextFunction } from 'express';
-import jwt from 'jsonwebtoken';
+import { createTokenVerifier } from 'auth-token';
 
 const JWT_SECRET = process.env.JWT_SECRET || 'your-super-secret-jwt-key-change-in-production';
 
-export const authenticate = (req: Request, res: Response, next: NextFunction) => {
+export const tokenVerifier = createTokenVerifier({ secret: JWT_SECRET });
+
+export const authenticate = async (req: Request, res: Response, next: NextFunction) => {
   const token = req.headers.authorization?.replace('Bearer ', '');
 
   if (!token) {
     return res.status(401).json({ error: 'Authentication required' });
   }
 
-  try {
-    const decoded = jwt.verify(token, JWT_SECRET) as { userId: string };
-    (req as any).userId = decoded.userId;
-    next();
-  } catch (error) {
+  const decoded = await tokenVerifier.verify(token);
+  if (!decoded) {
     return res.status(401).json({ error: 'Invalid or expired token' });
   }
+
+  (req as any).userId = decoded.userId;
+  next();
 };
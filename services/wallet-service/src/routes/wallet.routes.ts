@@ -11,5 +11,6 @@ router.get('/', (req, res) => walletController.getWallet(req, res));
 router.get('/transactions', (req, res) => walletController.getTransactions(req, res));
 router.post('/deposit', (req, res) => walletController.deposit(req, res));
 router.post('/withdraw', (req, res) => walletController.withdraw(req, res));
+router.post('/transfers/batch', (req, res) => walletController.transferBatch(req, res));
 
 export default router;
@@ -0,0 +1,175 @@
+import Redis from 'ioredis';
+
+// Read-through cache of wallet balance snapshots, keyed by userId.
+//
+// Writers (deposit, withdraw, transfers) push the new snapshot with the
+// version the database gave the update; the write only lands if it is newer
+// than what is cached, so out-of-order writers cannot leave a stale balance.
+// Readers fill a missing key only if it is still missing, with version 0,
+// so a fill based on an older read never overwrites a writer's snapshot.
+//
+// Misses are coalesced twice: concurrent misses in this process share one
+// database read, and across replicas a short Redis lock lets one replica
+// load while the others wait briefly for its fill.
+
+export interface BalanceSnapshot {
+  id: string;
+  balance: string;
+  currency: string;
+}
+
+// Set when the client is created, after dotenv has loaded the environment
+let TTL_MS = 60000;
+const LOCK_TTL_MS = 2000;
+const LOCK_WAIT_MS = 25;
+const LOCK_WAIT_ATTEMPTS = 8;
+
+const KEY_PREFIX = 'wallet:balance:';
+const LOCK_PREFIX = 'wallet:balance-lock:';
+
+const WRITE_IF_NEWER = `
+local current = redis.call('HGET', KEYS[1], 'version')
+if current and tonumber(current) >= tonumber(ARGV[1]) then return 0 end
+redis.call('HSET', KEYS[1], 'version', ARGV[1], 'snapshot', ARGV[2])
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+return 1
+`;
+
+const FILL_IF_MISSING = `
+if redis.call('EXISTS', KEYS[1]) == 1 then return 0 end
+redis.call('HSET', KEYS[1], 'version', '0', 'snapshot', ARGV[1])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return 1
+`;
+
+type CacheRedis = Redis & {
+  writeIfNewer(key: string, version: string, snapshot: string, ttl: number): Promise<number>;
+  fillIfMissing(key: string, snapshot: string, ttl: number): Promise<number>;
+};
+
+export const cacheMetrics = {
+  hits: 0,
+  misses: 0,
+  coalesced: 0,
+  lockWaits: 0,
+  fills: 0,
+  writes: 0,
+  errors: 0,
+};
+
+let client: CacheRedis | null | undefined;
+
+function redis(): CacheRedis | null {
+  if (client === undefined) {
+    const url = process.env.REDIS_URL;
+    if (!url) {
+      client = null;
+    } else {
+      // No offline queue: while Redis is down, commands fail at once and
+      // reads fall through to Postgres instead of waiting.
+      TTL_MS = Number(process.env.BALANCE_CACHE_TTL_MS || TTL_MS);
+      const instance = new Redis(url, { maxRetriesPerRequest: 1, enableOfflineQueue: false });
+      instance.defineCommand('writeIfNewer', { numberOfKeys: 1, lua: WRITE_IF_NEWER });
+      instance.defineCommand('fillIfMissing', { numberOfKeys: 1, lua: FILL_IF_MISSING });
+      instance.on('error', () => {
+        cacheMetrics.errors++;
+      });
+      client = instance as CacheRedis;
+    }
+  }
+  return client;
+}
+
+const inflight = new Map<string, Promise<BalanceSnapshot>>();
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+async function cached(redisClient: CacheRedis, userId: string): Promise<BalanceSnapshot | null> {
+  const value = await redisClient.hget(KEY_PREFIX + userId, 'snapshot');
+  return value ? (JSON.parse(value) as BalanceSnapshot) : null;
+}
+
+// Redis failures here only cost the cache; errors from `load` propagate.
+async function loadAndFill(
+  redisClient: CacheRedis,
+  userId: string,
+  load: () => Promise<BalanceSnapshot>
+): Promise<BalanceSnapshot> {
+  let locked = false;
+  try {
+    locked = (await redisClient.set(LOCK_PREFIX + userId, '1', 'PX', LOCK_TTL_MS, 'NX')) === 'OK';
+    if (!locked) {
+      cacheMetrics.lockWaits++;
+      for (let attempt = 0; attempt < LOCK_WAIT_ATTEMPTS; attempt++) {
+        await sleep(LOCK_WAIT_MS);
+        const snapshot = await cached(redisClient, userId);
+        if (snapshot) {
+          return snapshot;
+        }
+      }
+    }
+  } catch {
+    cacheMetrics.errors++;
+  }
+
+  const snapshot = await load();
+  try {
+    await redisClient.fillIfMissing(KEY_PREFIX + userId, JSON.stringify(snapshot), TTL_MS);
+    cacheMetrics.fills++;
+    if (locked) {
+      await redisClient.del(LOCK_PREFIX + userId);
+    }
+  } catch {
+    cacheMetrics.errors++;
+  }
+  return snapshot;
+}
+
+export async function getBalanceSnapshot(
+  userId: string,
+  load: () => Promise<BalanceSnapshot>
+): Promise<BalanceSnapshot> {
+  const redisClient = redis();
+  if (!redisClient) {
+    return load();
+  }
+
+  try {
+    const snapshot = await cached(redisClient, userId);
+    if (snapshot) {
+      cacheMetrics.hits++;
+      return snapshot;
+    }
+  } catch {
+    cacheMetrics.errors++;
+    return load();
+  }
+
+  cacheMetrics.misses++;
+  const pending = inflight.get(userId);
+  if (pending) {
+    cacheMetrics.coalesced++;
+    return pending;
+  }
+
+  const promise = loadAndFill(redisClient, userId, load).finally(() => inflight.delete(userId));
+  inflight.set(userId, promise);
+  return promise;
+}
+
+// `version` must increase with every committed change to the wallet; the
+// services use the database clock (in microseconds) read under the row lock.
+export async function storeBalanceSnapshot(userId: string, snapshot: BalanceSnapshot, version: bigint | string) {
+  const redisClient = redis();
+  if (!redisClient) {
+    return;
+  }
+  try {
+    await redisClient.writeIfNewer(KEY_PREFIX + userId, String(version), JSON.stringify(snapshot), TTL_MS);
+    cacheMetrics.writes++;
+  } catch {
+    cacheMetrics.errors++;
+    // Drop the entry rather than risk serving the pre-write balance
+    await redisClient.del(KEY_PREFIX + userId).catch(() => undefined);
+  }
+}
@@ -0,0 +1,225 @@
+import { createHash } from 'crypto';
+import { GetObjectCommand, S3Client } from '@aws-sdk/client-s3';
+import { ParquetReader } from '@dsnp/parquetjs';
+import { Prisma, PrismaClient, Transaction, TransactionType } from '@prisma/client';
+import { getPrismaClient } from 'database';
+import type { TransactionCursor, TransactionQuery } from './wallet.service';
+
+// Reads transactions that `python3 -m scaffold.archive` moved out of the
+// table into Parquet files in S3 (MinIO locally).
+//
+// Each archived month is split into `buckets` files by wallet, so one
+// wallet's history for that month is one GET. Inside a file rows are sorted
+// by wallet and time. Only the months transaction_archive_wallets lists
+// for the wallet are read, at most ARCHIVE_MAX_MONTHS per page. The end of
+// the newest archived month is re-read every ARCHIVE_CATALOG_TTL_MS, so
+// wallets created after it skip the lookup. The last ARCHIVE_CACHE_FILES
+// files read are kept parsed in memory, since paging back through a month
+// reads the same file repeatedly.
+
+const DEFAULT_CATALOG_TTL_MS = 60_000;
+const DEFAULT_CACHE_FILES = 8;
+const DEFAULT_MAX_MONTHS = 12;
+
+const prisma = getPrismaClient(PrismaClient);
+
+export const archiveMetrics = { catalogReads: 0, fileReads: 0, fileCacheHits: 0, rowsServed: 0, errors: 0 };
+
+let s3: S3Client | undefined;
+let catalog: { archivedUntil: Date | null; readAt: number } | undefined;
+const files = new Map<string, Promise<Map<string, Transaction[]>>>();
+
+// Read on first use, after dotenv has loaded the environment
+function settings() {
+  return {
+    catalogTtlMs: Number(process.env.ARCHIVE_CATALOG_TTL_MS) || DEFAULT_CATALOG_TTL_MS,
+    cacheFiles: Number(process.env.ARCHIVE_CACHE_FILES) || DEFAULT_CACHE_FILES,
+    maxMonths: Number(process.env.ARCHIVE_MAX_MONTHS) || DEFAULT_MAX_MONTHS,
+  };
+}
+
+function client() {
+  if (!s3) {
+    s3 = new S3Client({
+      region: process.env.AWS_REGION || 'us-east-1',
+      endpoint: process.env.AWS_S3_ENDPOINT || undefined,
+      forcePathStyle: true,
+    });
+  }
+  return s3;
+}
+
+// Same as wallet_bucket() in scaffold/archive.py
+export function walletBucket(walletId: string, buckets: number): number {
+  return parseInt(createHash('md5').update(walletId).digest('hex').slice(0, 8), 16) % buckets;
+}
+
+// End of the newest archived month, or null when nothing is archived
+async function archivedUntil(): Promise<Date | null> {
+  const { catalogTtlMs } = settings();
+  if (!catalog || Date.now() - catalog.readAt > catalogTtlMs) {
+    archiveMetrics.catalogReads++;
+    const newest = await prisma.transactionArchive.findFirst({
+      select: { rangeEnd: true },
+      orderBy: { rangeStart: 'desc' },
+    });
+    catalog = { archivedUntil: newest?.rangeEnd ?? null, readAt: Date.now() };
+  }
+  return catalog.archivedUntil;
+}
+
+// DECIMAL(15,2) arrives as the unscaled integer in big-endian bytes
+function toDecimal(value: unknown): Prisma.Decimal {
+  if (value instanceof Uint8Array) {
+    let unscaled = 0n;
+    for (const byte of value) {
+      unscaled = (unscaled << 8n) | BigInt(byte);
+    }
+    if (value.length && value[0] & 0x80) {
+      unscaled -= 1n << BigInt(value.length * 8);
+    }
+    return new Prisma.Decimal(unscaled.toString()).dividedBy(100);
+  }
+  if (typeof value === 'bigint') {
+    return new Prisma.Decimal(value.toString()).dividedBy(100);
+  }
+  return new Prisma.Decimal(String(value));
+}
+
+function toDate(value: unknown): Date {
+  return value instanceof Date ? value : new Date(Number(value));
+}
+
+async function readFile(url: string): Promise<Map<string, Transaction[]>> {
+  const { hostname: bucket, pathname } = new URL(url);
+  let bytes: Uint8Array;
+  try {
+    const object = await client().send(new GetObjectCommand({ Bucket: bucket, Key: pathname.slice(1) }));
+    bytes = await object.Body!.transformToByteArray();
+  } catch (error) {
+    // No wallet of this bucket had transactions that month
+    if ((error as { name?: string }).name === 'NoSuchKey') {
+      return new Map();
+    }
+    throw error;
+  }
+  archiveMetrics.fileReads++;
+
+  const byWallet = new Map<string, Transaction[]>();
+  const reader = await ParquetReader.openBuffer(Buffer.from(bytes));
+  try {
+    const cursor = reader.getCursor();
+    let record: any;
+    while ((record = await cursor.next())) {
+      const rows = byWallet.get(record.walletId) ?? [];
+      rows.push({
+        id: record.id,
+        walletId: record.walletId,
+        type: record.type as TransactionType,
+        amount: toDecimal(record.amount),
+        balanceBefore: toDecimal(record.balanceBefore),
+        balanceAfter: toDecimal(record.balanceAfter),
+        description: record.description ?? null,
+        recipientId: record.recipientId ?? null,
+        status: record.status,
+        createdAt: toDate(record.createdAt),
+      });
+      byWallet.set(record.walletId, rows);
+    }
+  } finally {
+    await reader.close();
+  }
+  return byWallet;
+}
+
+// Parsed files, least recently used first; a failed read is not cached
+function cachedFile(url: string): Promise<Map<string, Transaction[]>> {
+  let file = files.get(url);
+  if (file) {
+    archiveMetrics.fileCacheHits++;
+    files.delete(url);
+  } else {
+    file = readFile(url);
+    file.catch(() => files.delete(url));
+  }
+  files.set(url, file);
+  while (files.size > settings().cacheFiles) {
+    files.delete(files.keys().next().value!);
+  }
+  return file;
+}
+
+function matches(row: Transaction, query: TransactionQuery) {
+  const { cursor, from, to, types } = query;
+  const time = row.createdAt.getTime();
+  if (cursor && (time > cursor.createdAt.getTime() || (time === cursor.createdAt.getTime() && row.id >= cursor.id))) {
+    return false;
+  }
+  if ((from && time < from.getTime()) || (to && time >= to.getTime())) {
+    return false;
+  }
+  return !types || types.length === 0 || types.includes(row.type);
+}
+
+export interface ArchivedPage {
+  rows: Transaction[];
+  // Set when ARCHIVE_MAX_MONTHS months were read without finding `limit`
+  // rows: older months remain, and paging continues from here
+  resume: TransactionCursor | null;
+}
+
+// Up to `limit` archived rows of the wallet, newest first, continuing the
+// same (createdAt, id) order and filters as getTransactions. Archived
+// months all precede the table's oldest row. A cursor with an empty id
+// resumes before the month starting at its createdAt, which was read in
+// full.
+export async function readArchivedTransactions(
+  walletId: string,
+  walletCreatedAt: Date,
+  query: TransactionQuery,
+  limit: number
+): Promise<ArchivedPage> {
+  const until = await archivedUntil();
+  if (!until || until <= walletCreatedAt) {
+    return { rows: [], resume: null };
+  }
+
+  const { cursor, from, to } = query;
+  const conditions: Prisma.TransactionArchiveWalletWhereInput[] = [{ walletId }];
+  if (cursor) {
+    conditions.push({ rangeStart: cursor.id ? { lte: cursor.createdAt } : { lt: cursor.createdAt } });
+  }
+  if (to) {
+    conditions.push({ rangeStart: { lt: to } });
+  }
+  if (from) {
+    conditions.push({ archive: { rangeEnd: { gt: from } } });
+  }
+  const { maxMonths } = settings();
+  // One extra month tells whether older months remain
+  const months = await prisma.transactionArchiveWallet.findMany({
+    where: { AND: conditions },
+    select: { rangeStart: true, archive: { select: { location: true, buckets: true } } },
+    orderBy: { rangeStart: 'desc' },
+    take: maxMonths + 1,
+  });
+
+  const found: Transaction[] = [];
+  for (const { archive } of months.slice(0, maxMonths)) {
+    const bucket = String(walletBucket(walletId, archive.buckets)).padStart(3, '0');
+    const rows = (await cachedFile(`${archive.location}/bucket=${bucket}.parquet`)).get(walletId) ?? [];
+    for (let i = rows.length - 1; i >= 0 && found.length < limit; i--) {
+      if (matches(rows[i], query)) {
+        found.push(rows[i]);
+      }
+    }
+    if (found.length >= limit) {
+      break;
+    }
+  }
+  archiveMetrics.rowsServed += found.length;
+
+  const resume =
+    found.length < limit && months.length > maxMonths ? { createdAt: months[maxMonths - 1].rangeStart, id: '' } : null;
+  return { rows: found, resume };
+}
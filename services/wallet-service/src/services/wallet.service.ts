@@ -1,6 +1,102 @@
-import { PrismaClient, TransactionType } from '@prisma/client';
+import { randomUUID } from 'crypto';
+import { Prisma, PrismaClient, Transaction, TransactionType } from '@prisma/client';
+import { getPrismaClient } from 'database';
+import { BalanceSnapshot, getBalanceSnapshot, storeBalanceSnapshot } from './balance.cache';
+import { archiveMetrics, readArchivedTransactions } from './transaction.archive';
 
-const prisma = new PrismaClient();
+const prisma = getPrismaClient(PrismaClient);
+
+// Taken when the row is written, i.e. after any wait for the wallet lock, so
+// createdAt follows the order the balance changes were applied in. The
+// columns are TIMESTAMP(3) holding UTC, as Prisma writes them.
+const LEDGER_NOW = Prisma.sql`(clock_timestamp() AT TIME ZONE 'UTC')`;
+
+// Cache version for balance snapshots: the database clock in microseconds,
+// read inside the statement that holds the wallet's row lock, so it grows
+// with every committed change to that wallet.
+const CACHE_VERSION = Prisma.sql`(extract(epoch FROM clock_timestamp()) * 1000000)::bigint`;
+
+interface MovementRow {
+  walletId: string;
+  balance: Prisma.Decimal;
+  currency: string;
+  version: bigint;
+  transactionId: string;
+  amount: Prisma.Decimal;
+  balanceBefore: Prisma.Decimal;
+  balanceAfter: Prisma.Decimal;
+}
+
+export interface TransactionCursor {
+  createdAt: Date;
+  id: string;
+}
+
+export interface TransactionQuery {
+  limit?: number;
+  cursor?: TransactionCursor;
+  types?: TransactionType[];
+  from?: Date;
+  to?: Date;
+}
+
+// Opaque to clients: base64url of "<createdAt ISO>|<id>"
+export function encodeCursor(cursor: TransactionCursor) {
+  return Buffer.from(`${cursor.createdAt.toISOString()}|${cursor.id}`).toString('base64url');
+}
+
+export function decodeCursor(value: string): TransactionCursor | null {
+  const [createdAt, id] = Buffer.from(value, 'base64url').toString().split('|');
+  const date = new Date(createdAt);
+  // An empty id is a resume point between archived months
+  return id !== undefined && !Number.isNaN(date.getTime()) ? { createdAt: date, id } : null;
+}
+
+export interface TransferInput {
+  recipientId: string;
+  amount: Prisma.Decimal;
+  description?: string;
+}
+
+// Limits for POST /transfers/batch: rows per request, and rows per
+// multi-row INSERT (well under Postgres' 65535 bind parameters).
+export const MAX_TRANSFER_BATCH = 5000;
+const INSERT_CHUNK_SIZE = 1000;
+
+export class TransferError extends Error {
+  constructor(message: string, public readonly details?: unknown) {
+    super(message);
+  }
+}
+
+interface UpdatedWalletRow {
+  userId: string;
+  id: string;
+  balance: Prisma.Decimal;
+  currency: string;
+  version: bigint;
+}
+
+function cacheMovement(userId: string, row: MovementRow) {
+  return storeBalanceSnapshot(
+    userId,
+    { id: row.walletId, balance: row.balance.toString(), currency: row.currency },
+    row.version
+  );
+}
+
+function toMovement(row: MovementRow) {
+  return {
+    wallet: { id: row.walletId, balance: row.balance, currency: row.currency },
+    transaction: {
+      id: row.transactionId,
+      walletId: row.walletId,
+      amount: row.amount,
+      balanceBefore: row.balanceBefore,
+      balanceAfter: row.balanceAfter,
+    },
+  };
+}
 
 export class WalletService {
   async getOrCreateWallet(userId: string) {
@@ -21,73 +117,254 @@ export class WalletService {
     return wallet;
   }
 
-  async deposit(userId: string, amount: number, description?: string) {
-    const wallet = await this.getOrCreateWallet(userId);
-
-    const result = await prisma.$transaction(async (tx) => {
-      const updatedWallet = await tx.wallet.update({
-        where: { id: wallet.id },
-        data: { balance: { increment: amount } },
-      });
-
-      const transaction = await tx.transaction.create({
-        data: {
-          walletId: wallet.id,
-          type: TransactionType.DEPOSIT,
-          amount,
-          balanceBefore: wallet.balance,
-          balanceAfter: updatedWallet.balance,
-          description: description || 'Deposit',
-          status: 'completed',
-        },
-      });
-
-      return { wallet: updatedWallet, transaction };
+  // Balance snapshot for GET /wallet, served from the Redis cache when
+  // REDIS_URL is set. Only a user without a wallet reaches the create path.
+  async getBalance(userId: string): Promise<BalanceSnapshot> {
+    return getBalanceSnapshot(userId, async () => {
+      const wallet = await this.getOrCreateWallet(userId);
+      return { id: wallet.id, balance: wallet.balance.toString(), currency: wallet.currency };
     });
+  }
 
-    return result;
+  // Deposit and withdraw are one SQL statement each: the balance change, the
+  // sufficiency check and the Transaction row commit together in a single
+  // round trip. Concurrent calls on a wallet queue on its row lock, and the
+  // UPDATE re-checks `balance >= amount` against the latest committed row, so
+  // there are no lost updates and balanceBefore/balanceAfter are exact.
+  async deposit(userId: string, amount: number, description?: string) {
+    const rows = await prisma.$queryRaw<MovementRow[]>`
+      WITH credited AS (
+        INSERT INTO wallets (id, "userId", balance, currency, "createdAt", "updatedAt")
+        VALUES (${randomUUID()}, ${userId}, ${amount}::numeric(15, 2), 'USD', ${LEDGER_NOW}, ${LEDGER_NOW})
+        ON CONFLICT ("userId") DO UPDATE
+          SET balance = wallets.balance + EXCLUDED.balance, "updatedAt" = ${LEDGER_NOW}
+        RETURNING id, balance, currency, ${CACHE_VERSION} AS version
+      ), recorded AS (
+        INSERT INTO transactions
+          (id, "walletId", type, amount, "balanceBefore", "balanceAfter", description, status, "createdAt")
+        SELECT ${randomUUID()}, id, ${TransactionType.DEPOSIT}::"TransactionType", ${amount}::numeric(15, 2),
+               balance - ${amount}::numeric(15, 2), balance, ${description || 'Deposit'}, 'completed', ${LEDGER_NOW}
+        FROM credited
+        RETURNING id, amount, "balanceBefore", "balanceAfter"
+      )
+      SELECT c.id AS "walletId", c.balance, c.currency, c.version,
+             r.id AS "transactionId", r.amount, r."balanceBefore", r."balanceAfter"
+      FROM credited c CROSS JOIN recorded r
+    `;
+
+    const movement = toMovement(rows[0]);
+    await cacheMovement(userId, rows[0]);
+    return movement;
   }
 
   async withdraw(userId: string, amount: number, description?: string) {
-    const wallet = await this.getOrCreateWallet(userId);
+    const rows = await prisma.$queryRaw<MovementRow[]>`
+      WITH debited AS (
+        UPDATE wallets
+        SET balance = balance - ${amount}::numeric(15, 2), "updatedAt" = ${LEDGER_NOW}
+        WHERE "userId" = ${userId} AND balance >= ${amount}::numeric(15, 2)
+        RETURNING id, balance, currency, ${CACHE_VERSION} AS version
+      ), recorded AS (
+        INSERT INTO transactions
+          (id, "walletId", type, amount, "balanceBefore", "balanceAfter", description, status, "createdAt")
+        SELECT ${randomUUID()}, id, ${TransactionType.WITHDRAWAL}::"TransactionType", ${amount}::numeric(15, 2),
+               balance + ${amount}::numeric(15, 2), balance, ${description || 'Withdrawal'}, 'completed', ${LEDGER_NOW}
+        FROM debited
+        RETURNING id, amount, "balanceBefore", "balanceAfter"
+      )
+      SELECT d.id AS "walletId", d.balance, d.currency, d.version,
+             r.id AS "transactionId", r.amount, r."balanceBefore", r."balanceAfter"
+      FROM debited d CROSS JOIN recorded r
+    `;
 
-    if (wallet.balance < amount) {
+    // No row: the wallet is missing (a zero balance) or holds less than amount
+    if (rows.length === 0) {
       throw new Error('Insufficient balance');
     }
 
-    const result = await prisma.$transaction(async (tx) => {
-      const updatedWallet = await tx.wallet.update({
-        where: { id: wallet.id },
-        data: { balance: { decrement: amount } },
-      });
+    const movement = toMovement(rows[0]);
+    await cacheMovement(userId, rows[0]);
+    return movement;
+  }
 
-      const transaction = await tx.transaction.create({
-        data: {
-          walletId: wallet.id,
-          type: TransactionType.WITHDRAWAL,
-          amount,
-          balanceBefore: wallet.balance,
-          balanceAfter: updatedWallet.balance,
-          description: description || 'Withdrawal',
-          status: 'completed',
-        },
-      });
+  // Applies many transfers from one payer in a single transaction, so a
+  // payout either lands completely or not at all. Every wallet involved is
+  // locked up front in id order; concurrent batches that share wallets
+  // therefore take their locks in the same order and cannot deadlock.
+  // Balances are then computed in memory and written back with one UPDATE,
+  // and the Transaction rows go in as chunked multi-row INSERTs: a fixed
+  // handful of round trips instead of three per transfer.
+  async transferBatch(payerId: string, transfers: TransferInput[]) {
+    const recipientIds = [...new Set(transfers.map((t) => t.recipientId))];
+    if (recipientIds.includes(payerId)) {
+      throw new TransferError('Cannot transfer to yourself');
+    }
 
-      return { wallet: updatedWallet, transaction };
+    const known = await prisma.user.findMany({
+      where: { id: { in: recipientIds } },
+      select: { id: true },
     });
+    if (known.length !== recipientIds.length) {
+      const found = new Set(known.map((u) => u.id));
+      throw new TransferError('Unknown recipients', recipientIds.filter((id) => !found.has(id)).slice(0, 20));
+    }
 
-    return result;
-  }
+    const total = transfers.reduce((sum, t) => sum.add(t.amount), new Prisma.Decimal(0));
+    // Sorted, so concurrent batches over the same users insert missing
+    // wallets (and take their unique-index locks) in the same order
+    const userIds = [payerId, ...recipientIds].sort();
+
+    const result = await prisma.$transaction(
+      async (tx) => {
+        await tx.$executeRaw`
+          INSERT INTO wallets (id, "userId", balance, currency, "createdAt", "updatedAt")
+          SELECT gen_random_uuid()::text, "userId", 0, 'USD', ${LEDGER_NOW}, ${LEDGER_NOW}
+          FROM unnest(${userIds}::text[]) AS ids("userId")
+          ON CONFLICT ("userId") DO NOTHING
+        `;
+
+        const wallets = await tx.$queryRaw<{ id: string; userId: string; balance: Prisma.Decimal }[]>`
+          SELECT id, "userId", balance FROM wallets
+          WHERE "userId" = ANY(${userIds}::text[])
+          ORDER BY id
+          FOR UPDATE
+        `;
+        const byUser = new Map(wallets.map((w) => [w.userId, { ...w }]));
+        const payer = byUser.get(payerId)!;
+
+        if (payer.balance.lessThan(total)) {
+          throw new TransferError('Insufficient balance');
+        }
+
+        // Database time after the locks are held, like LEDGER_NOW elsewhere
+        const [{ now: createdAt }] = await tx.$queryRaw<{ now: Date }[]>`SELECT ${LEDGER_NOW} AS now`;
+        const rows: Prisma.TransactionCreateManyInput[] = [];
+        for (const transfer of transfers) {
+          const recipient = byUser.get(transfer.recipientId)!;
+          const description = transfer.description || 'Transfer';
+
+          const payerBefore = payer.balance;
+          payer.balance = payerBefore.sub(transfer.amount);
+          rows.push({
+            walletId: payer.id,
+            type: TransactionType.TRANSFER_OUT,
+            amount: transfer.amount,
+            balanceBefore: payerBefore,
+            balanceAfter: payer.balance,
+            description,
+            // recipientId holds the counterparty's user id on both legs
+            recipientId: recipient.userId,
+            status: 'completed',
+            createdAt,
+          });
+
+          const recipientBefore = recipient.balance;
+          recipient.balance = recipientBefore.add(transfer.amount);
+          rows.push({
+            walletId: recipient.id,
+            type: TransactionType.TRANSFER_IN,
+            amount: transfer.amount,
+            balanceBefore: recipientBefore,
+            balanceAfter: recipient.balance,
+            description,
+            recipientId: payerId,
+            status: 'completed',
+            createdAt,
+          });
+        }
 
-  async getTransactions(userId: string, limit: number = 50) {
-    const wallet = await this.getOrCreateWallet(userId);
+        for (let i = 0; i < rows.length; i += INSERT_CHUNK_SIZE) {
+          await tx.transaction.createMany({ data: rows.slice(i, i + INSERT_CHUNK_SIZE) });
+        }
 
-    const transactions = await prisma.transaction.findMany({
-      where: { walletId: wallet.id },
-      orderBy: { createdAt: 'desc' },
-      take: limit,
+        const touched = [...byUser.values()];
+        const updated = await tx.$queryRaw<UpdatedWalletRow[]>`
+          UPDATE wallets AS w
+          SET balance = v.balance, "updatedAt" = ${LEDGER_NOW}
+          FROM unnest(${touched.map((w) => w.id)}::text[], ${touched.map((w) => w.balance.toString())}::numeric[])
+            AS v(id, balance)
+          WHERE w.id = v.id
+          RETURNING w."userId", w.id, w.balance, w.currency, ${CACHE_VERSION} AS version
+        `;
+
+        return {
+          updated,
+          transfers: transfers.length,
+          recipients: recipientIds.length,
+          total,
+          wallet: { id: payer.id, balance: payer.balance },
+        };
+      },
+      { maxWait: 10000, timeout: 60000 }
+    );
+
+    await Promise.all(
+      result.updated.map((w) =>
+        storeBalanceSnapshot(w.userId, { id: w.id, balance: w.balance.toString(), currency: w.currency }, w.version)
+      )
+    );
+    const { updated, ...summary } = result;
+    return summary;
+  }
+
+  // Keyset pagination over (createdAt, id), newest first, served by the
+  // transactions_walletId_createdAt_id_idx index: every page is an index
+  // range scan from the cursor, however deep into the history it is.
+  // A page that runs past the table's oldest row continues into months
+  // archived to Parquet, with the same cursor and filters. Reading at most
+  // ARCHIVE_MAX_MONTHS of them can return a short page with a nextCursor.
+  async getTransactions(userId: string, query: TransactionQuery = {}) {
+    const limit = query.limit ?? 50;
+    const wallet = await prisma.wallet.findUnique({
+      where: { userId },
+      select: { id: true, createdAt: true },
     });
 
-    return transactions;
+    if (!wallet) {
+      return { transactions: [], nextCursor: null };
+    }
+
+    const conditions = [Prisma.sql`"walletId" = ${wallet.id}`];
+    if (query.cursor) {
+      conditions.push(Prisma.sql`("createdAt", id) < (${query.cursor.createdAt}, ${query.cursor.id})`);
+    }
+    if (query.from) {
+      conditions.push(Prisma.sql`"createdAt" >= ${query.from}`);
+    }
+    if (query.to) {
+      conditions.push(Prisma.sql`"createdAt" < ${query.to}`);
+    }
+    if (query.types && query.types.length > 0) {
+      conditions.push(Prisma.sql`type::text = ANY(${query.types}::text[])`);
+    }
+
+    // One extra row tells whether there is a next page
+    const rows = await prisma.$queryRaw<Transaction[]>`
+      SELECT id, "walletId", type, amount, "balanceBefore", "balanceAfter",
+             description, "recipientId", status, "createdAt"
+      FROM transactions
+      WHERE ${Prisma.join(conditions, ' AND ')}
+      ORDER BY "createdAt" DESC, id DESC
+      LIMIT ${limit + 1}
+    `;
+    let resume: TransactionCursor | null = null;
+    if (rows.length <= limit) {
+      // S3 or the catalog being unavailable costs the archived months only
+      try {
+        const archived = await readArchivedTransactions(wallet.id, wallet.createdAt, query, limit + 1 - rows.length);
+        rows.push(...archived.rows);
+        resume = archived.resume;
+      } catch (error) {
+        archiveMetrics.errors++;
+        console.error('Reading archived transactions failed:', error);
+      }
+    }
+
+    const transactions = rows.slice(0, limit);
+    const last = transactions[transactions.length - 1];
+    const nextCursor =
+      rows.length > limit ? encodeCursor({ createdAt: last.createdAt, id: last.id }) : resume && encodeCursor(resume);
+
+    return { transactions, nextCursor };
   }
 }
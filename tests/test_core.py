@@ -0,0 +1,112 @@
+import json
+import os
+
+from scaffold.core import (
+    CREATED,
+    MANIFEST_NAME,
+    UNCHANGED,
+    UPDATED,
+    Manifest,
+    content_hash,
+    write_artifacts,
+    write_if_changed,
+)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_content_hash_is_the_same_for_str_and_utf8_bytes():
+    assert content_hash('héllo') == content_hash('héllo'.encode('utf-8'))
+    assert content_hash('a') != content_hash('b')
+
+
+def test_write_artifacts_reports_created_unchanged_updated(tmp_path):
+    root = str(tmp_path)
+    assert write_artifacts({'a.txt': 'one\n', 'dir/b.txt': 'two\n'}, root) == [
+        ('a.txt', CREATED), ('dir/b.txt', CREATED)]
+    assert write_artifacts({'a.txt': 'one\n', 'dir/b.txt': 'two\n'}, root) == [
+        ('a.txt', UNCHANGED), ('dir/b.txt', UNCHANGED)]
+    assert write_artifacts({'a.txt': 'one\n', 'dir/b.txt': 'three\n'}, root) == [
+        ('a.txt', UNCHANGED), ('dir/b.txt', UPDATED)]
+    assert read(tmp_path / 'dir' / 'b.txt') == 'three\n'
+
+
+def test_unchanged_files_keep_their_mtime(tmp_path):
+    root = str(tmp_path)
+    write_artifacts({'a.txt': 'one\n'}, root)
+    path = tmp_path / 'a.txt'
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+    write_artifacts({'a.txt': 'one\n'}, root)
+    assert os.stat(path).st_mtime_ns == 1_000_000_000
+
+
+def test_manifest_records_hash_size_and_mtime(tmp_path):
+    root = str(tmp_path)
+    write_artifacts({'a.txt': 'one\n'}, root)
+    with open(tmp_path / MANIFEST_NAME) as f:
+        data = json.load(f)
+    entry = data['files']['a.txt']
+    st = os.stat(tmp_path / 'a.txt')
+    assert entry == {'sha256': content_hash('one\n'), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    assert Manifest.load(root).is_fresh('a.txt', content_hash('one\n'))
+
+
+def test_fresh_manifest_entry_skips_reading_the_file(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    write_artifacts({'a.txt': 'one\n'}, root)
+    manifest = Manifest.load(root)
+
+    def no_open(*args, **kwargs):
+        raise AssertionError('file was read despite a fresh manifest entry')
+
+    monkeypatch.setattr('builtins.open', no_open)
+    assert write_if_changed('a.txt', 'one\n', manifest) == UNCHANGED
+
+
+def test_hand_edited_file_is_rewritten(tmp_path):
+    root = str(tmp_path)
+    write_artifacts({'a.txt': 'one\n'}, root)
+    with open(tmp_path / 'a.txt', 'w') as f:
+        f.write('edited by hand, longer\n')
+    assert write_artifacts({'a.txt': 'one\n'}, root) == [('a.txt', UPDATED)]
+    assert read(tmp_path / 'a.txt') == 'one\n'
+
+
+def test_matching_file_without_manifest_is_left_alone(tmp_path):
+    (tmp_path / 'a.txt').write_text('one\n')
+    assert write_artifacts({'a.txt': 'one\n'}, str(tmp_path)) == [('a.txt', UNCHANGED)]
+    assert Manifest.load(str(tmp_path)).get('a.txt')['sha256'] == content_hash('one\n')
+
+
+def test_streamed_chunks_and_bytes(tmp_path):
+    manifest = Manifest(str(tmp_path))
+    assert write_if_changed('a.txt', iter(['on', 'e\n']), manifest) == CREATED
+    assert write_if_changed('a.txt', b'one\n', manifest) == UNCHANGED
+    assert read(tmp_path / 'a.txt') == 'one\n'
+
+
+def test_corrupt_or_old_manifest_is_ignored(tmp_path):
+    (tmp_path / MANIFEST_NAME).write_text('not json')
+    assert Manifest.load(str(tmp_path)).entries == {}
+    (tmp_path / MANIFEST_NAME).write_text(json.dumps({'version': 0, 'files': {'a': {}}}))
+    assert Manifest.load(str(tmp_path)).entries == {}
+
+
+def test_manifest_is_only_saved_when_it_changed(tmp_path):
+    root = str(tmp_path)
+    write_artifacts({'a.txt': 'one\n'}, root)
+    manifest = Manifest.load(root)
+    write_if_changed('a.txt', 'one\n', manifest)
+    assert manifest.save() is False
+
+
+def test_rewrite_keeps_file_permissions(tmp_path):
+    root = str(tmp_path)
+    write_artifacts({'run.sh': 'echo one\n'}, root)
+    os.chmod(tmp_path / 'run.sh', 0o755)
+    write_artifacts({'run.sh': 'echo two\n'}, root)
+    assert os.stat(tmp_path / 'run.sh').st_mode & 0o777 == 0o755
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
@@ -0,0 +1,65 @@
+import pytest
+import yaml
+
+import script_2
+from scaffold.emit import dump_yaml, dump_yaml_all, get_dumper, has_libyaml, iter_yaml_mapping, literal
+
+needs_libyaml = pytest.mark.skipif(not has_libyaml(), reason='PyYAML built without libyaml')
+
+# Scalars where the two emitters' defaults differ: long lines, quoting,
+# non-ASCII text, block literals, empty collections and YAML-looking strings.
+TRICKY = {
+    'long': 'word ' * 60,
+    'quoted': "it's \"quoted\": yes # not a comment",
+    'unicode': 'Sarva ✅ café',
+    'script': literal('set -e\nnpm ci\nnpm test -- --shard 1/4\n'),
+    'empty': {'list': [], 'map': {}, 'none': None, 'str': ''},
+    'looks_like': ['yes', 'no', 'on', '0o17', '1e3', '2026-10-17', '~', '*x', '&y', '!z', '@at'],
+    'expr': "${{ hashFiles('**/package-lock.json') }}",
+    'nested': [{'name': 'step', 'with': {'node-version': 18, 'cache': 'npm'}}],
+}
+
+
+@needs_libyaml
+def test_libyaml_and_python_emitters_are_byte_identical():
+    assert dump_yaml(TRICKY, pure=False) == dump_yaml(TRICKY, pure=True)
+
+
+@needs_libyaml
+@pytest.mark.parametrize('factory', [
+    lambda: script_2.ci_workflow(script_2.services(), script_2.workspaces()),
+    script_2.docker_compose,
+], ids=['ci_workflow', 'docker_compose'])
+def test_generated_documents_are_byte_identical(factory):
+    documents = [factory(), factory()]
+    assert dump_yaml_all(documents, pure=False) == dump_yaml_all(documents, pure=True)
+
+
+def test_output_round_trips():
+    assert yaml.safe_load(dump_yaml(TRICKY, pure=True)) == {
+        **TRICKY, 'script': str(TRICKY['script'])}
+
+
+def test_literal_is_a_block_scalar():
+    assert dump_yaml({'run': literal('a\nb\n')}, pure=True) == 'run: |\n  a\n  b\n'
+
+
+def test_representer_does_not_leak_into_pyyaml_dumpers():
+    get_dumper(True)
+    get_dumper(False)
+    assert literal not in yaml.SafeDumper.yaml_representers
+    if has_libyaml():
+        assert literal not in yaml.CSafeDumper.yaml_representers
+
+
+@pytest.mark.parametrize('key', [None, 'services'])
+def test_streamed_mapping_matches_a_single_dump(key):
+    entries = [('auth', {'ports': ['3001:3001']}), ('wallet', {'run': literal('x\ny\n')})]
+    streamed = ''.join(iter_yaml_mapping(entries, key=key, pure=True))
+    expected = dict(entries) if key is None else {key: dict(entries)}
+    assert streamed == dump_yaml(expected, pure=True)
+
+
+def test_streamed_empty_mapping():
+    assert ''.join(iter_yaml_mapping([], key='volumes')) == 'volumes: {}\n'
+    assert ''.join(iter_yaml_mapping([])) == '{}\n'
@@ -0,0 +1,109 @@
+import argparse
+import threading
+
+import pytest
+
+from scaffold.cli import parse_option
+from scaffold.graph import BuildGraph, GraphError
+
+
+def make_graph():
+    graph = BuildGraph()
+    graph.add('config', lambda: {'name': 'sarva'})
+    graph.add('readme', lambda config: f"# {config['name']}\n", path='README.md', deps=['config'])
+    graph.add('ci-file', lambda config, readme: f"{config['name']} {len(readme)}\n",
+              path='ci/ci.yml', deps=['config', 'readme'])
+    return graph
+
+
+def test_order_puts_dependencies_first():
+    names = [node.name for node in make_graph().order()]
+    assert names.index('config') < names.index('readme') < names.index('ci-file')
+
+
+def test_order_of_a_target_includes_only_what_it_needs():
+    graph = make_graph()
+    graph.add('other', lambda: 'x', path='other.txt')
+    assert [node.name for node in graph.order(['readme'])] == ['config', 'readme']
+
+
+def test_cycle_unknown_dependency_and_duplicates_raise():
+    graph = BuildGraph()
+    graph.add('a', lambda b: b, deps=['b'])
+    graph.add('b', lambda a: a, deps=['a'])
+    with pytest.raises(GraphError, match='cycle'):
+        graph.order()
+
+    graph = BuildGraph()
+    graph.add('a', lambda missing: missing, deps=['missing'])
+    with pytest.raises(GraphError, match='unknown artifact'):
+        graph.order()
+    with pytest.raises(GraphError, match='already registered'):
+        graph.add('a', lambda: None)
+    with pytest.raises(GraphError, match='unknown artifact'):
+        graph.resolve('nope')
+    with pytest.raises(GraphError, match='multi-file'):
+        graph.add('m', lambda: {}, path='x', multi=True)
+
+
+def test_resolve_by_name_or_path():
+    graph = make_graph()
+    assert graph.resolve('readme').name == 'readme'
+    assert graph.resolve('./ci//ci.yml').name == 'ci-file'
+
+
+def test_render_passes_dependency_values_as_keywords():
+    values = make_graph().render()
+    assert values['readme'] == '# sarva\n'
+    # 'ci-file' receives 'readme' and 'config'; dashes become underscores
+    graph = make_graph()
+    graph.add('uses-ci', lambda ci_file: ci_file.upper(), deps=['ci-file'])
+    assert graph.render(['uses-ci'])['uses-ci'] == 'SARVA 8\n'
+
+
+def test_independent_nodes_render_concurrently():
+    graph = BuildGraph()
+    barrier = threading.Barrier(2, timeout=5)
+
+    def wait():
+        barrier.wait()
+        return 'done'
+
+    graph.add('left', wait)
+    graph.add('right', wait)
+    assert graph.render(jobs=2) == {'left': 'done', 'right': 'done'}
+
+
+def test_build_writes_only_file_nodes_and_requested_targets(tmp_path):
+    graph = make_graph()
+    graph.add('services', lambda: {'svc/a.txt': 'a\n', 'svc/b.txt': 'b\n'}, multi=True)
+    results = dict(graph.build(root=str(tmp_path)))
+    assert set(results) == {'README.md', 'ci/ci.yml', 'svc/a.txt', 'svc/b.txt'}
+    assert (tmp_path / 'svc' / 'b.txt').read_text() == 'b\n'
+
+    results = graph.build(['ci/ci.yml'], root=str(tmp_path))
+    assert results == [('ci/ci.yml', 'unchanged')]
+
+
+def test_options_default_and_override():
+    graph = BuildGraph()
+    assert graph.option('test_shards', 4) == 4
+    graph.options['test_shards'] = 6
+    assert graph.option('test_shards', 4) == 6
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('test_shards=6', ('test_shards', 6)),
+    ('flag=true', ('flag', True)),
+    ('flag=False', ('flag', False)),
+    ('cache_lint=node_modules,turbo', ('cache_lint', 'node_modules,turbo')),
+    ('empty=', ('empty', '')),
+])
+def test_parse_option(text, expected):
+    assert parse_option(text) == expected
+
+
+@pytest.mark.parametrize('text', ['test_shards', '=6'])
+def test_parse_option_rejects_malformed(text):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_option(text)
@@ -0,0 +1,181 @@
+import json
+
+import pytest
+
+import script_2
+from scaffold import GRAPH, GraphError
+from scaffold.sharding import find_test_files, jest_durations, main, merge_lcov, plan_shards
+
+
+def test_plan_balances_by_duration_and_keeps_every_file_once():
+    timings = {'a.test.ts': 10.0, 'b.test.ts': 6.0, 'c.test.ts': 4.0, 'd.test.ts': 3.0, 'e.test.ts': 3.0}
+    shards, loads = plan_shards(sorted(timings), timings, 2)
+    assert sorted(sum(shards, [])) == sorted(timings)
+    assert shards == [['a.test.ts', 'd.test.ts'], ['b.test.ts', 'c.test.ts', 'e.test.ts']]
+    assert loads == [13.0, 13.0]
+
+
+def test_plan_assumes_mean_duration_for_new_files():
+    timings = {'old1.test.ts': 2.0, 'old2.test.ts': 4.0}
+    shards, loads = plan_shards(['new.test.ts', 'old1.test.ts', 'old2.test.ts'], timings, 3)
+    assert sorted(loads) == [2.0, 3.0, 4.0]
+    assert ['new.test.ts'] in shards
+
+
+def test_plan_without_history_splits_by_count_and_is_deterministic():
+    files = [f'{name}.test.ts' for name in 'abcdefg']
+    first = plan_shards(files, {}, 3)
+    assert first == plan_shards(list(reversed(files)), {}, 3)
+    assert sorted(len(shard) for shard in first[0]) == [2, 2, 3]
+
+
+def test_plan_with_more_shards_than_files():
+    shards, loads = plan_shards(['a.test.ts'], {}, 3)
+    assert shards == [['a.test.ts'], [], []]
+
+
+def test_find_test_files_skips_build_dirs(tmp_path):
+    for path in ('src/a.test.ts', 'src/b.ts', 'src/deep/c.spec.js',
+                 'node_modules/x/d.test.js', 'dist/e.test.js'):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text('')
+    found = find_test_files([str(tmp_path)])
+    assert [path[len(str(tmp_path)) + 1:] for path in found] == ['src/a.test.ts', 'src/deep/c.spec.js']
+
+
+def test_jest_durations_reads_perf_stats_and_start_end(tmp_path):
+    results = tmp_path / 'jest-results.json'
+    results.write_text(json.dumps({'testResults': [
+        {'name': 'services/a.test.ts', 'perfStats': {'runtime': 1234}},
+        {'name': 'services/b.test.ts', 'perfStats': {'start': 1000, 'end': 3500}},
+        {'name': 'services/c.test.ts', 'startTime': 10, 'endTime': 260},
+        {'name': 'services/d.test.ts'},
+    ]}))
+    assert jest_durations(str(results)) == {
+        'services/a.test.ts': 1.234, 'services/b.test.ts': 2.5, 'services/c.test.ts': 0.25}
+
+
+def test_merge_timings_updates_history(tmp_path):
+    previous = tmp_path / 'timings.json'
+    previous.write_text(json.dumps({'a.test.ts': 9.0, 'gone.test.ts': 1.0}))
+    results = tmp_path / 'shard1.json'
+    results.write_text(json.dumps({'testResults': [{'name': 'a.test.ts', 'perfStats': {'runtime': 2000}}]}))
+    output = tmp_path / 'out' / 'timings.json'
+    assert main(['merge-timings', '-o', str(output), '--previous', str(previous),
+                 str(results), str(tmp_path / 'missing.json')]) == 0
+    assert json.loads(output.read_text()) == {'a.test.ts': 2.0, 'gone.test.ts': 1.0}
+
+
+SHARD_1 = """TN:
+SF:src/a.ts
+FN:1,f
+FN:5,g
+FNDA:1,f
+FNDA:0,g
+FNF:2
+FNH:1
+BRDA:2,0,0,1
+BRDA:2,0,1,-
+DA:1,1
+DA:2,1
+DA:5,0
+LF:3
+LH:2
+end_of_record
+"""
+
+SHARD_2 = """TN:
+SF:src/a.ts
+FN:1,f
+FN:5,g
+FNDA:0,f
+FNDA:2,g
+BRDA:2,0,0,0
+BRDA:2,0,1,3
+DA:1,0
+DA:2,0
+DA:5,2
+end_of_record
+SF:src/b.ts
+DA:1,0
+end_of_record
+"""
+
+
+def test_merge_lcov_sums_hits_and_recounts_totals(tmp_path):
+    paths = []
+    for i, text in enumerate((SHARD_1, SHARD_2)):
+        path = tmp_path / f'{i}.info'
+        path.write_text(text)
+        paths.append(str(path))
+    assert merge_lcov(paths) == """TN:
+SF:src/a.ts
+FN:1,f
+FN:5,g
+FNDA:1,f
+FNDA:2,g
+FNF:2
+FNH:2
+BRDA:2,0,0,1
+BRDA:2,0,1,3
+BRF:2
+BRH:2
+DA:1,1
+DA:2,1
+DA:5,2
+LF:3
+LH:3
+end_of_record
+TN:
+SF:src/b.ts
+FNF:0
+FNH:0
+BRF:0
+BRH:0
+DA:1,0
+LF:1
+LH:0
+end_of_record
+"""
+
+
+def test_merge_lcov_of_nothing_is_empty():
+    assert merge_lcov([]) == ''
+
+
+def test_plan_cli_prints_one_shard(tmp_path, capsys):
+    for name in ('a', 'b', 'c'):
+        (tmp_path / f'{name}.test.ts').write_text('')
+    timings = tmp_path / 'timings.json'
+    timings.write_text(json.dumps({str(tmp_path / 'a.test.ts'): 10.0, str(tmp_path / 'b.test.ts'): 1.0}))
+    assert main(['plan', '--shard', '1', '--total', '2', '--timings', str(timings), str(tmp_path)]) == 0
+    assert capsys.readouterr().out.split() == [str(tmp_path / 'a.test.ts')]
+    with pytest.raises(SystemExit):
+        main(['plan', '--shard', '3', '--total', '2', str(tmp_path)])
+
+
+@pytest.fixture
+def options():
+    saved = dict(GRAPH.options)
+    yield GRAPH.options
+    GRAPH.options.clear()
+    GRAPH.options.update(saved)
+
+
+def test_count_option_default_and_valid(options):
+    assert script_2.count_option('test_shards', 4) == 4
+    options['test_shards'] = 6
+    assert script_2.count_option('test_shards', 4) == 6
+
+
+@pytest.mark.parametrize('value', [0, -1, 'abc', True, 2.5])
+def test_count_option_rejects_bad_values(options, value):
+    options['test_shards'] = value
+    with pytest.raises(GraphError, match='test_shards'):
+        script_2.count_option('test_shards', 4)
+
+
+def test_ci_workflow_matrix_follows_test_shards(options):
+    options['test_shards'] = 3
+    workflow = script_2.ci_workflow(script_2.services(), script_2.workspaces())
+    assert workflow['jobs']['test-backend']['strategy']['matrix']['shard'] == [1, 2, 3]